@@ -9,6 +9,7 @@ from alembic import context
 
 from app.db.base_class import Base
 from app.db.parser import CustomJSONEncoder, CustomJSONDecoder
+from app.db.partitions import is_partition
 from app.core.config import settings
 
 
@@ -40,6 +41,15 @@ from app.models import *
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 rollback = int(context.get_x_argument(as_dictionary=True).get("rollback", "0"))
+# partitions are created and dropped at runtime, they are not in the models
+PARTITIONED_TABLES = ("requestlog",)
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Leave partitions (and so their indexes) out of autogenerate."""
+    if type_ == "table":
+        return not any(is_partition(table, name) for table in PARTITIONED_TABLES)
+    return True
 
 
 def run_migrations_offline() -> None:
@@ -61,6 +71,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -68,7 +79,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)  # type: ignore
+    context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)  # type: ignore
 
     with context.begin_transaction() as _:  # noqa
         context.run_migrations()
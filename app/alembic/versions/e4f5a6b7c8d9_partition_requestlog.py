@@ -0,0 +1,142 @@
+"""partition requestlog by created and index tracker, user and status lookups
+
+Revision ID: e4f5a6b7c8d9
+Revises: d2e3f4a5b6c7
+Create Date: 2026-10-17
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "e4f5a6b7c8d9"
+down_revision = "d2e3f4a5b6c7"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, user_id, method, service_name, processing_time, status_code, tracker_id, ip, "
+    "request, response, trace, type, start_processing_at, is_deleted, created, modified"
+)
+# frozen copies of the partition layout this revision creates, later changes to
+# the settings or to app.db.partitions must not change what it does
+PARTITIONS_AHEAD = 2
+DEFAULT_PARTITION = "requestlog_default"
+
+
+def next_month(start: date) -> date:
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def months(first: date, last: date) -> list[date]:
+    """First days of the months from the one of `first` to the one of `last`."""
+    starts, start = [], first.replace(day=1)
+    while start <= last:
+        starts.append(start)
+        start = next_month(start)
+    return starts
+
+
+def create_partition_sql(start: date) -> str:
+    """DDL of the monthly partition of requestlog beginning on `start`, in UTC."""
+    name = f"requestlog_p{start.strftime('%Y%m')}"
+    end = next_month(start)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "requestlog" '
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    )
+
+
+def columns() -> list[sa.Column]:
+    return [
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('requestlog_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("method", sa.String(length=10), nullable=True),
+        sa.Column("service_name", sa.Text(), nullable=True),
+        sa.Column("processing_time", sa.Float(), nullable=True),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("tracker_id", sa.String(length=100), nullable=True),
+        sa.Column("ip", sa.String(length=50), nullable=True),
+        sa.Column("request", sa.Text(), nullable=True),
+        sa.Column("response", sa.Text(), nullable=True),
+        sa.Column("trace", sa.Text(), nullable=True),
+        sa.Column("type", sa.Text(), nullable=False),
+        sa.Column("start_processing_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_deleted", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("modified", sa.DateTime(timezone=True), nullable=False),
+    ]
+
+
+def move_aside(table: str) -> None:
+    """Rename `table` and its indexes, so the new table can take their names."""
+    op.rename_table(table, f"{table}_old")
+    op.execute(
+        f"""
+        DO $$
+        DECLARE r record;
+        BEGIN
+            FOR r IN SELECT indexname FROM pg_indexes WHERE tablename = '{table}_old' LOOP
+                EXECUTE format('ALTER INDEX %I RENAME TO %I', r.indexname, r.indexname || '_old');
+            END LOOP;
+        END $$
+        """
+    )
+    # keep the id sequence when the old table is dropped
+    op.execute("ALTER SEQUENCE requestlog_id_seq OWNED BY NONE")
+
+
+def create_indexes(partitioned: bool) -> None:
+    for column in ("created", "is_deleted", "modified", "start_processing_at"):
+        op.create_index(f"ix_requestlog_{column}", "requestlog", [column], unique=False)
+    if partitioned:
+        op.create_index("ix_requestlog_tracker_id", "requestlog", ["tracker_id"], unique=False)
+        op.create_index("ix_requestlog_user_id_created", "requestlog", ["user_id", "created"], unique=False)
+        op.create_index("ix_requestlog_status_code_created", "requestlog", ["status_code", "created"], unique=False)
+
+
+def upgrade() -> None:
+    move_aside("requestlog")
+    op.create_table(
+        "requestlog",
+        *columns(),
+        sa.PrimaryKeyConstraint("id", "created", name="pk_requestlog"),
+        postgresql_partition_by="RANGE (created)",
+    )
+    create_indexes(partitioned=True)
+
+    # monthly partitions for the existing rows and the coming months, the rest goes to the default one
+    today = datetime.now(timezone.utc).date()
+    first = op.get_bind().execute(sa.text("SELECT min(created) FROM requestlog_old")).scalar()
+    first = first.astimezone(timezone.utc).date() if first else today
+    last = today
+    for _ in range(PARTITIONS_AHEAD):
+        last = next_month(last)
+    for start in months(first, last):
+        op.execute(create_partition_sql(start))
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF requestlog DEFAULT")
+
+    op.execute(f"INSERT INTO requestlog ({COLUMNS}) SELECT {COLUMNS} FROM requestlog_old")
+    op.drop_table("requestlog_old")
+    op.execute("ALTER SEQUENCE requestlog_id_seq OWNED BY requestlog.id")
+
+
+def downgrade() -> None:
+    move_aside("requestlog")
+    op.create_table(
+        "requestlog",
+        *columns(),
+        sa.PrimaryKeyConstraint("id", name="pk_requestlog"),
+    )
+    create_indexes(partitioned=False)
+    op.execute(f"INSERT INTO requestlog ({COLUMNS}) SELECT {COLUMNS} FROM requestlog_old")
+    # drops the partitions with their parent
+    op.drop_table("requestlog_old")
+    op.execute("ALTER SEQUENCE requestlog_id_seq OWNED BY requestlog.id")
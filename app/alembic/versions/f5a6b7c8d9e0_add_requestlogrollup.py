@@ -0,0 +1,47 @@
+"""add requestlogrollup
+
+Revision ID: f5a6b7c8d9e0
+Revises: e4f5a6b7c8d9
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "f5a6b7c8d9e0"
+down_revision = "e4f5a6b7c8d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "requestlogrollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("resolution", sa.String(length=10), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("method", sa.String(length=10), nullable=False),
+        sa.Column("service_name", sa.Text(), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("total_time", sa.Float(), nullable=False),
+        sa.Column("max_time", sa.Float(), nullable=False),
+        sa.Column("histogram", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column("is_deleted", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("modified", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="pk_requestlogrollup"),
+        sa.UniqueConstraint(
+            "resolution", "bucket_start", "method", "service_name", "status_code", name="uq_requestlogrollup_bucket"
+        ),
+    )
+    for column in ("created", "is_deleted", "modified"):
+        op.create_index(f"ix_requestlogrollup_{column}", "requestlogrollup", [column], unique=False)
+
+
+def downgrade() -> None:
+    for column in ("created", "is_deleted", "modified"):
+        op.drop_index(f"ix_requestlogrollup_{column}", table_name="requestlogrollup")
+    op.drop_table("requestlogrollup")
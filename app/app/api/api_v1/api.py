@@ -1,6 +1,13 @@
 from fastapi import APIRouter
 
-from app.api.api_v1.endpoints import auth, ecommerce, health, users, utils
+from app.api.api_v1.endpoints import (
+    auth,
+    ecommerce,
+    health,
+    request_logs,
+    users,
+    utils,
+)
 
 api_router = APIRouter()
 api_router.include_router(ecommerce.router, tags=["ecommerce"])
@@ -9,3 +16,6 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(utils.router, prefix="/utils", tags=["utils"])
 api_router.include_router(utils.router_with_log, prefix="/utils", tags=["utils"])
 api_router.include_router(health.router, prefix="/health", tags=["health"])
+api_router.include_router(
+    request_logs.router, prefix="/request-logs", tags=["request-logs"]
+)
@@ -1,12 +1,13 @@
 """Ecommerce API endpoints."""
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
 from app.api import deps
 from app.api.api_v1.services import ecommerce as svc
+from app.crud.pagination import CURSOR_HEADER, DEFAULT_PAGE_SIZE, page_cursor
 from app.models.user import GroupRoles
 from app.schemas import Token
 from app.schemas.ecommerce import (
@@ -91,6 +92,7 @@ async def refresh(payload: RefreshRequest, db: AsyncSession = Depends(deps.get_d
 
 @router.get("/products")
 async def products(
+    response: Response,
     search: str | None = None,
     category_id: int | None = None,
     brand_id: int | None = None,
@@ -98,6 +100,7 @@ async def products(
     max_price: float | None = None,
     page: int = 1,
     size: int = 20,
+    cursor: str | None = None,
     db: AsyncSession = Depends(deps.get_db),
 ) -> APIResponseType[list[ProductOut]]:
     rows = await svc.list_products(
@@ -110,9 +113,13 @@ async def products(
             max_price=max_price,
             page=page,
             size=size,
+            cursor=cursor,
         ),
     )
-    return APIResponse([ProductOut.model_validate(item) for item in rows])
+    next_cursor = page_cursor(rows, size, order_field="id")
+    if next_cursor:
+        response.headers[CURSOR_HEADER] = next_cursor
+    return APIResponse(rows)
 
 
 @router.post("/cart/add")
@@ -242,10 +249,19 @@ async def admin_create_product(
 @router.get("/admin/orders")
 @allowed_roles(GroupRoles.__ADMINS__)
 async def admin_orders(
+    response: Response,
+    page: int = 1,
+    size: int | None = None,
+    cursor: str | None = None,
     db: AsyncSession = Depends(deps.get_db),
     current_user: models.User = Depends(deps.check_user_role),
 ) -> APIResponseType[list[OrderOut]]:
-    rows = await svc.list_orders(db)
+    if cursor is not None:
+        size = size or DEFAULT_PAGE_SIZE
+    rows = await svc.list_orders(db, page=page, size=size, cursor=cursor)
+    next_cursor = page_cursor(rows, size, order_desc=True)
+    if next_cursor:
+        response.headers[CURSOR_HEADER] = next_cursor
     return APIResponse([OrderOut.model_validate(row) for row in rows])
 
 
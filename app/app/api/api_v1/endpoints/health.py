@@ -1,12 +1,15 @@
 import time
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
 
 from app import crud, schemas
-from app.api.deps import get_redis, health_user
+from app.api.deps import health_user
 from app.core.config import settings
 from app.db import session
-from app.utils import utils
+from app.utils import redis_health, utils
+from cache import Cache
+from cache.metrics import PROMETHEUS_CONTENT_TYPE
 
 router = APIRouter()
 
@@ -35,7 +38,8 @@ async def deep_check(_=Depends(health_user)) -> schemas.HealthCheck:
     # Redis and Cache
     start = time.time()
     try:
-        await get_redis()
+        if not await redis_health.check():
+            raise redis_health.last_error
         health.services.redis.ok = True
         health.services.redis.msg = "Redis is ok"
         health.services.redis.time = time.time() - start
@@ -72,3 +76,13 @@ async def deep_check(_=Depends(health_user)) -> schemas.HealthCheck:
         health.services.postgres.time = time.time() - start
 
     return health
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(_=Depends(health_user)) -> PlainTextResponse:
+    """
+    cache metrics in the Prometheus text format
+    """
+    return PlainTextResponse(
+        Cache().render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE
+    )
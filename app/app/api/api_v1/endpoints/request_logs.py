@@ -0,0 +1,110 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.api import deps
+from app.api.api_v1 import services
+from app.crud.pagination import CURSOR_HEADER, DEFAULT_PAGE_SIZE, page_cursor
+from app.models.user import GroupRoles
+from app.utils import APIResponse, APIResponseType
+from app.utils.user_role import allowed_roles
+
+# not a `LogRoute` router, reading the logs should not add to them
+router = APIRouter()
+
+
+@router.get("/")
+@allowed_roles(GroupRoles.__ADMINS__)
+async def read_request_logs(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=1000),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tracker_id: str | None = None,
+    user_id: int | None = None,
+    status_code: int | None = None,
+    service_name: str | None = None,
+    current_user: models.User = Depends(deps.check_user_role),
+) -> APIResponseType[list[schemas.RequestLogSummary]]:
+    """
+    Retrieve request logs, newest first, without their bodies.
+
+    `service_name` matches paths starting with it. The next page is read with
+    the cursor returned in the `X-Next-Cursor` header.
+    """
+    rows = await services.request_logs.list_logs(
+        db,
+        cursor=cursor,
+        limit=limit,
+        start=start,
+        end=end,
+        tracker_id=tracker_id,
+        user_id=user_id,
+        status_code=status_code,
+        service_name=service_name,
+    )
+    next_cursor = page_cursor(rows, limit, order_desc=True)
+    if next_cursor:
+        response.headers[CURSOR_HEADER] = next_cursor
+    return APIResponse([schemas.RequestLogSummary.model_validate(row) for row in rows])
+
+
+@router.get("/stats")
+@allowed_roles(GroupRoles.__ADMINS__)
+async def read_request_log_stats(
+    db: AsyncSession = Depends(deps.get_db),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    method: str | None = None,
+    service_name: str | None = None,
+    status_code: int | None = None,
+    current_user: models.User = Depends(deps.check_user_role),
+) -> APIResponseType[list[schemas.RequestLogStats]]:
+    """
+    Request count, error rate (status >= 500), throughput and p50/p95/p99
+    latency per method and path, over the last hour by default.
+
+    Paths are grouped without their query string. Figures come from the
+    rollups, which lag the logs by up to a minute.
+    """
+    response = await services.request_logs.get_stats(
+        db,
+        start=start,
+        end=end,
+        method=method,
+        service_name=service_name,
+        status_code=status_code,
+    )
+    return APIResponse(response)
+
+
+@router.get("/timeseries")
+@allowed_roles(GroupRoles.__ADMINS__)
+async def read_request_log_timeseries(
+    db: AsyncSession = Depends(deps.get_db),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    resolution: str | None = Query(None, description="minute or hour"),
+    method: str | None = None,
+    service_name: str | None = None,
+    status_code: int | None = None,
+    current_user: models.User = Depends(deps.check_user_role),
+) -> APIResponseType[list[schemas.RequestLogStatsPoint]]:
+    """
+    The figures of `/stats` per minute or hour, hourly by default for ranges
+    of a day or more.
+    """
+    response = await services.request_logs.get_timeseries(
+        db,
+        start=start,
+        end=end,
+        resolution=resolution,
+        method=method,
+        service_name=service_name,
+        status_code=status_code,
+    )
+    return APIResponse(response)
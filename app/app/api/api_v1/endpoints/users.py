@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models, schemas
 from app.api import deps
 from app.api.api_v1 import services
+from app.crud.count import CountMode
+from app.crud.pagination import CURSOR_HEADER, TOTAL_COUNT_HEADER, page_cursor
 from app.log import log
 from app.utils import APIResponse, APIResponseType
 from app.models.user import GroupRoles
@@ -16,19 +18,41 @@ namespace = "user"
 
 
 @router.get("/")
-@cache(namespace=namespace, expire=ONE_DAY_IN_SECONDS)
+@cache(
+    namespace=namespace,
+    expire=ONE_DAY_IN_SECONDS,
+    headers=(CURSOR_HEADER, TOTAL_COUNT_HEADER),
+)
 @allowed_roles(GroupRoles.__ADMINS__)
 async def read_users(
+    response: Response,
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
     current_user: models.User = Depends(deps.check_user_role),
 ) -> APIResponseType[list[schemas.User]]:
     """
     Retrieve users.
+
+    Pages can also be read with the `cursor` returned in the `X-Next-Cursor`
+    header, which stays fast on deep pages unlike `skip`. `X-Total-Count` is the
+    number of users, estimated once there are `COUNT_EXACT_THRESHOLD` of them.
     """
-    users = await crud.user.get_multi(db, skip=skip, limit=limit)
-    return APIResponse(users)
+    if cursor is not None:
+        users, next_cursor = await crud.user.get_page_after(
+            db, cursor=cursor, limit=limit, schema=schemas.User
+        )
+    else:
+        users = await crud.user.get_multi(
+            db, skip=skip, limit=limit, schema=schemas.User
+        )
+        next_cursor = page_cursor(users, limit)
+    if next_cursor:
+        response.headers[CURSOR_HEADER] = next_cursor
+    total_count = await crud.user.get_count(db, mode=CountMode.AUTO)
+    response.headers[TOTAL_COUNT_HEADER] = str(total_count)
+    return APIResponse([schemas.User.model_validate(user) for user in users])
 
 
 @router.get("/{user_id}")
@@ -1,3 +1,4 @@
 from .auth import *
 from .users import *
 from . import ecommerce
+from . import request_logs
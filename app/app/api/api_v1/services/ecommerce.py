@@ -3,14 +3,17 @@
 from __future__ import annotations
 
 import secrets
+from collections import defaultdict
 from decimal import Decimal
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import Row, and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import exceptions, models
+from app import crud, exceptions, models
 from app.core.security import JWTHandler
-from app.schemas.ecommerce import ProductFilter
+from app.crud.pagination import DEFAULT_PAGE_SIZE, paginate_after
+from app.crud.projection import select_schema
+from app.schemas.ecommerce import OrderOut, ProductFilter, ProductOut, ProductVariantOut
 from app.utils import MessageCodes
 
 
@@ -87,7 +90,7 @@ async def register_user(
     user.is_active = True
     db.add_all([otp_token, user])
     await db.commit()
-    await db.refresh(user)
+    await crud.user.invalidate_cache(user.id)
     return user
 
 
@@ -166,17 +169,36 @@ async def refresh_access_token(db: AsyncSession, refresh_token: str) -> tuple[st
     return new_access, new_refresh
 
 
-async def list_products(db: AsyncSession, filters: ProductFilter) -> list[models.Product]:
-    query = select(models.Product).where(models.Product.is_active.is_(True))
+async def list_products(db: AsyncSession, filters: ProductFilter) -> list[ProductOut]:
+    query = select_schema(models.Product, ProductOut).where(models.Product.is_active.is_(True))
     if filters.search:
         query = query.where(func.lower(models.Product.title).contains(filters.search.lower()))
     if filters.category_id:
         query = query.where(models.Product.category_id == filters.category_id)
     if filters.brand_id:
         query = query.where(models.Product.brand_id == filters.brand_id)
-    query = query.offset((filters.page - 1) * filters.size).limit(filters.size)
-    result = await db.execute(query)
-    return result.scalars().unique().all()
+    if filters.cursor is not None:
+        query = paginate_after(query, models.Product, cursor=filters.cursor, limit=filters.size, order_field="id")
+    else:
+        query = query.order_by(models.Product.id).offset((filters.page - 1) * filters.size).limit(filters.size)
+    rows = (await db.execute(query)).all()
+    variants = await list_variants(db, [row.id for row in rows])
+    return [ProductOut(**row._mapping, variants=variants[row.id]) for row in rows]
+
+
+async def list_variants(db: AsyncSession, product_ids: list[int]) -> dict[int, list[ProductVariantOut]]:
+    """Variants of the products, loaded in one query instead of one lazy load per product."""
+    variants: dict[int, list[ProductVariantOut]] = defaultdict(list)
+    if not product_ids:
+        return variants
+    query = (
+        select_schema(models.ProductVariant, ProductVariantOut, "product_id")
+        .where(models.ProductVariant.product_id.in_(product_ids))
+        .order_by(models.ProductVariant.id)
+    )
+    for row in await db.execute(query):
+        variants[row.product_id].append(ProductVariantOut.model_validate(row))
+    return variants
 
 
 async def add_to_cart(db: AsyncSession, *, user_id: int | None, session_token: str | None, variant_id: int, quantity: int):
@@ -267,8 +289,6 @@ async def checkout(
     )
     db.add(payment)
     await db.commit()
-    await db.refresh(order)
-    await db.refresh(payment)
     return order, payment
 
 
@@ -276,7 +296,6 @@ async def create_category(db: AsyncSession, *, name: str, slug: str, parent_id:
     category = models.Category(name=name, slug=slug, parent_id=parent_id)
     db.add(category)
     await db.commit()
-    await db.refresh(category)
     return category
 
 
@@ -304,13 +323,21 @@ async def create_product(
     await db.flush()
     db.add(models.ProductVariant(product_id=product.id, sku=sku, price=price, stock=stock))
     await db.commit()
-    await db.refresh(product)
     return product
 
 
-async def list_orders(db: AsyncSession) -> list[models.Order]:
-    rows = await db.execute(select(models.Order).order_by(models.Order.created.desc()))
-    return rows.scalars().all()
+async def list_orders(
+    db: AsyncSession, *, page: int = 1, size: int | None = None, cursor: str | None = None
+) -> list[Row]:
+    query = select_schema(models.Order, OrderOut, "created")
+    if cursor is not None:
+        query = paginate_after(query, models.Order, cursor=cursor, limit=size or DEFAULT_PAGE_SIZE, order_desc=True)
+    else:
+        query = query.order_by(models.Order.created.desc(), models.Order.id.desc())
+        if size is not None:
+            query = query.offset((page - 1) * size).limit(size)
+    rows = await db.execute(query)
+    return rows.all()
 
 
 async def complete_order(db: AsyncSession, *, order_id: int, tracking_code: str) -> models.Order:
@@ -321,7 +348,6 @@ async def complete_order(db: AsyncSession, *, order_id: int, tracking_code: str)
     order.status = models.OrderStatus.completed
     db.add(order)
     await db.commit()
-    await db.refresh(order)
     return order
 
 
@@ -332,7 +358,6 @@ async def set_product_activation(db: AsyncSession, *, product_id: int, is_active
     product.is_active = is_active
     db.add(product)
     await db.commit()
-    await db.refresh(product)
     return product
 
 
@@ -343,5 +368,5 @@ async def set_user_activation(db: AsyncSession, *, user_id: int, is_active: bool
     user.is_active = is_active
     db.add(user)
     await db.commit()
-    await db.refresh(user)
+    await crud.user.invalidate_cache(user.id)
     return user
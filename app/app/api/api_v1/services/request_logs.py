@@ -0,0 +1,181 @@
+"""Request log search and latency and error statistics for admins."""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Row, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import exceptions, models
+from app.crud.pagination import paginate_after
+from app.crud.projection import select_schema
+from app.log import rollup
+from app.schemas.request_log import (
+    RequestLogStats,
+    RequestLogStatsPoint,
+    RequestLogSummary,
+)
+from app.utils import MessageCodes
+
+BUCKET_SECONDS = {rollup.MINUTE: 60, rollup.HOUR: 3600}
+# larger ranges are read from hour rollups, smaller ones from minute rollups
+HOUR_RESOLUTION_FROM = timedelta(days=1)
+DEFAULT_RANGE = timedelta(hours=1)
+
+
+def as_utc(moment: datetime | None) -> datetime | None:
+    """`moment` in UTC; a moment without a timezone is taken as UTC."""
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def time_range(
+    start: datetime | None, end: datetime | None
+) -> tuple[datetime, datetime]:
+    end = as_utc(end) or datetime.now(timezone.utc)
+    start = as_utc(start) or end - DEFAULT_RANGE
+    if start >= end:
+        raise exceptions.ValidationException(
+            detail="start must be before end", msg_code=MessageCodes.bad_request
+        )
+    return start, end
+
+
+def pick_resolution(start: datetime, end: datetime, resolution: str | None) -> str:
+    if resolution is None:
+        return rollup.HOUR if end - start >= HOUR_RESOLUTION_FROM else rollup.MINUTE
+    if resolution not in rollup.RESOLUTIONS:
+        raise exceptions.ValidationException(
+            detail=f"resolution must be one of {', '.join(rollup.RESOLUTIONS)}",
+            msg_code=MessageCodes.bad_request,
+        )
+    return resolution
+
+
+def covered_seconds(
+    start: datetime, end: datetime, resolution: str, now: datetime | None = None
+) -> float:
+    """Seconds covered by the buckets of `resolution` starting in [`start`, `end`).
+
+    The range is widened to whole buckets, except for the bucket in progress,
+    which only covers the time until `now`.
+    """
+    size = timedelta(seconds=BUCKET_SECONDS[resolution])
+    first = rollup.truncate(start, resolution)
+    last = rollup.truncate(end - timedelta(microseconds=1), resolution) + size
+    last = min(last, now or datetime.now(timezone.utc))
+    return max((last - first).total_seconds(), 0.0)
+
+
+async def list_logs(
+    db: AsyncSession,
+    *,
+    cursor: str | None,
+    limit: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tracker_id: str | None = None,
+    user_id: int | None = None,
+    status_code: int | None = None,
+    service_name: str | None = None,
+) -> list[Row]:
+    """Newest logs first, without bodies, filtered on indexed columns.
+
+    A `start`/`end` range keeps the scan within the partitions of that range.
+    """
+    model = models.RequestLog
+    filters = [model.is_deleted.is_(None)]
+    if start is not None:
+        filters.append(model.created >= as_utc(start))
+    if end is not None:
+        filters.append(model.created < as_utc(end))
+    if tracker_id is not None:
+        filters.append(model.tracker_id == tracker_id)
+    if user_id is not None:
+        filters.append(model.user_id == user_id)
+    if status_code is not None:
+        filters.append(model.status_code == status_code)
+    if service_name is not None:
+        filters.append(model.service_name.startswith(service_name, autoescape=True))
+    query = select_schema(model, RequestLogSummary).where(and_(*filters))
+    query = paginate_after(query, model, cursor=cursor, limit=limit, order_desc=True)
+    response = await db.execute(query)
+    return response.all()
+
+
+async def get_stats(
+    db: AsyncSession,
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    method: str | None = None,
+    service_name: str | None = None,
+    status_code: int | None = None,
+) -> list[RequestLogStats]:
+    """Count, error rate, throughput and latency percentiles per method and path.
+
+    Read from the rollups, so the range is rounded to whole minutes, or to
+    whole hours for ranges of a day or more.
+    """
+    start, end = time_range(start, end)
+    resolution = pick_resolution(start, end, None)
+    rows = await rollup.get_rollups(
+        db,
+        resolution,
+        rollup.truncate(start, resolution),
+        end,
+        method=method,
+        service_name=service_name,
+        status_code=status_code,
+    )
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row.method, row.service_name].append(row)
+    # the rows cover whole buckets, throughput is per second of those
+    seconds = covered_seconds(start, end, resolution)
+    stats = [
+        RequestLogStats(
+            method=method,
+            service_name=service_name,
+            **rollup.summarize(group, seconds),
+        )
+        for (method, service_name), group in groups.items()
+    ]
+    return sorted(stats, key=lambda item: item.count, reverse=True)
+
+
+async def get_timeseries(
+    db: AsyncSession,
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    resolution: str | None = None,
+    method: str | None = None,
+    service_name: str | None = None,
+    status_code: int | None = None,
+) -> list[RequestLogStatsPoint]:
+    """The figures of `get_stats` per minute or hour bucket, oldest first."""
+    start, end = time_range(start, end)
+    resolution = pick_resolution(start, end, resolution)
+    rows = await rollup.get_rollups(
+        db,
+        resolution,
+        rollup.truncate(start, resolution),
+        end,
+        method=method,
+        service_name=service_name,
+        status_code=status_code,
+    )
+    buckets = defaultdict(list)
+    for row in rows:
+        buckets[row.bucket_start].append(row)
+    return [
+        RequestLogStatsPoint(
+            bucket_start=bucket_start,
+            **rollup.summarize(buckets[bucket_start], BUCKET_SECONDS[resolution]),
+        )
+        for bucket_start in sorted(buckets)
+    ]
@@ -3,7 +3,6 @@ import secrets
 from typing import Annotated, AsyncGenerator, NewType
 from sqlalchemy.ext.asyncio import AsyncSession
 
-import redis.asyncio as redis
 from fastapi import Depends, Request
 from fastapi.security import HTTPBasic, HTTPBasicCredentials, OAuth2PasswordBearer
 from redis.asyncio import client
@@ -12,7 +11,7 @@ from app import crud, exceptions, models, utils
 from app.core.config import ACCESS_TOKEN_BLACKLIST_KEY, AuthMethod, settings
 from app.core.security import JWTHandler, basic_security
 from app.db.session import async_session
-from app.utils import redis_client
+from app.utils import redis_client, redis_health
 from app.utils.user_role import check_allowed_roles
 
 logger = logging.getLogger(__name__)
@@ -61,10 +60,10 @@ async def get_redis() -> client.Redis:
     Dependency function that get redis client
     """
 
+    # the server is checked in the background instead of with a PING per request
     try:
-        if await redis_client.ping():
-            return redis_client
-        raise redis.RedisError("ping error")
+        redis_health.ensure_healthy()
+        return redis_client
 
     except Exception as e:
         logger.error(f"Redis connection failed\n{e}")
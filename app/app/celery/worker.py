@@ -1,6 +1,132 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Any
+
+import redis.asyncio as redis
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import crud
 from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.db.partitions import maintain_partitions
+from app.log.rollup import prune_rollups
+from app.log.rollup import rollup_request_logs as rollup_logs
+from app.log.sinks import consume_stream, parse_logs
+from app.models import RequestLog
+
+logger = logging.getLogger(__name__)
 
 
 @celery_app.task(name="app.celery.worker.test_celery")
 def test_celery(word: str) -> str:
     return f"test task return {word}"
+
+
+def create_engine() -> AsyncEngine:
+    # every task runs in its own event loop, which pooled connections cannot outlive
+    return create_async_engine(
+        settings.POSTGRES_ASYNC_URI.unicode_string(), poolclass=NullPool
+    )
+
+
+async def persist_request_logs(rows: list[dict[str, Any]]) -> None:
+    engine = create_engine()
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            await crud.request_log.create_bulk(db, rows)
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name="app.celery.worker.save_request_logs")
+def save_request_logs(logs: list[str]) -> int:
+    """Persist a batch of logs sent by the `celery` request log sink."""
+    rows = parse_logs(logs)
+    if rows:
+        asyncio.run(persist_request_logs(rows))
+    return len(rows)
+
+
+async def consume_request_log_stream() -> int:
+    redis_client = redis.from_url(str(settings.REDIS_URI), decode_responses=True)
+    try:
+        return await consume_stream(
+            redis_client,
+            persist_request_logs,
+            stream=settings.REQUEST_LOG_STREAM,
+            consumer=f"{socket.gethostname()}-{os.getpid()}",
+            batch_size=settings.REQUEST_LOG_BATCH_SIZE,
+            max_batches=settings.REQUEST_LOG_CONSUME_MAX_BATCHES,
+        )
+    finally:
+        await redis_client.aclose()
+
+
+@celery_app.task(name="app.celery.worker.consume_request_logs")
+def consume_request_logs() -> int:
+    """Persist the logs of the `stream` request log sink, run by celery beat."""
+    return asyncio.run(consume_request_log_stream())
+
+
+async def maintain_partitions_of_request_log() -> tuple[list[str], list[str]]:
+    engine = create_engine()
+    try:
+        async with engine.begin() as connection:
+            return await maintain_partitions(
+                connection,
+                RequestLog.__tablename__,
+                "created",
+                settings.REQUEST_LOG_PARTITION_INTERVAL,
+                ahead=settings.REQUEST_LOG_PARTITIONS_AHEAD,
+                retention_days=settings.REQUEST_LOG_RETENTION_DAYS,
+            )
+    finally:
+        await engine.dispose()
+
+
+async def prune_request_log_rollups() -> dict[str, int]:
+    engine = create_engine()
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            return await prune_rollups(
+                db,
+                settings.REQUEST_LOG_ROLLUP_MINUTE_RETENTION_DAYS,
+                settings.REQUEST_LOG_RETENTION_DAYS,
+            )
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name="app.celery.worker.maintain_request_log_partitions")
+def maintain_request_log_partitions() -> dict[str, Any]:
+    """Create and drop requestlog partitions and prune old rollups, run daily."""
+    created, dropped = asyncio.run(maintain_partitions_of_request_log())
+    if created or dropped:
+        logger.info(f"requestlog partitions created: {created}, dropped: {dropped}")
+    pruned = asyncio.run(prune_request_log_rollups())
+    if any(pruned.values()):
+        logger.info(f"requestlog rollups pruned: {pruned}")
+    return {"created": created, "dropped": dropped, "pruned_rollups": pruned}
+
+
+async def rollup_recent_request_logs() -> tuple[int, int]:
+    engine = create_engine()
+    try:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            return await rollup_logs(
+                db,
+                timedelta(minutes=settings.REQUEST_LOG_ROLLUP_LOOKBACK_MINUTES),
+            )
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name="app.celery.worker.rollup_request_logs")
+def rollup_request_logs() -> dict[str, int]:
+    """Recompute the recent minute and hour request log rollups, run by celery beat."""
+    minutes, hours = asyncio.run(rollup_recent_request_logs())
+    return {"minutes": minutes, "hours": hours}
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 
 from app.core.config import settings
 
@@ -10,3 +11,29 @@ celery_app = Celery(
 )
 
 celery_app.conf.update(task_track_started=True, broker_connection_retry_on_startup=True)
+
+celery_app.conf.beat_schedule = {
+    # create upcoming requestlog partitions and drop expired ones
+    "maintain-request-log-partitions": {
+        "task": "app.celery.worker.maintain_request_log_partitions",
+        "schedule": crontab(minute=0, hour=1),
+        "options": {"queue": "main-queue"},
+    },
+    # keep the request log dashboards up to date, see `app.log.rollup`
+    "rollup-request-logs": {
+        "task": "app.celery.worker.rollup_request_logs",
+        "schedule": settings.REQUEST_LOG_ROLLUP_INTERVAL,
+        "options": {"queue": "main-queue"},
+    },
+}
+if settings.REQUEST_LOG_SINK == "stream":
+    # drain the request log stream, see `app.log.sinks.StreamSink`
+    celery_app.conf.beat_schedule["consume-request-logs"] = {
+        "task": "app.celery.worker.consume_request_logs",
+        "schedule": settings.REQUEST_LOG_CONSUME_INTERVAL,
+        # runs still queued when the next one is due are dropped, not piled up
+        "options": {
+            "queue": "main-queue",
+            "expires": settings.REQUEST_LOG_CONSUME_INTERVAL,
+        },
+    }
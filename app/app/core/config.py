@@ -4,9 +4,16 @@ from typing import Any
 from pydantic import AnyHttpUrl, PostgresDsn, RedisDsn, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from cache.codecs import check_codec, check_compression
+
 ACCESS_TOKEN_BLACKLIST_KEY = "access_token_blacklist:{token}"
 
 
+def split_list(value: str | None) -> list[str]:
+    """Items of a comma-separated setting."""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
 class AsyncPostgresDsn(PostgresDsn):
     allowed_schemes = {"postgres+asyncpg", "postgresql+asyncpg"}
 
@@ -37,6 +44,74 @@ class Settings(BaseSettings):
     POSTGRES_ASYNC_URI_TEST: AsyncPostgresDsn | None = None
 
     REDIS_URI: RedisDsn | None = None
+    # shared by the application and the response cache Redis clients
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5.0
+    # idle connections are checked before reuse, and the server in the background
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+
+    # in-process LRU tier in front of the Redis response cache (0 disables it)
+    CACHE_LOCAL_MAX_SIZE: int = 0
+    CACHE_LOCAL_TTL: int = 60
+    # cached payload serialization: json | orjson | msgpack, zlib | zstd | lz4
+    CACHE_CODEC: str = "json"
+    CACHE_COMPRESSION: str | None = None
+    CACHE_COMPRESS_MIN_SIZE: int = 1024
+    # one log line per cache event; metrics are collected either way
+    CACHE_LOG_EVENTS: bool = True
+    # connection errors before caching bypasses Redis, seconds until it is retried
+    CACHE_BREAKER_FAILURE_THRESHOLD: int = 5
+    CACHE_BREAKER_RESET_TIMEOUT: float = 5.0
+    # response cache backend: redis | cluster | sharded (REDIS_URI or CACHE_REDIS_NODES)
+    CACHE_BACKEND: str = "redis"
+    # comma-separated URLs of the standalone servers of the sharded backend
+    CACHE_REDIS_NODES: str | None = None
+    # seconds rows of CRUD objects with `cache_entities` are cached (0 disables it)
+    ENTITY_CACHE_TTL: int = 0
+    # seconds cached counts are kept, and the size from which `auto` counts estimate
+    COUNT_CACHE_TTL: int = 30
+    COUNT_EXACT_THRESHOLD: int = 10_000
+    # request logs are written in batches of up to REQUEST_LOG_BATCH_SIZE rows, at
+    # least every REQUEST_LOG_FLUSH_INTERVAL seconds; once REQUEST_LOG_BUFFER_SIZE
+    # rows wait, new logs are dropped (drop_new) or the oldest ones (drop_oldest)
+    REQUEST_LOG_BATCH_SIZE: int = 500
+    REQUEST_LOG_FLUSH_INTERVAL: float = 1.0
+    REQUEST_LOG_BUFFER_SIZE: int = 10_000
+    REQUEST_LOG_OVERFLOW: str = "drop_new"
+    # where request logs go: db (written by the API), stream (a Redis Stream read
+    # by celery beat every REQUEST_LOG_CONSUME_INTERVAL seconds, at most
+    # REQUEST_LOG_CONSUME_MAX_BATCHES batches per run) or celery (one task per
+    # batch, batched like the db writer)
+    REQUEST_LOG_SINK: str = "db"
+    REQUEST_LOG_STREAM: str = "request-logs"
+    REQUEST_LOG_STREAM_MAX_LENGTH: int = 1_000_000
+    REQUEST_LOG_CONSUME_INTERVAL: float = 5.0
+    REQUEST_LOG_CONSUME_MAX_BATCHES: int = 20
+    # requests logged by LogRoute: all (errors, slow requests and a sample of the
+    # rest), errors, slow or errors_and_slow; routes can override it (`log_policy`)
+    REQUEST_LOG_MODE: str = "all"
+    REQUEST_LOG_SAMPLE_RATE: float = 1.0
+    REQUEST_LOG_SLOW_THRESHOLD: float = 1.0
+    # bytes of request and response bodies kept in a log (0 keeps them whole)
+    REQUEST_LOG_MAX_BODY_SIZE: int = 16_384
+    # comma-separated path prefixes to log only / never
+    REQUEST_LOG_INCLUDE_PATHS: str | None = None
+    REQUEST_LOG_EXCLUDE_PATHS: str | None = None
+    # requestlog is partitioned by day or month; a daily task creates the next
+    # REQUEST_LOG_PARTITIONS_AHEAD partitions and drops the ones older than
+    # REQUEST_LOG_RETENTION_DAYS (0 keeps them)
+    REQUEST_LOG_PARTITION_INTERVAL: str = "month"
+    REQUEST_LOG_PARTITIONS_AHEAD: int = 2
+    REQUEST_LOG_RETENTION_DAYS: int = 90
+    # per minute and per hour rollups are recomputed every REQUEST_LOG_ROLLUP_INTERVAL
+    # seconds over the last REQUEST_LOG_ROLLUP_LOOKBACK_MINUTES, to count late logs
+    REQUEST_LOG_ROLLUP_INTERVAL: float = 60.0
+    REQUEST_LOG_ROLLUP_LOOKBACK_MINUTES: int = 10
+    # the daily partition task also drops minute rollups older than
+    # REQUEST_LOG_ROLLUP_MINUTE_RETENTION_DAYS, and hour rollups older than
+    # REQUEST_LOG_RETENTION_DAYS (0 keeps them)
+    REQUEST_LOG_ROLLUP_MINUTE_RETENTION_DAYS: int = 7
 
     SUB_PATH: str = ""
 
@@ -75,6 +150,31 @@ class Settings(BaseSettings):
     def allow_origins(self) -> list[str]:
         return [str(origin).strip("/") for origin in self.BACKEND_CORS_ORIGINS]
 
+    @property
+    def cache_nodes(self) -> list[str] | None:
+        if not self.CACHE_REDIS_NODES:
+            return None
+        return [url.strip() for url in self.CACHE_REDIS_NODES.split(",") if url.strip()]
+
+    @property
+    def request_log_include_paths(self) -> list[str]:
+        return split_list(self.REQUEST_LOG_INCLUDE_PATHS)
+
+    @property
+    def request_log_exclude_paths(self) -> list[str]:
+        return split_list(self.REQUEST_LOG_EXCLUDE_PATHS)
+
+    @field_validator("CACHE_CODEC")
+    @classmethod
+    def check_cache_codec(cls, v: str) -> str:
+        # fail at startup rather than on the first cached request
+        return check_codec(v)
+
+    @field_validator("CACHE_COMPRESSION")
+    @classmethod
+    def check_cache_compression(cls, v: str | None) -> str | None:
+        return check_compression(v or None)
+
     @field_validator("POSTGRES_ASYNC_URI", "POSTGRES_ASYNC_URI_TEST", mode="before")
     @classmethod
     def assemble_async_db_connection(cls, v: str | None) -> Any:
@@ -1,2 +1,2 @@
-from .crud_request_log import request_log
+from .crud_request_log import request_log, request_log_rollup
 from .crud_user import user
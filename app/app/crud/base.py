@@ -1,13 +1,33 @@
 from datetime import datetime
-from typing import Any, Generic, Sequence, Type, TypeVar, Union
+from typing import Any, Generic, Iterable, Literal, Sequence, Type, TypeVar, Union
 
 from fastapi import HTTPException
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import Row, RowMapping, and_, exc, func, select, update
+from sqlalchemy import (
+    Row,
+    RowMapping,
+    Select,
+    and_,
+    column,
+    exc,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app import exceptions
+from app.crud.count import CountMode, count
+from app.crud.entity_cache import EntityCache
+from app.crud.pagination import (
+    DEFAULT_PAGE_SIZE,
+    order_columns,
+    page_cursor,
+    paginate_after,
+)
+from app.crud.projection import select_schema
 from app.db.base_class import Base
 from app.utils import MessageCodes
 
@@ -15,9 +35,12 @@ ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# bind parameters asyncpg accepts in one statement
+POSTGRES_MAX_PARAMETERS = 32_767
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(self, model: Type[ModelType], cache_entities: bool = False):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
@@ -25,10 +48,21 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+        * `cache_entities`: Serve `get` and `get_by_ids` from an entity cache,
+          invalidated by `update`, `update_multi` and `remove`
         """
         self.model = model
+        self.entity_cache = EntityCache(model) if cache_entities else None
+
+    @property
+    def caches_entities(self) -> bool:
+        return self.entity_cache is not None and self.entity_cache.enabled
 
     async def get(self, db: AsyncSession, id_: int | str) -> ModelType | None:
+        if self.caches_entities:
+            db_obj = await self.entity_cache.get(db, id_)
+            if db_obj is not None:
+                return db_obj
         query = select(self.model).where(
             and_(
                 self.model.id == id_,
@@ -36,24 +70,65 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             ),
         )
         response = await db.execute(query)
-        return response.scalar_one_or_none()
+        db_obj = response.scalar_one_or_none()
+        if db_obj is not None and self.caches_entities:
+            await self.entity_cache.set_many([db_obj])
+        return db_obj
 
     async def get_by_ids(
         self, db: AsyncSession, list_ids: list[int | str]
     ) -> Sequence[Row | RowMapping | Any]:
-        query = select(self.model).where(
-            and_(
-                self.model.id.in_(list_ids),
-                self.model.is_deleted.is_(None),
+        """Rows of `list_ids` that exist, in the order of `list_ids`."""
+        found: dict[str, ModelType] = {}
+        missing = list_ids
+        if self.caches_entities:
+            found = await self.entity_cache.get_many(db, list_ids)
+            missing = [id_ for id_ in list_ids if str(id_) not in found]
+        if missing:
+            query = select(self.model).where(
+                and_(
+                    self.model.id.in_(missing),
+                    self.model.is_deleted.is_(None),
+                )
             )
+            response = await db.execute(query)
+            db_objs = response.scalars().all()
+            if self.caches_entities:
+                await self.entity_cache.set_many(db_objs)
+            found.update((str(db_obj.id), db_obj) for db_obj in db_objs)
+        ordered = dict.fromkeys(str(id_) for id_ in list_ids)
+        return [found[id_] for id_ in ordered if id_ in found]
+
+    async def invalidate_cache(self, *ids: int | str) -> None:
+        """Drop the cached snapshots of `ids`, call it after committing changes to them."""
+        if self.entity_cache is not None:
+            await self.entity_cache.invalidate(*ids)
+
+    async def get_count(
+        self, db: AsyncSession, mode: CountMode = CountMode.EXACT
+    ) -> int:
+        """
+        Number of rows that are not soft-deleted.
+
+        **Parameters**
+
+        * `mode`: `exact`, `estimated` from the planner statistics, `cached` for
+          `COUNT_CACHE_TTL` seconds, or `auto` to estimate only large tables
+        """
+        return await count(
+            db,
+            select(self.model).where(self.model.is_deleted.is_(None)),
+            mode,
+            namespace=f"count:{self.model.__tablename__}",
         )
-        response = await db.execute(query)
-        return response.scalars().all()
 
-    async def get_count(self, db: AsyncSession) -> int:
-        query = select(func.count()).select_from(select(self.model).subquery())
-        response = await db.execute(query)
-        return response.scalar_one()
+    def select_query(
+        self, schema: Type[BaseModel] | None = None, *extra: str
+    ) -> Select:
+        """`SELECT` of whole entities, or of the columns of `schema` and `extra`."""
+        if schema is None:
+            return select(self.model)
+        return select_schema(self.model, schema, *extra)
 
     async def get_multi(
         self,
@@ -64,17 +139,24 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         order_field: str = "created",
         order_desc: bool = False,
         order_by: list[Any] | None = None,
-    ) -> list[ModelType]:
+        schema: Type[BaseModel] | None = None,
+    ) -> list[ModelType] | list[Row]:
+        """
+        **Parameters**
+
+        * `schema`: Output schema; when given, only its columns (and the order
+          columns) are selected and rows are returned instead of entities
+        """
         if order_by is None:
             order_by = []
 
-        if order_desc:
-            order_by.append(getattr(self.model, order_field).desc())
-        else:
-            order_by.append(getattr(self.model, order_field).asc())
+        # `id` breaks ties, so pages neither skip nor repeat rows and match the
+        # keyset of `page_cursor`
+        for order_column in order_columns(self.model, order_field):
+            order_by.append(order_column.desc() if order_desc else order_column.asc())
 
         query = (
-            select(self.model)
+            self.select_query(schema, order_field, "id")
             .where(self.model.is_deleted.is_(None))
             .order_by(*order_by)
             .offset(skip)
@@ -84,7 +166,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             query = query.limit(limit)
 
         response = await db.execute(query)
-        return response.scalars().all()
+        return response.scalars().all() if schema is None else response.all()
 
     async def get_multi_ordered(
         self,
@@ -109,6 +191,41 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         response = await db.execute(query.limit(limit))
         return response.scalars().all()
 
+    async def get_page_after(
+        self,
+        db: AsyncSession,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        order_field: str = "created",
+        order_desc: bool = False,
+        schema: Type[BaseModel] | None = None,
+    ) -> tuple[Sequence[ModelType] | Sequence[Row], str | None]:
+        """
+        Keyset pagination, an alternative to `get_multi` whose cost does not grow
+        with the page number.
+
+        **Parameters**
+
+        * `cursor`: Cursor returned with the previous page, None for the first page
+        * `order_field`: Non-null indexed column to order by, `id` breaks ties
+        * `schema`: Output schema to select the columns of, as in `get_multi`
+
+        **Returns** the page and the cursor of the next one, None on the last page.
+        """
+        query = paginate_after(
+            self.select_query(schema, order_field, "id").where(
+                self.model.is_deleted.is_(None)
+            ),
+            self.model,
+            cursor=cursor,
+            limit=limit,
+            order_field=order_field,
+            order_desc=order_desc,
+        )
+        response = await db.execute(query)
+        db_objs = response.scalars().all() if schema is None else response.all()
+        return db_objs, page_cursor(db_objs, limit, order_field, order_desc)
+
     def make_db_object(
         self, obj_in: CreateSchemaType | UpdateSchemaType | ModelType | dict
     ) -> ModelType:
@@ -138,7 +255,6 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 msg_code=MessageCodes.internal_error,
             )
 
-        await db.refresh(db_obj)
         return db_obj
 
     async def create_multi(
@@ -164,6 +280,139 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 msg_code=MessageCodes.internal_error,
             )
 
+    def make_row(self, obj_in: CreateSchemaType | dict) -> dict[str, Any]:
+        if isinstance(obj_in, BaseModel):
+            # fields left out keep their column default, and are not overwritten
+            # by an upsert
+            return obj_in.model_dump(exclude_unset=True)
+        return dict(obj_in)
+
+    def bulk_insert_query(
+        self,
+        keys: frozenset[str],
+        *,
+        on_conflict: Literal["nothing", "update"] | None,
+        conflict_columns: Sequence[str],
+        update_fields: Sequence[str] | None,
+        returning: bool,
+        invalidate: bool,
+    ) -> Any:
+        """`INSERT` of rows with the columns `keys`, for `create_bulk`."""
+        query = insert(self.model)
+        if on_conflict == "nothing":
+            query = query.on_conflict_do_nothing(index_elements=conflict_columns)
+        elif on_conflict == "update":
+            if update_fields is None:
+                update_fields = sorted(keys - set(conflict_columns) - {"created"})
+            # a column the rows do not set keeps its stored value
+            set_ = {
+                field: query.excluded[field] for field in update_fields if field in keys
+            }
+            if hasattr(self.model, "modified"):
+                # `onupdate` does not apply to ON CONFLICT DO UPDATE
+                set_["modified"] = query.excluded.modified
+            query = query.on_conflict_do_update(
+                index_elements=conflict_columns, set_=set_
+            )
+        if returning:
+            # overwritten rows may already be in the session, refresh them
+            query = query.returning(
+                self.model, sort_by_parameter_order=on_conflict != "nothing"
+            ).execution_options(populate_existing=True)
+        elif invalidate:
+            query = query.returning(self.model.id)
+        return query
+
+    @staticmethod
+    def pair_returned(
+        chunk: list[int], returned: Sequence[Any], on_conflict: str | None
+    ) -> Iterable[tuple[int, Any]]:
+        """The rows `RETURNING` sent back for `chunk`, with their input positions."""
+        if on_conflict == "nothing":
+            # skipped rows return nothing, keep the chunk order
+            chunk = [chunk[0]] * len(returned)
+        return zip(chunk, returned, strict=True)
+
+    async def create_bulk(
+        self,
+        db: AsyncSession,
+        objs_in: Sequence[CreateSchemaType] | Sequence[dict],
+        *,
+        on_conflict: Literal["nothing", "update"] | None = None,
+        conflict_columns: Sequence[str] = ("id",),
+        update_fields: Sequence[str] | None = None,
+        returning: bool = False,
+        chunk_size: int | None = None,
+    ) -> Sequence[ModelType] | None:
+        """
+        Insert or upsert rows with multi-row `INSERT` statements, without building
+        ORM objects and flushing them one by one like `create_multi`.
+
+        **Parameters**
+
+        * `on_conflict`: `nothing` skips rows that conflict on `conflict_columns`,
+          `update` overwrites them with the inserted values
+        * `conflict_columns`: Columns of the unique constraint or index to check
+        * `update_fields`: Columns overwritten by `update`, defaults to every
+          inserted column except the conflict columns and `created`
+        * `returning`: Return the inserted (or updated) rows, in input order
+          unless conflicting rows are skipped
+        * `chunk_size`: Rows per statement, defaults to as many as fit in the
+          bind parameter limit of Postgres
+
+        Rows are sent in one statement per set of columns, so `update` only
+        overwrites the columns a row sets (unset fields of schemas are left out).
+        All statements are committed in one transaction.
+        """
+        rows = [self.make_row(obj_in) for obj_in in objs_in]
+        if not rows:
+            return [] if returning else None
+        # the ids of overwritten rows are needed to drop their cached snapshots
+        invalidate = on_conflict == "update" and self.entity_cache is not None
+        groups: dict[frozenset[str], list[int]] = {}
+        for index, row in enumerate(rows):
+            groups.setdefault(frozenset(row), []).append(index)
+        if chunk_size is None:
+            chunk_size = POSTGRES_MAX_PARAMETERS // len(self.model.__table__.columns)
+
+        results: list[tuple[int, Any]] = []
+        try:
+            for keys, indexes in groups.items():
+                query = self.bulk_insert_query(
+                    keys,
+                    on_conflict=on_conflict,
+                    conflict_columns=conflict_columns,
+                    update_fields=update_fields,
+                    returning=returning,
+                    invalidate=invalidate,
+                )
+                for start in range(0, len(indexes), chunk_size):
+                    chunk = indexes[start : start + chunk_size]
+                    response = await db.execute(query, [rows[i] for i in chunk])
+                    if returning or invalidate:
+                        returned = response.scalars().all()
+                        results.extend(self.pair_returned(chunk, returned, on_conflict))
+            await db.commit()
+        except exc.IntegrityError as e:
+            await db.rollback()
+            raise exceptions.AlreadyExistException(
+                detail="Resource already exists",
+                msg_code=MessageCodes.already_exist_object,
+            ) from e
+        except Exception as e:
+            await db.rollback()
+            raise exceptions.InternalErrorException(
+                detail=f"{e}",
+                msg_code=MessageCodes.internal_error,
+            ) from e
+        results.sort(key=lambda item: item[0])
+        results = [result for _, result in results]
+        if invalidate:
+            await self.invalidate_cache(
+                *(result.id if returning else result for result in results)
+            )
+        return results if returning else None
+
     async def update(
         self,
         db: AsyncSession,
@@ -171,22 +420,92 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj_in: UpdateSchemaType | dict[str, Any] | ModelType | None = None,
     ) -> ModelType:
         if obj_in is not None:
-            obj_data = jsonable_encoder(db_obj)
             update_data = (
                 obj_in
                 if isinstance(obj_in, dict)
                 else obj_in.model_dump(exclude_unset=True)
             )
-            for field in obj_data:
-                if field in update_data:
-                    setattr(db_obj, field, update_data[field])
+            for field, value in self.mapped_fields(update_data).items():
+                setattr(db_obj, field, value)
         if hasattr(self.model, "modified"):
             setattr(db_obj, "modified", datetime.now())
         db.add(db_obj)
         await db.commit()
-        await db.refresh(db_obj)
+        await self.invalidate_cache(db_obj.id)
         return db_obj
 
+    def mapped_fields(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Items of `data` that are mapped attributes of the model."""
+        attrs = self.model.__mapper__.attrs
+        return {field: value for field, value in data.items() if field in attrs}
+
+    async def update_bulk(
+        self,
+        db: AsyncSession,
+        objs_in: Sequence[dict[str, Any]],
+        *,
+        returning: bool = False,
+        chunk_size: int | None = None,
+    ) -> Sequence[ModelType] | None:
+        """
+        Update rows by primary key with `UPDATE ... FROM (VALUES ...)` statements,
+        one per set of updated columns, instead of flushing objects one by one.
+
+        **Parameters**
+
+        * `objs_in`: Values to set, each with the `id` of its row
+        * `returning`: Return the updated rows (in no particular order); objects
+          of these rows already in the session are refreshed in place
+        * `chunk_size`: Rows per statement, defaults to as many as fit in the
+          bind parameter limit of Postgres
+
+        The caller commits.
+        """
+        table = self.model.__table__
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for obj_in in objs_in:
+            row = {
+                field: value
+                for field, value in obj_in.items()
+                if field in table.columns and field != "modified"
+            }
+            fields = tuple(sorted(row.keys() - {"id"}))
+            if fields:
+                groups.setdefault(fields, []).append(row)
+
+        results: list[ModelType] = []
+        for fields, rows in groups.items():
+            columns = ("id", *fields)
+            size = chunk_size or POSTGRES_MAX_PARAMETERS // len(columns)
+            for start in range(0, len(rows), size):
+                data = values(
+                    *(column(name, table.c[name].type) for name in columns),
+                    name="data",
+                ).data(
+                    [
+                        tuple(row[name] for name in columns)
+                        for row in rows[start : start + size]
+                    ]
+                )
+                set_ = {name: data.c[name] for name in fields}
+                if hasattr(self.model, "modified"):
+                    set_["modified"] = datetime.now()
+                query = (
+                    update(self.model)
+                    .where(self.model.id == data.c.id)
+                    .values(set_)
+                    .execution_options(synchronize_session=False)
+                )
+                if returning:
+                    query = query.returning(self.model).execution_options(
+                        populate_existing=True
+                    )
+                    response = await db.execute(query)
+                    results.extend(response.scalars().all())
+                else:
+                    await db.execute(query)
+        return results if returning else None
+
     async def update_multi(
         self,
         db: AsyncSession,
@@ -197,35 +516,47 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if len(db_objs) != len(objs_in):
             raise ValueError("Length of db_objs and objs_in must match")
 
-        for db_obj, obj_in in zip(db_objs, objs_in):
-            obj_data = jsonable_encoder(db_obj)
+        updates = []
+        for obj_in in objs_in:
             update_data = (
                 obj_in
                 if isinstance(obj_in, dict)
                 else obj_in.model_dump(exclude_unset=True)
             )
-            for field in obj_data:
-                if field in update_data:
-                    setattr(db_obj, field, update_data[field])
-                    if hasattr(db_obj, "modified"):
-                        setattr(db_obj, "modified", datetime.now())
+            updates.append(
+                {
+                    field: value
+                    for field, value in update_data.items()
+                    if field in self.model.__table__.columns
+                }
+            )
 
         try:
-            db.add_all(db_objs)
+            # RETURNING refreshes the objects in the same round trip
+            await self.update_bulk(
+                db,
+                [
+                    {**data, "id": db_obj.id}
+                    for db_obj, data in zip(db_objs, updates, strict=True)
+                ],
+                returning=refresh,
+            )
             await db.commit()
-
-            if refresh:
-                for db_obj in db_objs:
-                    await db.refresh(db_obj)
-                return db_objs
-
-            return True
         except Exception as e:
             await db.rollback()
             raise exceptions.InternalErrorException(
                 detail=f"{e}",
                 msg_code=MessageCodes.internal_error,
             )
+        await self.invalidate_cache(*(db_obj.id for db_obj in db_objs))
+
+        if refresh:
+            return db_objs
+        for db_obj, data in zip(db_objs, updates, strict=True):
+            # mirror the new values without marking the objects as dirty
+            for field, value in data.items():
+                set_committed_value(db_obj, field, value)
+        return True
 
     async def remove(self, db: AsyncSession, id_: int | str) -> ModelType | None:
         query = (
@@ -241,4 +572,5 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         )
         response = await db.execute(query)
         await db.commit()
+        await self.invalidate_cache(id_)
         return response.scalar_one_or_none()
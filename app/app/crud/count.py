@@ -0,0 +1,130 @@
+import json
+import time
+from enum import StrEnum
+from hashlib import blake2b
+
+from sqlalchemy import Select, func, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from cache import Cache
+
+
+class CountMode(StrEnum):
+    # count(*) of the matching rows, a scan of the table or of an index
+    EXACT = "exact"
+    # row estimate of the planner (EXPLAIN), from `pg_class` and column statistics
+    ESTIMATED = "estimated"
+    # exact count kept in the cache for `COUNT_CACHE_TTL` seconds
+    CACHED = "cached"
+    # exact on small tables, estimated once above `COUNT_EXACT_THRESHOLD` rows
+    AUTO = "auto"
+
+
+# per statement of `auto` counts: whether it is estimated, and until when
+# (`time.monotonic`) that decision holds
+_auto_estimated: dict[str, tuple[bool, float]] = {}
+
+
+def count_query(query: Select) -> Select:
+    """`SELECT count(*)` with the FROM and WHERE clauses of `query`, without a subquery."""
+    query = query.with_only_columns(func.count(), maintain_column_froms=True)
+    return query.order_by(None)
+
+
+async def count_exact(db: AsyncSession, query: Select) -> int:
+    response = await db.execute(count_query(query))
+    return response.scalar_one()
+
+
+async def count_estimated(db: AsyncSession, query: Select) -> int:
+    """Row estimate of the planner, falls back to an exact count if there is none.
+
+    The estimate of `EXPLAIN` scales `pg_class.reltuples` to the current size of
+    the table and applies the column statistics of the filters, such as the
+    soft-delete one. It is as fresh as the last `ANALYZE` (autovacuum keeps it
+    close).
+    """
+    try:
+        sql = query.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    except CompileError:
+        # parameters without a literal form cannot be explained
+        return await count_exact(db, query)
+    response = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = response.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = plan[0]["Plan"]["Plan Rows"]
+    if estimate is None or estimate < 0:
+        return await count_exact(db, query)
+    return int(estimate)
+
+
+async def count_cached(
+    db: AsyncSession, query: Select, namespace: str, ttl: int | None = None
+) -> int:
+    """Exact count shared by every worker for `ttl` seconds."""
+    ttl = settings.COUNT_CACHE_TTL if ttl is None else ttl
+    redis_cache = Cache()
+    if ttl <= 0 or redis_cache.not_connected:
+        return await count_exact(db, query)
+    compiled = query.compile(dialect=postgresql.dialect())
+    digest = blake2b(
+        f"{compiled}|{sorted(compiled.params.items())}".encode(), digest_size=16
+    ).hexdigest()
+    key = f"{redis_cache.get_namespace_prefix(namespace)}:{digest}"
+    (cached,) = await redis_cache.get_many([key], namespace)
+    if cached is not None:
+        return int(cached)
+    count = await count_exact(db, query)
+    await redis_cache.set_many({key: str(count).encode()}, ttl, namespace)
+    return count
+
+
+async def count_auto(db: AsyncSession, query: Select, ttl: int | None = None) -> int:
+    """Exact count below `COUNT_EXACT_THRESHOLD` rows, planner estimate above.
+
+    Which of the two a statement needs is remembered for `ttl` seconds (its
+    parameters aside), so a count is one round trip instead of an estimate
+    followed by an exact count.
+    """
+    ttl = settings.COUNT_CACHE_TTL if ttl is None else ttl
+    threshold = settings.COUNT_EXACT_THRESHOLD
+    key = str(query.compile(dialect=postgresql.dialect()))
+    now = time.monotonic()
+    estimated, until = _auto_estimated.get(key, (False, 0.0))
+    if until <= now:
+        estimate = await count_estimated(db, query)
+        estimated = estimate >= threshold
+        if ttl > 0:
+            _auto_estimated[key] = (estimated, now + ttl)
+        if estimated:
+            return estimate
+    elif estimated:
+        return await count_estimated(db, query)
+    exact = await count_exact(db, query)
+    if exact >= threshold and ttl > 0:
+        # the table grew past the threshold, estimate it from now on
+        _auto_estimated[key] = (True, now + ttl)
+    return exact
+
+
+async def count(
+    db: AsyncSession,
+    query: Select,
+    mode: CountMode = CountMode.EXACT,
+    *,
+    namespace: str = "count",
+) -> int:
+    """Number of rows of `query` (without LIMIT or GROUP BY), computed as `mode` says."""
+    if mode == CountMode.ESTIMATED:
+        return await count_estimated(db, query)
+    if mode == CountMode.CACHED:
+        return await count_cached(db, query, namespace)
+    if mode == CountMode.AUTO:
+        return await count_auto(db, query)
+    return await count_exact(db, query)
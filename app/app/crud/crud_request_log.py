@@ -5,7 +5,7 @@ from pydantic import BaseModel
 from fastapi.encoders import jsonable_encoder
 
 from app.crud.base import CRUDBase
-from app.models.request_log import RequestLog
+from app.models.request_log import RequestLog, RequestLogRollup
 from app.schemas.request_log import RequestLogCreate, RequestLogUpdate
 
 
@@ -36,3 +36,4 @@ class CRUDRequestLog(CRUDBase[RequestLog, RequestLogCreate, RequestLogUpdate]):
 
 
 request_log = CRUDRequestLog(RequestLog)
+request_log_rollup = CRUDBase(RequestLogRollup)
@@ -3,6 +3,7 @@ from typing import Any
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
 from app.core.security import get_password_hash, verify_password
 from app.crud.base import CRUDBase
@@ -11,13 +12,18 @@ from app.schemas.user import UserCreate, UserUpdate
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
-    async def get_by_username(self, db: AsyncSession, username: str) -> User | None:
+    async def get_by_username(
+        self, db: AsyncSession, username: str, with_password: bool = False
+    ) -> User | None:
+        """`with_password` also loads the deferred `hashed_password`."""
         query = select(self.model).where(
             and_(
                 self.model.username == username,
                 self.model.is_deleted.is_(None),
             )
         )
+        if with_password:
+            query = query.options(undefer(self.model.hashed_password))
         response = await db.execute(query)
         return response.scalar_one_or_none()
 
@@ -102,7 +108,9 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     async def authenticate(
         self, db: AsyncSession, username: str, password: str
     ) -> User | None:
-        user_obj = await self.get_by_username(db, username=username)
+        user_obj = await self.get_by_username(
+            db, username=username, with_password=True
+        )
         if not user_obj:
             return None
         if not verify_password(password, user_obj.hashed_password):
@@ -113,4 +121,4 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return user.is_active
 
 
-user = CRUDUser(User)
+user = CRUDUser(User, cache_entities=True)
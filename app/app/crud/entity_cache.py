@@ -0,0 +1,203 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Generic, Iterable, Sequence, Type, TypeVar
+
+from sqlalchemy import Enum as SAEnum, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from app.core.config import settings
+from app.db.base_class import Base
+from cache import Cache
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+TYPE_TAG = "__type__"
+VALUE_DECODERS = {
+    "datetime": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "time": time.fromisoformat,
+    "decimal": Decimal,
+    "bytes": b64decode,
+}
+# columns never written to the cache; they are not loaded on cached rows, so
+# they should be deferred with `raiseload` on the model
+EXCLUDED_COLUMNS = frozenset({"hashed_password"})
+# seconds an invalidation keeps concurrent reads from caching what they loaded
+TOMBSTONE_TTL = 30
+
+
+def encode_value(value: Any) -> Any:
+    """`json.dumps` default that keeps the python type of column values."""
+    if isinstance(value, datetime):
+        return {TYPE_TAG: "datetime", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {TYPE_TAG: "date", "v": value.isoformat()}
+    if isinstance(value, time):
+        return {TYPE_TAG: "time", "v": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {TYPE_TAG: "decimal", "v": str(value)}
+    if isinstance(value, bytes):
+        return {TYPE_TAG: "bytes", "v": b64encode(value).decode()}
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value)} is not JSON serializable")
+
+
+def decode_value(obj: dict) -> Any:
+    if TYPE_TAG not in obj:
+        return obj
+    return VALUE_DECODERS[obj[TYPE_TAG]](obj["v"])
+
+
+class EntityCache(Generic[ModelType]):
+    """Cache-aside snapshots of rows, keyed by model and primary key.
+
+    Only column values are stored, so a snapshot never triggers lazy loads.
+    Cached rows are attached to the session without a query and behave like
+    rows loaded from the database. Snapshots live in Redis and in the local
+    tier of `Cache` when it is enabled; writes must call `invalidate` after
+    committing, which also clears the local tier of the other workers.
+
+    `invalidate` leaves a tombstone for `TOMBSTONE_TTL` seconds. A read that
+    loaded a row before a concurrent write committed checks it after storing
+    the snapshot and drops the snapshot again, instead of caching a stale row.
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        ttl: int | None = None,
+        exclude: Iterable[str] = EXCLUDED_COLUMNS,
+    ):
+        """
+        **Parameters**
+
+        * `model`: A SQLAlchemy model class with an `id` primary key
+        * `ttl`: Seconds a snapshot is kept, defaults to `ENTITY_CACHE_TTL`
+        * `exclude`: Columns left out of snapshots, such as secrets; read them
+          with a query, they are not loaded on cached rows
+        """
+        self.model = model
+        self._ttl = ttl
+        self.exclude = frozenset(exclude)
+        self.namespace = f"entity:{model.__tablename__}"
+        self._columns: tuple[str, ...] | None = None
+        self._enums: dict[str, Type[Enum]] = {}
+
+    @property
+    def ttl(self) -> int:
+        return self._ttl if self._ttl is not None else settings.ENTITY_CACHE_TTL
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and Cache().connected
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        if self._columns is None:
+            self._inspect_model()
+        return self._columns
+
+    @property
+    def enums(self) -> dict[str, Type[Enum]]:
+        """Enum classes of the enum columns, whose values are stored as plain values."""
+        if self._columns is None:
+            self._inspect_model()
+        return self._enums
+
+    def _inspect_model(self) -> None:
+        # deferred until first use, once every mapper has been configured
+        column_attrs = inspect(self.model).column_attrs
+        self._enums = {
+            attr.key: attr.columns[0].type.enum_class
+            for attr in column_attrs
+            if isinstance(attr.columns[0].type, SAEnum)
+            and attr.columns[0].type.enum_class is not None
+        }
+        self._columns = tuple(
+            attr.key for attr in column_attrs if attr.key not in self.exclude
+        )
+
+    def get_key(self, id_: int | str) -> str:
+        return f"{Cache().get_namespace_prefix(self.namespace)}:{id_}"
+
+    @staticmethod
+    def get_tombstone_key(key: str) -> str:
+        return f"{key}:invalidated"
+
+    def dumps(self, db_obj: ModelType) -> bytes:
+        snapshot = {column: getattr(db_obj, column) for column in self.columns}
+        return json.dumps(snapshot, default=encode_value).encode()
+
+    def loads(self, raw: bytes) -> dict[str, Any]:
+        snapshot = json.loads(raw, object_hook=decode_value)
+        for column, enum_class in self.enums.items():
+            if snapshot.get(column) is not None:
+                snapshot[column] = enum_class(snapshot[column])
+        return snapshot
+
+    async def attach(self, db: AsyncSession, snapshot: dict[str, Any]) -> ModelType:
+        """Return the row of `snapshot` as a persistent object of `db`, without a query."""
+        existing = db.sync_session.identity_map.get(
+            identity_key(self.model, snapshot["id"])
+        )
+        if existing is not None:
+            return existing
+        db_obj = self.model(**snapshot)
+        make_transient_to_detached(db_obj)
+        return await db.merge(db_obj, load=False)
+
+    async def get(self, db: AsyncSession, id_: int | str) -> ModelType | None:
+        found = await self.get_many(db, [id_])
+        return found.get(str(id_))
+
+    async def get_many(
+        self, db: AsyncSession, ids: Sequence[int | str]
+    ) -> dict[str, ModelType]:
+        """Return the cached rows of `ids` by `str(id)`; missing ids are left out."""
+        redis_cache = Cache()
+        values = await redis_cache.get_many(
+            [self.get_key(id_) for id_ in ids], self.namespace
+        )
+        found = {}
+        for id_, raw in zip(ids, values, strict=True):
+            if raw is not None:
+                found[str(id_)] = await self.attach(db, self.loads(raw))
+        redis_cache.metrics.hits.inc(len(found), namespace=self.namespace)
+        redis_cache.metrics.misses.inc(len(ids) - len(found), namespace=self.namespace)
+        return found
+
+    async def set_many(self, db_objs: Iterable[ModelType]) -> None:
+        redis_cache = Cache()
+        mapping = {self.get_key(db_obj.id): self.dumps(db_obj) for db_obj in db_objs}
+        if not mapping:
+            return
+        await redis_cache.set_many(mapping, self.ttl, self.namespace)
+        # checked after storing: a write that committed while the rows were read
+        # left its tombstone before unlinking, so either its unlink or this check
+        # removes the stale snapshot
+        keys = list(mapping)
+        tombstones = await redis_cache.get_many(
+            [self.get_tombstone_key(key) for key in keys], self.namespace
+        )
+        stale = [
+            key for key, tombstone in zip(keys, tombstones, strict=True) if tombstone
+        ]
+        if stale:
+            await redis_cache.invalidate_keys(*stale)
+
+    async def invalidate(self, *ids: int | str) -> None:
+        redis_cache = Cache()
+        if redis_cache.connected or redis_cache.reconnecting:
+            keys = [self.get_key(id_) for id_ in ids]
+            await redis_cache.set_many(
+                {self.get_tombstone_key(key): b"1" for key in keys},
+                TOMBSTONE_TTL,
+                self.namespace,
+            )
+            await redis_cache.invalidate_keys(*keys)
@@ -0,0 +1,117 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from enum import Enum
+from typing import Any, Sequence, Type
+
+from sqlalchemy import Select, tuple_
+
+from app import exceptions
+from app.crud.entity_cache import decode_value, encode_value
+from app.db.base_class import Base
+from app.utils import MessageCodes
+
+# response header carrying the cursor of the next page
+CURSOR_HEADER = "X-Next-Cursor"
+# response header carrying the (possibly estimated) number of rows of a list
+TOTAL_COUNT_HEADER = "X-Total-Count"
+DEFAULT_PAGE_SIZE = 100
+
+
+def order_fields(order_field: str) -> list[str]:
+    """Fields of the keyset: `order_field`, then `id` to break ties."""
+    if order_field == "id":
+        return ["id"]
+    return [order_field, "id"]
+
+
+def order_columns(model: Type[Base], order_field: str) -> list[Any]:
+    return [getattr(model, field) for field in order_fields(order_field)]
+
+
+def encode_cursor(order_field: str, order_desc: bool, values: Sequence[Any]) -> str:
+    payload = {"o": order_field, "d": order_desc, "v": list(values)}
+    raw = json.dumps(payload, default=encode_value, separators=(",", ":"))
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_field: str, order_desc: bool) -> list[Any]:
+    """Return the keyset values of `cursor`, which must match the requested order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(urlsafe_b64decode(padded), object_hook=decode_value)
+        values = payload["v"]
+        valid = payload["o"] == order_field and payload["d"] == order_desc
+    except (ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise exceptions.ValidationException(
+            detail="Invalid pagination cursor",
+            msg_code=MessageCodes.bad_request,
+        )
+    return values
+
+
+def keyset_value_valid(column: Any, value: Any) -> bool:
+    """Whether a cursor `value` can be compared with `column` by the database."""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value is not None
+    if isinstance(value, bool) and python_type is not bool:
+        return False
+    if python_type is float:
+        return isinstance(value, (int, float))
+    if issubclass(python_type, Enum):
+        return value in {member.value for member in python_type} or isinstance(
+            value, python_type
+        )
+    return isinstance(value, python_type)
+
+
+def paginate_after(
+    query: Select,
+    model: Type[Base],
+    *,
+    cursor: str | None,
+    limit: int,
+    order_field: str = "created",
+    order_desc: bool = False,
+) -> Select:
+    """Order `query` by the keyset and return the `limit` rows following `cursor`.
+
+    Unlike `OFFSET`, rows before the cursor are never read, so every page costs
+    the same. `order_field` must be a non-null indexed column; `id` breaks ties.
+    """
+    columns = order_columns(model, order_field)
+    if cursor:
+        values = decode_cursor(cursor, order_field, order_desc)
+        if len(values) != len(columns) or not all(
+            map(keyset_value_valid, columns, values)
+        ):
+            raise exceptions.ValidationException(
+                detail="Invalid pagination cursor",
+                msg_code=MessageCodes.bad_request,
+            )
+        key, after = tuple_(*columns), tuple_(*values)
+        query = query.where(key < after if order_desc else key > after)
+    return query.order_by(
+        *(column.desc() if order_desc else column.asc() for column in columns)
+    ).limit(limit)
+
+
+def page_cursor(
+    rows: Sequence[Any],
+    limit: int | None,
+    order_field: str = "created",
+    order_desc: bool = False,
+) -> str | None:
+    """Cursor of the page after `rows`, or None when `rows` is the last page.
+
+    `rows` can be entities or anything with the keyset fields as attributes,
+    such as rows selected with `select_schema`.
+    """
+    if not rows or limit is None or len(rows) < limit:
+        return None
+    last = rows[-1]
+    values = [getattr(last, field) for field in order_fields(order_field)]
+    return encode_cursor(order_field, order_desc, values)
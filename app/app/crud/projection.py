@@ -0,0 +1,30 @@
+from typing import Any, Type
+
+from pydantic import BaseModel
+from sqlalchemy import Select, select
+
+from app.db.base_class import Base
+
+
+def schema_columns(
+    model: Type[Base], schema: Type[BaseModel], *extra: str
+) -> list[Any]:
+    """Columns of `model` that `schema` reads, followed by the `extra` ones.
+
+    Fields of `schema` that are not columns of `model`, such as relationships,
+    are left to the caller.
+    """
+    attrs = model.__mapper__.column_attrs
+    names = [name for name in schema.model_fields if name in attrs]
+    names += [name for name in extra if name not in names]
+    return [getattr(model, name) for name in names]
+
+
+def select_schema(model: Type[Base], schema: Type[BaseModel], *extra: str) -> Select:
+    """`SELECT` of only the columns `schema` needs, instead of whole entities.
+
+    The result rows are plain named tuples: they skip the identity map and the
+    hydration of ORM objects, and `schema.model_validate` reads them by
+    attribute like entities.
+    """
+    return select(*schema_columns(model, schema, *extra))
@@ -21,6 +21,9 @@ class Base(DeclarativeBase):
     )
     id: Any
     __name__: str
+    # fetch server-generated values with RETURNING when a row is flushed, so
+    # written objects are complete without a `refresh` after the commit
+    __mapper_args__ = {"eager_defaults": True}
 
     # Generate __tablename__ automatically
     @declared_attr.directive
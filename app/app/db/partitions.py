@@ -0,0 +1,166 @@
+"""Range partitions of tables partitioned by day or month on a timestamp column."""
+
+import re
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+DAY = "day"
+MONTH = "month"
+INTERVALS = (DAY, MONTH)
+_NAME_FORMATS = {DAY: "%Y%m%d", MONTH: "%Y%m"}
+
+
+def period_start(day: date, interval: str) -> date:
+    return day if interval == DAY else day.replace(day=1)
+
+
+def next_period(start: date, interval: str) -> date:
+    if interval == DAY:
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table: str, start: date, interval: str) -> str:
+    return f"{table}_p{start.strftime(_NAME_FORMATS[interval])}"
+
+
+def partition_start(table: str, name: str, interval: str) -> date | None:
+    """Start of the period of the partition `name`, None if it is not one of them."""
+    digits = 8 if interval == DAY else 6
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{{digits}}})", name)
+    if match is None:
+        return None
+    value = match.group(1)
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]) if digits == 8 else 1)
+
+
+def partition_bounds(start: date, interval: str) -> str:
+    """`FROM ... TO ...` bounds of the period that begins on `start`, in UTC."""
+    end = next_period(start, interval)
+    return (
+        f"FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    )
+
+
+def create_partition_sql(table: str, start: date, interval: str) -> str:
+    """DDL of the partition of `table` holding the period that begins on `start`."""
+    name = partition_name(table, start, interval)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES {partition_bounds(start, interval)}"
+    )
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def is_partition(table: str, name: str) -> bool:
+    """Whether `name` is one of the partitions of `table` this module creates."""
+    return name == default_partition_name(table) or any(
+        partition_start(table, name, interval) is not None for interval in INTERVALS
+    )
+
+
+def periods(first: date, last: date, interval: str) -> list[date]:
+    """Starts of the periods from the one of `first` to the one of `last`."""
+    starts, start = [], period_start(first, interval)
+    while start <= last:
+        starts.append(start)
+        start = next_period(start, interval)
+    return starts
+
+
+async def list_partitions(connection: AsyncConnection, table: str) -> list[str]:
+    response = await connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": f'"{table}"'},
+    )
+    return list(response.scalars())
+
+
+async def create_partition(
+    connection: AsyncConnection, table: str, column: str, start: date, interval: str
+) -> None:
+    """Create the partition of the period that begins on `start`.
+
+    Rows of the period already stored in the default partition, e.g. because
+    partitions were not created in time, are moved into the new one, which
+    Postgres requires before the period can get its own partition.
+    """
+    name = partition_name(table, start, interval)
+    default = default_partition_name(table)
+    bounds = {
+        "start": datetime.combine(start, time(), timezone.utc),
+        "end": datetime.combine(next_period(start, interval), time(), timezone.utc),
+    }
+    period = f'"{column}" >= :start AND "{column}" < :end'
+    response = await connection.execute(
+        text(f'SELECT 1 FROM "{default}" WHERE {period} LIMIT 1'), bounds
+    )
+    if response.first() is None:
+        await connection.execute(text(create_partition_sql(table, start, interval)))
+        return
+    await connection.execute(
+        text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)')
+    )
+    await connection.execute(
+        text(
+            f'WITH moved AS (DELETE FROM "{default}" WHERE {period} RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved'
+        ),
+        bounds,
+    )
+    await connection.execute(
+        text(
+            f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" '
+            f"FOR VALUES {partition_bounds(start, interval)}"
+        )
+    )
+
+
+async def maintain_partitions(
+    connection: AsyncConnection,
+    table: str,
+    column: str,
+    interval: str,
+    *,
+    ahead: int,
+    retention_days: int,
+    today: date | None = None,
+) -> tuple[list[str], list[str]]:
+    """Create the partitions of the next `ahead` periods and drop the expired ones.
+
+    A partition expires once its whole period is older than `retention_days`
+    (0 keeps every partition). Dropping a partition removes its rows without
+    scanning or vacuuming them. Returns the created and the dropped partitions.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown partition interval: {interval}")
+    today = today or datetime.now(timezone.utc).date()
+    existing = set(await list_partitions(connection, table))
+    existing.discard(default_partition_name(table))
+    starts = periods(today, today, interval)
+    for _ in range(ahead):
+        starts.append(next_period(starts[-1], interval))
+    created = []
+    for start in starts:
+        name = partition_name(table, start, interval)
+        if name not in existing:
+            await create_partition(connection, table, column, start, interval)
+            created.append(name)
+
+    dropped = []
+    if retention_days > 0:
+        cutoff = today - timedelta(days=retention_days)
+        for name in sorted(existing):
+            start = partition_start(table, name, interval)
+            if start is not None and next_period(start, interval) <= cutoff:
+                await connection.execute(text(f'DROP TABLE "{name}"'))
+                dropped.append(name)
+    return created, dropped
@@ -2,7 +2,7 @@ import json
 import logging
 import time
 from datetime import datetime
-from typing import Callable
+from typing import Any, Callable
 
 import starlette
 from fastapi import BackgroundTasks, Request
@@ -12,7 +12,17 @@ from httpx import Request as HttpxRequest
 from httpx import Response as HttpxResponse
 
 from app import crud, exceptions, models, schemas
+from app.core.config import settings
 from app.db import session as db_session
+from app.log.policy import (
+    LogPolicy,
+    mask_data,
+    mask_secrets,
+    path_logged,
+    truncate,
+)
+from app.log.sinks import make_sink
+from app.log.writer import RequestLogWriter
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +31,15 @@ _UNSECURE_KEYS = [
     "password",
 ]
 
+request_log_writer = RequestLogWriter(
+    batch_size=settings.REQUEST_LOG_BATCH_SIZE,
+    flush_interval=settings.REQUEST_LOG_FLUSH_INTERVAL,
+    max_size=settings.REQUEST_LOG_BUFFER_SIZE,
+    overflow=settings.REQUEST_LOG_OVERFLOW,
+)
+request_log_sink = make_sink(settings.REQUEST_LOG_SINK)
+default_log_policy = LogPolicy()
+
 
 async def save_request_log(
     request: Request | HttpxRequest,
@@ -31,7 +50,10 @@ async def save_request_log(
     user_id: int | None = None,
     request_log_type: models.RequestLogType = models.RequestLogType.Outgoing,
     start_processing_at: float | None = None,
+    max_body_size: int | None = None,
 ) -> None:
+    if max_body_size is None:
+        max_body_size = settings.REQUEST_LOG_MAX_BODY_SIZE
     try:
         client_host = request.client.host
     except:
@@ -56,13 +78,44 @@ async def save_request_log(
 
     method = request.method
     request_data = {
-        "body": {},
+        "body": await read_request_body(request, max_body_size),
         "path_params": path_params,
         "query_params": query_params,
     }
+    response_data = read_response_data(response, max_body_size)
+
+    request_log_data = {
+        "service_name": service_name,
+        "method": method,
+        "ip": client_host,
+        "request": json.dumps(request_data),
+        "response": response_data,
+        "trace": trace_back,
+        "processing_time": str(processing_time),
+        "tracker_id": str(tracker_id) if tracker_id != None else "",
+        "user_id": user_id,
+        "type": request_log_type,
+        "status_code": status_code,
+        "start_processing_at": (
+            datetime.fromtimestamp(start_processing_at) if start_processing_at else None
+        ),
+    }
+
+    try:
+        request_log_in = schemas.RequestLogCreate(**request_log_data)
+        await store_request_log(request_log_in)
+    except Exception as e:
+        logger.error(f"save request log err: {type(e)}, {e}")
+
+
+async def read_request_body(request: Request | HttpxRequest, max_body_size: int) -> Any:
+    """The body of `request` as it is logged, masked and cut at `max_body_size`."""
+    body = {}
     try:
         if type(request) == Request:
-            request_data["body"] = await request.json()
+            # returns the body read by the endpoint, it cannot be received
+            # again once the response was sent
+            body = capture_body(await request.body(), max_body_size)
 
         elif type(request) == HttpxRequest:
             if (
@@ -70,9 +123,13 @@ async def save_request_log(
                 and hasattr(request.headers, "get")
                 and "xml" in request.headers.get("content-type")
             ):
-                request_data["body"] = {"xml_body": request.content.decode()}
+                body = {
+                    "xml_body": mask_secrets(
+                        truncate(request.content, max_body_size), _UNSECURE_KEYS
+                    )
+                }
             else:
-                request_data["body"] = json.loads(request.content)
+                body = capture_body(request.content, max_body_size)
         else:
             logger.error(f"extract request, request type: {type(request)}")
     except RuntimeError:
@@ -81,11 +138,13 @@ async def save_request_log(
         pass
     except Exception as e:
         logger.error(f"extract request body error: {e} {type(e)}")
+    return body
 
-    for unsecure_key in _UNSECURE_KEYS:
-        if request_data["body"].get(unsecure_key):
-            request_data["body"][unsecure_key] = "*****"
 
+def read_response_data(
+    response: Response | HttpxResponse | str | None, max_body_size: int
+) -> str:
+    """The logged form of `response`, an exception message or a response body."""
     response_data = ""
     if response:
         if type(response) is str:
@@ -103,45 +162,58 @@ async def save_request_log(
             and hasattr(response.headers, "get")
             and "xml" in response.headers.get("content-type", "")
         ):
-            response_data = json.dumps({"xml_body": response.content.decode()})
+            response_data = json.dumps(
+                {"xml_body": truncate(response.content, max_body_size)}
+            )
         else:
             try:
-                response_data = response.body.decode()
+                response_data = truncate(response.body, max_body_size)
             except Exception as e:
-                response_data = str(response.content.decode())
+                response_data = truncate(response.content, max_body_size)
+    return response_data
 
-    request_log_data = {
-        "service_name": service_name,
-        "method": method,
-        "ip": client_host,
-        "request": json.dumps(request_data),
-        "response": response_data,
-        "trace": trace_back,
-        "processing_time": str(processing_time),
-        "tracker_id": str(tracker_id) if tracker_id != None else "",
-        "user_id": user_id,
-        "type": request_log_type,
-        "status_code": status_code,
-        "start_processing_at": (
-            datetime.fromtimestamp(start_processing_at) if start_processing_at else None
-        ),
-    }
 
-    # TODO: save with celery
-    try:
-        request_log_in = schemas.RequestLogCreate(**request_log_data)
+async def store_request_log(request_log_in: schemas.RequestLogCreate) -> None:
+    """Hand the log to the sink, else to the batch writer, else write it now."""
+    if request_log_sink is not None:
+        try:
+            await request_log_sink.send(request_log_in)
+            return
+        except Exception as e:
+            logger.error(f"send request log err: {type(e)}, {e}, saving it here")
 
-        async with db_session.async_session() as db:
-            await crud.request_log.create(db=db, obj_in=request_log_in)
-            await db.commit()
+    if request_log_writer.running:
+        # written with the next batch, see `RequestLogWriter`
+        request_log_writer.put(request_log_in.model_dump())
+        return
 
-    except Exception as e:
-        logger.error(f"save request log err: {type(e)}, {e}")
+    async with db_session.async_session() as db:
+        await crud.request_log.create(db=db, obj_in=request_log_in)
+        await db.commit()
+
+
+def capture_body(body: bytes, max_body_size: int) -> Any:
+    """The JSON `body`, or its text cut at `max_body_size` bytes if longer.
+
+    The values of `_UNSECURE_KEYS` are masked in every case, including
+    form-encoded and other non-JSON bodies.
+    """
+    if not body:
+        return {}
+    if max_body_size and len(body) > max_body_size:
+        return mask_secrets(truncate(body, max_body_size), _UNSECURE_KEYS)
+    try:
+        return mask_data(json.loads(body), _UNSECURE_KEYS)
+    except ValueError:
+        return mask_secrets(body.decode(errors="replace"), _UNSECURE_KEYS)
 
 
 class LogRoute(APIRoute):
+    """Logs the requests of a router, as its `LogPolicy` (`log_policy`) allows."""
+
     def get_route_handler(self) -> Callable:
         original_route_handler = super().get_route_handler()
+        policy = getattr(self.endpoint, "log_policy", default_log_policy)
 
         async def custom_route_handler(request: Request) -> Response:
             start_time = time.time()
@@ -151,6 +223,10 @@ class LogRoute(APIRoute):
                 response = await exceptions.handle_exception(request, e)
 
             processing_time = round(time.time() - start_time, 4)
+            if not path_logged(request.url.path) or not policy.should_log(
+                response.status_code, processing_time
+            ):
+                return response
             tracker_id = None
             try:
                 tracker_id = request.state.tracker_id
@@ -175,6 +251,7 @@ class LogRoute(APIRoute):
                     user_id,
                     models.RequestLogType.Incoming,
                     start_time,
+                    max_body_size=policy.max_body_size,
                 )
                 response.background = tasks
             else:
@@ -188,6 +265,7 @@ class LogRoute(APIRoute):
                     user_id,
                     models.RequestLogType.Incoming,
                     start_time,
+                    max_body_size=policy.max_body_size,
                 )
             return response
 
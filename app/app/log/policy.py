@@ -0,0 +1,120 @@
+import random
+import re
+from typing import Any, Callable
+
+from app.core.config import settings
+
+# which requests `LogRoute` logs
+ALL = "all"
+ERRORS = "errors"
+SLOW = "slow"
+ERRORS_AND_SLOW = "errors_and_slow"
+MODES = (ALL, ERRORS, SLOW, ERRORS_AND_SLOW)
+
+TRUNCATED = "...[truncated {} bytes]"
+
+
+class LogPolicy:
+    """Decides which requests of a route are logged and how much of them.
+
+    Errors (status >= 400) and requests slower than `slow_threshold` seconds
+    are always logged in the `all` mode, other requests with a probability of
+    `sample_rate`. The other modes log only errors, only slow requests, or both.
+    Bodies are captured up to `max_body_size` bytes (0 for no limit).
+    Unset arguments default to the `REQUEST_LOG_*` settings.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float | None = None,
+        mode: str | None = None,
+        slow_threshold: float | None = None,
+        max_body_size: int | None = None,
+    ):
+        mode = settings.REQUEST_LOG_MODE if mode is None else mode
+        if mode not in MODES:
+            raise ValueError(f"Unknown request log mode: {mode}")
+        self.mode = mode
+        self.sample_rate = (
+            settings.REQUEST_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        )
+        self.slow_threshold = (
+            settings.REQUEST_LOG_SLOW_THRESHOLD
+            if slow_threshold is None
+            else slow_threshold
+        )
+        self.max_body_size = (
+            settings.REQUEST_LOG_MAX_BODY_SIZE
+            if max_body_size is None
+            else max_body_size
+        )
+
+    def should_log(self, status_code: int | None, processing_time: float) -> bool:
+        error = status_code is None or status_code >= 400
+        slow = processing_time >= self.slow_threshold
+        if self.mode == ERRORS:
+            return error
+        if self.mode == SLOW:
+            return slow
+        if self.mode == ERRORS_AND_SLOW:
+            return error or slow
+        return error or slow or random.random() < self.sample_rate
+
+
+def log_policy(**kwargs: Any) -> Callable:
+    """Set the `LogPolicy` of an endpoint of a `LogRoute` router.
+
+    e.g. `@log_policy(sample_rate=0.01, max_body_size=1024)`
+    """
+
+    def decorator(func: Callable) -> Callable:
+        func.log_policy = LogPolicy(**kwargs)
+        return func
+
+    return decorator
+
+
+def path_logged(
+    path: str,
+    include: tuple[str, ...] = tuple(settings.request_log_include_paths),
+    exclude: tuple[str, ...] = tuple(settings.request_log_exclude_paths),
+) -> bool:
+    """Whether `path` starts with an `include` prefix (if any) and no `exclude` one."""
+    if exclude and path.startswith(exclude):
+        return False
+    return not include or path.startswith(include)
+
+
+def truncate(data: bytes | str, max_size: int) -> str:
+    """`data` as text, cut at `max_size` bytes with a marker of what was left out."""
+    if isinstance(data, str):
+        data = data.encode()
+    if max_size and len(data) > max_size:
+        text = data[:max_size].decode(errors="ignore")
+        return text + TRUNCATED.format(len(data) - max_size)
+    return data.decode(errors="replace")
+
+
+def mask_secrets(text: str, keys: list[str]) -> str:
+    """Replace the values of `keys` in the JSON, form-encoded or XML `text`.
+
+    Values cut off by `truncate` are masked as well.
+    """
+    for key in keys:
+        key = re.escape(key)
+        text = re.sub(rf'("{key}"\s*:\s*)"[^"]*"?', r'\1"*****"', text)
+        text = re.sub(rf"((?:^|[&?]){key}=)[^&]*", r"\1*****", text)
+        text = re.sub(rf"(<{key}>)[^<]*", r"\1*****", text)
+    return text
+
+
+def mask_data(data: Any, keys: list[str]) -> Any:
+    """Copy of the parsed JSON `data` with the values of `keys` masked at any depth."""
+    if isinstance(data, dict):
+        return {
+            key: "*****" if key in keys and value else mask_data(value, keys)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [mask_data(item, keys) for item in data]
+    return data
@@ -0,0 +1,250 @@
+"""Minute and hour rollups of request logs, for latency and error dashboards."""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+from sqlalchemy import Float, and_, delete, func, literal_column, select
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.models import RequestLog, RequestLogRollup
+
+MINUTE = "minute"
+HOUR = "hour"
+RESOLUTIONS = (MINUTE, HOUR)
+# upper bounds (seconds) of the `processing_time` histogram buckets
+LATENCY_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# a rollup run never reads logs older than this, e.g. after a long outage
+MAX_CATCH_UP = timedelta(days=1)
+KEY_FIELDS = ("bucket_start", "method", "service_name", "status_code")
+
+
+def truncate(moment: datetime, resolution: str) -> datetime:
+    moment = moment.astimezone(timezone.utc).replace(second=0, microsecond=0)
+    return moment.replace(minute=0) if resolution == HOUR else moment
+
+
+def empty_rollup() -> dict[str, Any]:
+    return {
+        "count": 0,
+        "total_time": 0.0,
+        "max_time": 0.0,
+        "histogram": [0] * (len(LATENCY_BOUNDS) + 1),
+    }
+
+
+def merge(rollup: dict[str, Any], other: Any) -> None:
+    """Add the counts of `other` (a rollup row or dict) to `rollup`."""
+    get = other.get if isinstance(other, dict) else lambda key: getattr(other, key)
+    rollup["count"] += get("count")
+    rollup["total_time"] += get("total_time")
+    rollup["max_time"] = max(rollup["max_time"], get("max_time"))
+    rollup["histogram"] = [
+        a + b for a, b in zip(rollup["histogram"], get("histogram"), strict=True)
+    ]
+
+
+def percentile(histogram: list[int], q: float, max_time: float) -> float | None:
+    """Estimate of the `q` quantile, interpolated inside its histogram bucket."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank, seen = q * total, 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = LATENCY_BOUNDS[i - 1] if i else 0.0
+            upper = LATENCY_BOUNDS[i] if i < len(LATENCY_BOUNDS) else max_time
+            upper = min(upper, max_time)
+            return lower + max(upper - lower, 0.0) * (rank - seen) / count
+        seen += count
+    return max_time
+
+
+async def aggregate_logs(
+    db: AsyncSession, start: datetime, end: datetime
+) -> list[dict[str, Any]]:
+    """Minute rollups of the logs created in [`start`, `end`)."""
+    # the expressions are grouped by label: repeating them would bind their
+    # constants twice, which Postgres does not see as the same expression
+    key = (
+        func.date_trunc(MINUTE, RequestLog.created).label("log_minute"),
+        func.coalesce(RequestLog.method, "").label("log_method"),
+        func.split_part(func.coalesce(RequestLog.service_name, ""), "?", 1).label(
+            "log_path"
+        ),
+        func.coalesce(RequestLog.status_code, 0).label("log_status_code"),
+        func.width_bucket(
+            RequestLog.processing_time, array(LATENCY_BOUNDS, type_=Float)
+        ).label("log_latency_bucket"),
+    )
+    query = (
+        select(
+            *key,
+            func.count(),
+            func.coalesce(func.sum(RequestLog.processing_time), 0.0),
+            func.coalesce(func.max(RequestLog.processing_time), 0.0),
+        )
+        .where(and_(RequestLog.created >= start, RequestLog.created < end))
+        .group_by(*(literal_column(column.name) for column in key))
+    )
+    rollups: dict[tuple, dict[str, Any]] = defaultdict(empty_rollup)
+    for *row_key, index, count, total_time, max_time in await db.execute(query):
+        row_key[0] = truncate(row_key[0], MINUTE)
+        rollup = rollups[tuple(row_key)]
+        rollup["count"] += count
+        rollup["total_time"] += total_time
+        rollup["max_time"] = max(rollup["max_time"], max_time)
+        if index is not None:
+            # logs without a processing time are counted, but not in the histogram
+            rollup["histogram"][index] += count
+    return [
+        {"resolution": MINUTE, **dict(zip(KEY_FIELDS, row_key, strict=True)), **rollup}
+        for row_key, rollup in rollups.items()
+    ]
+
+
+async def aggregate_hours(
+    db: AsyncSession, start: datetime, end: datetime
+) -> list[dict[str, Any]]:
+    """Hour rollups of the hours in [`start`, `end`), summed from minute rollups."""
+    rows = await get_rollups(db, MINUTE, truncate(start, HOUR), end)
+    rollups: dict[tuple, dict[str, Any]] = defaultdict(empty_rollup)
+    for row in rows:
+        row_key = (
+            truncate(row.bucket_start, HOUR),
+            *(getattr(row, field) for field in KEY_FIELDS[1:]),
+        )
+        merge(rollups[row_key], row)
+    return [
+        {"resolution": HOUR, **dict(zip(KEY_FIELDS, row_key, strict=True)), **rollup}
+        for row_key, rollup in rollups.items()
+    ]
+
+
+async def get_rollups(
+    db: AsyncSession,
+    resolution: str,
+    start: datetime,
+    end: datetime,
+    **filters: Any,
+) -> list[RequestLogRollup]:
+    query = select(RequestLogRollup).where(
+        and_(
+            RequestLogRollup.resolution == resolution,
+            RequestLogRollup.bucket_start >= start,
+            RequestLogRollup.bucket_start < end,
+            *(
+                getattr(RequestLogRollup, field) == value
+                for field, value in filters.items()
+                if value is not None
+            ),
+        )
+    )
+    response = await db.execute(query)
+    return response.scalars().all()
+
+
+async def save_rollups(db: AsyncSession, rollups: Iterable[dict[str, Any]]) -> None:
+    # a bucket is recomputed as a whole, so the new row replaces the stored one
+    await crud.request_log_rollup.create_bulk(
+        db,
+        list(rollups),
+        on_conflict="update",
+        conflict_columns=("resolution", *KEY_FIELDS),
+    )
+
+
+async def rollup_request_logs(
+    db: AsyncSession, lookback: timedelta, now: datetime | None = None
+) -> tuple[int, int]:
+    """Recompute the rollups of the last `lookback`, return how many were saved.
+
+    Windows overlap from one run to the next, so logs written late (batched or
+    sent through a worker) are still counted. After a gap, the run starts from
+    the last minute rolled up, at most `MAX_CATCH_UP` ago.
+    """
+    now = now or datetime.now(timezone.utc)
+    end = truncate(now, MINUTE) + timedelta(minutes=1)
+    response = await db.execute(
+        select(func.max(RequestLogRollup.bucket_start)).where(
+            RequestLogRollup.resolution == MINUTE
+        )
+    )
+    latest = response.scalar_one_or_none()
+    start = now - lookback
+    if latest is not None:
+        start = min(start, latest)
+    start = truncate(max(start, now - MAX_CATCH_UP), MINUTE)
+
+    minutes = await aggregate_logs(db, start, end)
+    if minutes:
+        await save_rollups(db, minutes)
+    hours = await aggregate_hours(db, start, end)
+    if hours:
+        await save_rollups(db, hours)
+    return len(minutes), len(hours)
+
+
+def retention_cutoffs(
+    now: datetime, minute_retention_days: int, hour_retention_days: int
+) -> dict[str, datetime]:
+    """Per resolution, the bucket start before which rollups expire (0 keeps them)."""
+    days = {MINUTE: minute_retention_days, HOUR: hour_retention_days}
+    return {
+        resolution: truncate(now - timedelta(days=days[resolution]), resolution)
+        for resolution in RESOLUTIONS
+        if days[resolution] > 0
+    }
+
+
+async def prune_rollups(
+    db: AsyncSession,
+    minute_retention_days: int,
+    hour_retention_days: int,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """Delete the expired rollups, return how many per resolution."""
+    cutoffs = retention_cutoffs(
+        now or datetime.now(timezone.utc), minute_retention_days, hour_retention_days
+    )
+    pruned = {}
+    for resolution, cutoff in cutoffs.items():
+        response = await db.execute(
+            delete(RequestLogRollup).where(
+                and_(
+                    RequestLogRollup.resolution == resolution,
+                    RequestLogRollup.bucket_start < cutoff,
+                )
+            )
+        )
+        pruned[resolution] = response.rowcount
+    await db.commit()
+    return pruned
+
+
+def summarize(rows: Iterable[Any], seconds: float) -> dict[str, Any]:
+    """Dashboard figures of rollup rows covering `seconds` seconds."""
+    rollup = empty_rollup()
+    errors = 0
+    for row in rows:
+        merge(rollup, row)
+        if row.status_code >= 500:
+            errors += row.count
+    count, histogram, max_time = (
+        rollup["count"],
+        rollup["histogram"],
+        rollup["max_time"],
+    )
+    return {
+        "count": count,
+        "error_count": errors,
+        "error_rate": errors / count if count else 0.0,
+        "throughput": count / seconds if seconds > 0 else 0.0,
+        "avg_time": rollup["total_time"] / count if count else None,
+        "max_time": max_time if count else None,
+        "p50": percentile(histogram, 0.5, max_time),
+        "p95": percentile(histogram, 0.95, max_time),
+        "p99": percentile(histogram, 0.99, max_time),
+    }
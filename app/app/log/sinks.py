@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable
+
+from redis import ResponseError
+
+from app import schemas
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.log.writer import RequestLogWriter
+
+logger = logging.getLogger(__name__)
+
+# where `save_request_log` sends logs, "db" writes them from the API process
+DB = "db"
+STREAM = "stream"
+CELERY = "celery"
+SINKS = (DB, STREAM, CELERY)
+
+SAVE_TASK = "app.celery.worker.save_request_logs"
+CONSUME_TASK = "app.celery.worker.consume_request_logs"
+QUEUE = "main-queue"
+GROUP = "request-log-writers"
+
+
+class RequestLogSink:
+    """Hands request logs over to a worker, which persists them."""
+
+    async def send(self, log: schemas.RequestLogCreate) -> None:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        """Start the background work of the sink, if it has any."""
+
+    async def stop(self) -> None:
+        """Hand over the logs the sink still holds."""
+
+
+class StreamSink(RequestLogSink):
+    """Appends logs to a Redis Stream, read by `consume_request_logs` workers.
+
+    The stream is capped at about `max_length` entries, so it cannot exhaust
+    the memory of Redis when no worker keeps up.
+    """
+
+    def __init__(self, redis_client: Any, stream: str, max_length: int):
+        self.redis = redis_client
+        self.stream = stream
+        self.max_length = max_length
+
+    async def send(self, log: schemas.RequestLogCreate) -> None:
+        await self.redis.xadd(
+            self.stream,
+            {"log": log.model_dump_json()},
+            maxlen=self.max_length,
+            approximate=True,
+        )
+
+
+class CelerySink(RequestLogSink):
+    """Sends logs in batches, one `save_request_logs` task per batch.
+
+    Between `start` and `stop`, logs are buffered by a `RequestLogWriter` built
+    with `writer_options`, so a worker writes a whole batch per task. Otherwise
+    each log is sent as its own task.
+    """
+
+    def __init__(self, **writer_options: Any):
+        self.writer = RequestLogWriter(write=self.send_batch, **writer_options)
+
+    async def send(self, log: schemas.RequestLogCreate) -> None:
+        row = log.model_dump(mode="json")
+        if self.writer.running:
+            self.writer.put(row)
+        else:
+            await self.send_batch([row])
+
+    async def send_batch(self, rows: list[dict[str, Any]]) -> None:
+        logs = [json.dumps(row) for row in rows]
+        # publishing blocks on the broker connection, keep it off the event loop
+        await asyncio.to_thread(
+            celery_app.send_task, SAVE_TASK, args=[logs], queue=QUEUE
+        )
+
+    def start(self) -> None:
+        self.writer.start()
+
+    async def stop(self) -> None:
+        await self.writer.stop()
+
+
+def make_sink(name: str) -> RequestLogSink | None:
+    """Return the sink called `name`, None for `db`."""
+    if name == STREAM:
+        from app.utils import redis_client
+
+        return StreamSink(
+            redis_client,
+            settings.REQUEST_LOG_STREAM,
+            settings.REQUEST_LOG_STREAM_MAX_LENGTH,
+        )
+    if name == CELERY:
+        return CelerySink(
+            batch_size=settings.REQUEST_LOG_BATCH_SIZE,
+            flush_interval=settings.REQUEST_LOG_FLUSH_INTERVAL,
+            max_size=settings.REQUEST_LOG_BUFFER_SIZE,
+            overflow=settings.REQUEST_LOG_OVERFLOW,
+        )
+    if name != DB:
+        raise ValueError(f"Unknown request log sink: {name}")
+    return None
+
+
+def parse_logs(logs: list[str]) -> list[dict[str, Any]]:
+    """Rows of serialized logs, skipping (and logging) malformed ones."""
+    rows = []
+    for log in logs:
+        try:
+            rows.append(schemas.RequestLogCreate.model_validate_json(log).model_dump())
+        except ValueError as e:
+            logger.error(f"invalid request log dropped: {e}")
+    return rows
+
+
+async def consume_stream(
+    redis_client: Any,
+    persist: Callable[[list[dict[str, Any]]], Awaitable[Any]],
+    *,
+    stream: str,
+    consumer: str,
+    batch_size: int = 500,
+    max_batches: int | None = None,
+    claim_idle_time: int = 60_000,
+) -> int:
+    """Persist the logs of `stream` in batches, return how many.
+
+    New entries are read until the stream is drained or `max_batches` batches
+    were read, so a run started by beat ends before the next one when the
+    stream grows faster than it is consumed.
+
+    Entries are read through the `GROUP` consumer group and acknowledged only once
+    `persist` returned, so the logs of a worker that crashed in between stay
+    pending. Entries pending for more than `claim_idle_time` milliseconds are
+    claimed again before new ones are read.
+    """
+    try:
+        await redis_client.xgroup_create(stream, GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+    async def handle(entries: list) -> int:
+        if not entries:
+            return 0
+        ids = [entry_id for entry_id, _ in entries]
+        rows = parse_logs([fields["log"] for _, fields in entries if fields])
+        if rows:
+            await persist(rows)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.xack(stream, GROUP, *ids)
+            pipe.xdel(stream, *ids)
+            await pipe.execute()
+        return len(rows)
+
+    total = 0
+    start_id = "0-0"
+    while True:
+        next_id, claimed, *_ = await redis_client.xautoclaim(
+            stream,
+            GROUP,
+            consumer,
+            min_idle_time=claim_idle_time,
+            start_id=start_id,
+            count=batch_size,
+        )
+        total += await handle(claimed)
+        # some servers return the last claimed id instead of "0-0" once the
+        # pending entries are scanned, stop as soon as nothing more comes back
+        if not claimed or next_id in ("0-0", b"0-0", start_id):
+            break
+        start_id = next_id
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        response = await redis_client.xreadgroup(
+            GROUP, consumer, {stream: ">"}, count=batch_size
+        )
+        if not response:
+            break
+        total += await handle(response[0][1])
+        batches += 1
+    return total
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from app import crud
+from app.db import session as db_session
+
+logger = logging.getLogger(__name__)
+
+# what `put` does when the buffer is full
+DROP_NEW = "drop_new"
+DROP_OLDEST = "drop_oldest"
+OVERFLOW_POLICIES = (DROP_NEW, DROP_OLDEST)
+
+
+async def insert_request_logs(rows: list[dict[str, Any]]) -> None:
+    async with db_session.async_session() as db:
+        await crud.request_log.create_bulk(db, rows)
+
+
+class RequestLogWriter:
+    """Buffers request logs in memory and writes them in batches.
+
+    Rows are flushed with one multi-row `INSERT` once `batch_size` of them are
+    buffered, and at least every `flush_interval` seconds, so logging costs
+    one connection checkout and one commit per batch instead of per request.
+    The buffer holds at most `max_size` rows; while Postgres is too slow to keep
+    up, `overflow` decides whether new rows or the oldest ones are dropped.
+    Another `write` can take the batches instead of Postgres, such as a queue.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_size: int = 10_000,
+        overflow: str = DROP_NEW,
+        write: Callable[[list[dict[str, Any]]], Awaitable[Any]] = insert_request_logs,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.overflow = overflow
+        self.write = write
+        self.buffer: deque[dict[str, Any]] = deque()
+        self.dropped = 0
+        self._ready = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def put(self, row: dict[str, Any]) -> bool:
+        """Buffer `row`, return False if it was dropped."""
+        if len(self.buffer) >= self.max_size:
+            self.dropped += 1
+            if self.overflow == DROP_NEW:
+                return False
+            self.buffer.popleft()
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size:
+            self._ready.set()
+        return True
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write the rows still buffered."""
+        if self._task is not None:
+            # let the batch being written finish instead of cancelling it
+            self._stopping = True
+            self._ready.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        while self.buffer:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write up to `batch_size` buffered rows, return how many were written."""
+        batch = [
+            self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))
+        ]
+        if self.dropped:
+            logger.warning(f"request log buffer full, dropped {self.dropped} logs")
+            self.dropped = 0
+        if not batch:
+            return 0
+        try:
+            await self.write(batch)
+        except Exception as e:
+            logger.error(f"save request logs err: {type(e)}, {e}, {len(batch)} lost")
+            return 0
+        return len(batch)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self.buffer) < self.batch_size and not self._stopping:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            await self.flush()
@@ -18,8 +18,11 @@ from starlette.middleware.cors import CORSMiddleware
 from app.api.api_v1.api import api_router
 from app.core.config import settings
 from app.core.middleware.get_accept_language_middleware import AcceptLanguageMiddleware
+from app.db.session import async_session
 from app.exceptions import exception_handlers
+from app.log.log import request_log_sink, request_log_writer
 from app.models import User
+from app.utils import redis_health, redis_pool_options
 from cache import Cache
 
 from richapi.exc_parser.openapi import enrich_openapi
@@ -49,8 +52,31 @@ async def lifespan(app: FastAPI):
         prefix="api-cache",
         response_header="X-API-Cache",
         ignore_arg_types=[Request, Response, Session, AsyncSession, User],
+        local_cache_size=settings.CACHE_LOCAL_MAX_SIZE,
+        local_cache_ttl=settings.CACHE_LOCAL_TTL,
+        refresh_dependencies={AsyncSession: async_session},
+        codec=settings.CACHE_CODEC,
+        compression=settings.CACHE_COMPRESSION,
+        compress_min_size=settings.CACHE_COMPRESS_MIN_SIZE,
+        log_events=settings.CACHE_LOG_EVENTS,
+        pool_options=redis_pool_options,
+        breaker_failure_threshold=settings.CACHE_BREAKER_FAILURE_THRESHOLD,
+        breaker_reset_timeout=settings.CACHE_BREAKER_RESET_TIMEOUT,
+        backend=settings.CACHE_BACKEND,
+        nodes=settings.cache_nodes,
     )
+    await redis_cache.start_invalidation_listener()
+    redis_health.start()
+    request_log_writer.start()
+    if request_log_sink is not None:
+        request_log_sink.start()
     yield
+    if request_log_sink is not None:
+        await request_log_sink.stop()
+    await request_log_writer.stop()
+    await redis_health.stop()
+    await redis_cache.stop_invalidation_listener()
+    await redis_cache.stop_reconnecting()
 
 
 app = FastAPI(
@@ -1,4 +1,4 @@
-from .request_log import RequestLog, RequestLogType
+from .request_log import RequestLog, RequestLogRollup, RequestLogType
 from .user import User
 from .ecommerce import (
     AuthToken,
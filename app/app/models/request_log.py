@@ -1,7 +1,18 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, Integer, String, Text
+from sqlalchemy import (
+    ARRAY,
+    DDL,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base_class import Base
@@ -14,14 +25,26 @@ class RequestLogType(enum.StrEnum):
 
 
 class RequestLog(Base):
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # partitioned by `created`, see `app.db.partitions`; rows that no partition
+    # covers land in the default one
+    __table_args__ = (
+        Index("ix_requestlog_user_id_created", "user_id", "created"),
+        Index("ix_requestlog_status_code_created", "status_code", "created"),
+        {"postgresql_partition_by": "RANGE (created)"},
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # part of the primary key, as every unique constraint of a partitioned table
+    created: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.now, primary_key=True, index=True
+    )
 
     user_id: Mapped[int | None] = mapped_column(Integer)
     method: Mapped[str | None] = mapped_column(String(10))
     service_name: Mapped[str | None] = mapped_column(Text)
     processing_time: Mapped[float | None] = mapped_column(Float)
     status_code: Mapped[int | None] = mapped_column(Integer)
-    tracker_id: Mapped[str | None] = mapped_column(String(100))
+    tracker_id: Mapped[str | None] = mapped_column(String(100), index=True)
     ip: Mapped[str | None] = mapped_column(String(50))
     request: Mapped[str | None] = mapped_column(Text)
     response: Mapped[str | None] = mapped_column(Text)
@@ -33,3 +56,43 @@ class RequestLog(Base):
 
     def __str__(self):
         return f"{self.method=},{self.service_name=},{self.user_id=},{self.ip=},{self.tracker_id=}"
+
+
+class RequestLogRollup(Base):
+    """Request count and latency histogram of one minute or hour of request logs,
+    per method, path (`service_name` without its query) and status code."""
+
+    __table_args__ = (
+        UniqueConstraint(
+            "resolution",
+            "bucket_start",
+            "method",
+            "service_name",
+            "status_code",
+            name="uq_requestlogrollup_bucket",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # minute | hour
+    resolution: Mapped[str] = mapped_column(String(10))
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    method: Mapped[str] = mapped_column(String(10))
+    service_name: Mapped[str] = mapped_column(Text)
+    # 0 for logs without a status code
+    status_code: Mapped[int] = mapped_column(Integer)
+    count: Mapped[int] = mapped_column(Integer)
+    # sum and max of `processing_time` (seconds)
+    total_time: Mapped[float] = mapped_column(Float)
+    max_time: Mapped[float] = mapped_column(Float)
+    # requests per `app.log.rollup.LATENCY_BOUNDS` bucket, the last one is unbounded
+    histogram: Mapped[list[int]] = mapped_column(ARRAY(Integer))
+
+
+event.listen(
+    RequestLog.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS requestlog_default PARTITION OF requestlog DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
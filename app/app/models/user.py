@@ -29,7 +29,11 @@ class User(Base):
     email: Mapped[str | None] = mapped_column(String, unique=True, index=True)
     email_verified: Mapped[bool] = mapped_column(Boolean(), default=False, nullable=False)
     phone_number: Mapped[str] = mapped_column(String(20), unique=True, index=True, nullable=False)
-    hashed_password: Mapped[str] = mapped_column(String, nullable=False)
+    # loaded only when asked for (`undefer`), reading it otherwise raises instead
+    # of a lazy load; rows from the entity cache never have it
+    hashed_password: Mapped[str] = mapped_column(
+        String, nullable=False, deferred=True, deferred_raiseload=True
+    )
     is_active: Mapped[bool] = mapped_column(
         Boolean(), default=True, nullable=False, index=True
     )
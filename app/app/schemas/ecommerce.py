@@ -62,6 +62,8 @@ class ProductFilter(BaseModel):
     max_price: float | None = None
     page: int = 1
     size: int = 20
+    # keyset pagination, replaces `page` when set ("" for the first page)
+    cursor: str | None = None
 
 
 class ProductVariantOut(BaseModel):
@@ -56,3 +56,46 @@ class RequestLog(BaseModel):
         if type(v) == datetime and str(v.tzinfo) == str(pytz.utc):
             v = v.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone(settings.TZ))
         return v
+
+
+class RequestLogSummary(BaseModel):
+    """A request log without its request, response and trace."""
+
+    id: int
+    created: datetime
+    service_name: str | None
+    method: str | None
+    user_id: int | None
+    status_code: int | None
+    ip: str | None
+    processing_time: float | None
+    tracker_id: str | None
+    type: RequestLogType
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_serializer("created")
+    def set_timezone(self, v: datetime) -> datetime:
+        if type(v) is datetime and str(v.tzinfo) == str(pytz.utc):
+            v = v.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone(settings.TZ))
+        return v
+
+
+class RequestLogFigures(BaseModel):
+    count: int
+    error_count: int
+    error_rate: float
+    throughput: float  # requests per second
+    avg_time: float | None
+    max_time: float | None
+    p50: float | None
+    p95: float | None
+    p99: float | None
+
+
+class RequestLogStats(RequestLogFigures):
+    method: str
+    service_name: str
+
+
+class RequestLogStatsPoint(RequestLogFigures):
+    bucket_start: datetime
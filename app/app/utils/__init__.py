@@ -1,5 +1,5 @@
 from .message_codes import MessageCodes
-from .redis import redis_client
+from .redis import redis_client, redis_health, redis_pool_options
 from .response import (
     APIErrorResponse,
     APIResponse,
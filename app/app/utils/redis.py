@@ -1,10 +1,17 @@
 import redis.asyncio as redis
 
 from app.core.config import settings
+from cache.redis import RedisHealthCheck, create_pool
 
 redis_url = str(settings.REDIS_URI)
-redis_pool = redis.ConnectionPool.from_url(
-    redis_url,
-    decode_responses=True,
-)
+redis_pool_options = {
+    "max_connections": settings.REDIS_MAX_CONNECTIONS,
+    "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+    "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+    "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+}
+redis_pool = create_pool(redis_url, decode_responses=True, **redis_pool_options)
 redis_client = redis.Redis(connection_pool=redis_pool)
+redis_health = RedisHealthCheck(
+    redis_client, interval=settings.REDIS_HEALTH_CHECK_INTERVAL
+)
@@ -28,7 +28,11 @@ class ApiResponseHeader(BaseModel, Generic[T], ABC):
 
 
 class PaginatedContent(BaseModel, Generic[T]):
-    """Content data type for lists with pagination"""
+    """Content data type for lists with pagination
+
+    `total_count` may come from `CRUDBase.get_count` with a cheap `CountMode`
+    (`auto`, `estimated` or `cached`) on large tables.
+    """
 
     data: T
     total_count: int = 0
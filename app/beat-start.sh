@@ -0,0 +1,5 @@
+#! /usr/bin/env bash
+set -e
+
+# run a single beat, every worker replica would otherwise schedule its own copy of the periodic tasks
+celery -A app.celery.worker beat --loglevel=INFO
@@ -0,0 +1,100 @@
+"""Benchmark of `CRUDBase.create_multi` against `CRUDBase.create_bulk`.
+
+`create_multi` builds one ORM object per row and flushes them through the unit
+of work; `create_bulk` sends multi-row `INSERT` statements. Rows go into a
+scratch table of the test database (`POSTGRES_ASYNC_URI_TEST`), which is
+dropped at the end.
+
+    poetry run python -m benchmarks.bench_bulk_insert [rows ...]
+"""
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy import Integer, String
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.config import settings
+from app.crud.base import CRUDBase
+from app.db.base_class import Base
+
+ROWS = (1_000, 10_000, 100_000)
+
+
+class BenchBulkRow(Base):
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(120))
+    slug: Mapped[str] = mapped_column(String(120), unique=True)
+    quantity: Mapped[int] = mapped_column(Integer)
+
+
+crud = CRUDBase(BenchBulkRow)
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {"name": f"row {i}", "slug": f"row-{i}", "quantity": i} for i in range(count)
+    ]
+
+
+async def timed(engine, session_factory, insert, prepare=None) -> float:
+    """Seconds `insert` takes, after `prepare` ran; the table is emptied after."""
+    async with session_factory() as db:
+        if prepare is not None:
+            await prepare(db)
+        start = time.perf_counter()
+        await insert(db)
+        elapsed = time.perf_counter() - start
+    async with engine.begin() as connection:
+        await connection.execute(BenchBulkRow.__table__.delete())
+    return elapsed
+
+
+async def main(row_counts: tuple[int, ...]) -> None:
+    url = settings.POSTGRES_ASYNC_URI_TEST or settings.POSTGRES_ASYNC_URI
+    if url is None:
+        sys.exit("POSTGRES_ASYNC_URI_TEST is not set")
+    engine = create_async_engine(str(url))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    table = BenchBulkRow.__table__
+    async with engine.begin() as connection:
+        await connection.run_sync(table.create, checkfirst=True)
+    try:
+        print(f"{'rows':>8} {'create_multi':>14} {'create_bulk':>14} {'upsert':>14}")
+        for count in row_counts:
+            rows = make_rows(count)
+            orm = await timed(
+                engine,
+                session_factory,
+                lambda db, rows=rows: crud.create_multi(db, rows),
+            )
+            bulk = await timed(
+                engine,
+                session_factory,
+                lambda db, rows=rows: crud.create_bulk(db, rows),
+            )
+            # every row conflicts with an existing one and is updated
+            upsert = await timed(
+                engine,
+                session_factory,
+                lambda db, rows=rows: crud.create_bulk(
+                    db,
+                    rows,
+                    on_conflict="update",
+                    conflict_columns=("slug",),
+                    update_fields=("quantity",),
+                ),
+                prepare=lambda db, rows=rows: crud.create_bulk(db, rows),
+            )
+            print(f"{count:>8} {orm:>13.3f}s {bulk:>13.3f}s {upsert:>13.3f}s")
+    finally:
+        async with engine.begin() as connection:
+            await connection.run_sync(table.drop)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    counts = tuple(int(arg) for arg in sys.argv[1:]) or ROWS
+    asyncio.run(main(counts))
@@ -0,0 +1,118 @@
+"""Micro-benchmark of the CPU spent on a cache hit.
+
+Compares the previous hit path, which decoded the cached payload and let FastAPI
+validate it against the response model and encode it again, with returning the
+stored response body verbatim.
+
+    poetry run python -m benchmarks.bench_hit_path
+"""
+
+import time
+
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+
+from cache.codecs import JsonCodec, PayloadSerializer, RawCodec
+from cache.entry import CacheEntry
+from cache.response import build_response, get_body_encoder
+
+NUMBER = 2_000
+USERS = 100
+
+
+class Header(BaseModel):
+    status: int
+    message: str
+    messageCode: int
+
+
+class User(BaseModel):
+    id: int
+    username: str | None = None
+    full_name: str | None = None
+    email: str | None = None
+    phone_number: str | None = None
+    is_active: bool = True
+    roles: list[str] = []
+
+
+class UsersResponse(BaseModel):
+    header: Header
+    content: list[User] | None = None
+
+
+async def read_users() -> UsersResponse:
+    return {
+        "header": {"status": 0, "message": "ok", "messageCode": 0},
+        "content": [
+            {
+                "id": i,
+                "username": f"user{i}",
+                "full_name": f"User {i}",
+                "email": f"user{i}@example.com",
+                "phone_number": "09120000000",
+                "roles": ["USER"],
+                "hashed_password": "$2b$12$" + "x" * 53,
+            }
+            for i in range(USERS)
+        ],
+    }
+
+
+def main() -> None:
+    serializer = PayloadSerializer()
+    value = run_sync(read_users())
+    field = create_model_field("response", UsersResponse, mode="serialization")
+    # previous format: the value returned by the endpoint, as JSON
+    decoded_entry = CacheEntry(serializer.codec.encode(value), codec=JsonCodec.id)
+    decoded_raw = decoded_entry.dumps()
+    # current format: the rendered response body
+    body = get_body_encoder(read_users)(value)
+    body_raw = CacheEntry(body, codec=RawCodec.id).dumps()
+
+    def decode_and_serialize() -> Response:
+        entry = CacheEntry.loads(decoded_raw)
+        content = serializer.decode(entry.payload, entry.codec, entry.compression)
+        content = run_sync(serialize_response(field=field, response_content=content))
+        return JSONResponse(content)
+
+    def verbatim() -> Response:
+        entry = CacheEntry.loads(body_raw)
+        return build_response(
+            serializer.decode(entry.payload, entry.codec, entry.compression)
+        )
+
+    assert decode_and_serialize().body == verbatim().body
+    results = {
+        "decode + validate": measure(decode_and_serialize),
+        "verbatim body": measure(verbatim),
+    }
+    baseline = results["decode + validate"]
+    print(f"{USERS} users, {len(body)} bytes per response")
+    for name, elapsed in results.items():
+        per_hit = elapsed / NUMBER * 1_000_000
+        print(f"{name:<20} {per_hit:9.2f} us CPU/hit  x{baseline / elapsed:7.2f}")
+    saved = (baseline - results["verbatim body"]) / NUMBER * 1_000_000
+    print(f"CPU saved per hit: {saved:.2f} us")
+
+
+def run_sync(coro):
+    """Drive a coroutine that never suspends without the overhead of an event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("coroutine suspended")
+
+
+def measure(func) -> float:
+    start = time.process_time()
+    for _ in range(NUMBER):
+        func()
+    return time.process_time() - start
+
+
+if __name__ == "__main__":
+    main()
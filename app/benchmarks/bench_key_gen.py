@@ -0,0 +1,64 @@
+"""Micro-benchmark of cache key generation.
+
+Compares `get_cache_key`, which inspects the signature of the endpoint on every
+call, with the `KeyBuilder` compiled once per decorated function.
+
+    poetry run python -m benchmarks.bench_key_gen
+"""
+
+import timeit
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache.key_gen import KeyBuilder, get_cache_key
+
+NUMBER = 100_000
+PREFIX = "api-cache|user"
+
+
+class User:
+    pass
+
+
+async def read_users(
+    db: AsyncSession = None,
+    skip: int = 0,
+    limit: int = 100,
+    search: str | None = None,
+    current_user: User = None,
+):
+    pass
+
+
+IGNORE_ARG_TYPES = [Request, Response, AsyncSession, User]
+KWARGS = {
+    "db": object(),
+    "skip": 20,
+    "limit": 100,
+    "search": "phone",
+    "current_user": User(),
+}
+
+
+def main() -> None:
+    key_builder = KeyBuilder(read_users)
+    results = {
+        "get_cache_key": timeit.timeit(
+            lambda: get_cache_key(PREFIX, IGNORE_ARG_TYPES, read_users, **KWARGS),
+            number=NUMBER,
+        ),
+        "KeyBuilder.build": timeit.timeit(
+            lambda: key_builder.build(PREFIX, IGNORE_ARG_TYPES, (), KWARGS),
+            number=NUMBER,
+        ),
+    }
+    baseline = results["get_cache_key"]
+    for name, elapsed in results.items():
+        per_call = elapsed / NUMBER * 1_000_000
+        print(f"{name:<20} {per_call:8.2f} us/call  x{baseline / elapsed:5.2f}")
+    print(f"key: {key_builder.build(PREFIX, IGNORE_ARG_TYPES, (), KWARGS)}")
+
+
+if __name__ == "__main__":
+    main()
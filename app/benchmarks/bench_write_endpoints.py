@@ -0,0 +1,173 @@
+"""Benchmark of the write endpoints with and without the former refresh.
+
+The ecommerce services used to `refresh` what they wrote after the commit, one
+more SELECT per object. Each endpoint is called through the ASGI app, once with
+its service wrapped to refresh the returned objects as before and once as it
+is now, and the mean latency of the whole request is reported. Requests act
+as the superadmin, without going through authentication. The schema of the test
+database (`POSTGRES_ASYNC_URI_TEST`) is recreated first, as the test suite does.
+
+    poetry run python -m benchmarks.bench_write_endpoints [requests]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from functools import wraps
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.api_v1.services import ecommerce as svc
+from app.api import deps
+from app.core.config import settings
+from app.crud import crud_user
+from app.db import Base
+from app.db import session as db_session
+from app.db.init_db import init_db
+from app.main import app
+
+REQUESTS = 500
+# services whose result used to be refreshed after the commit
+REFRESHED = (
+    "create_category",
+    "create_product",
+    "set_product_activation",
+    "set_user_activation",
+    "complete_order",
+    "checkout",
+)
+
+
+def with_refresh(service):
+    """`service`, refreshing the objects it returns like it did before."""
+
+    @wraps(service)
+    async def wrapper(db, **kwargs):
+        result = await service(db, **kwargs)
+        for db_obj in result if isinstance(result, tuple) else (result,):
+            await db.refresh(db_obj)
+        return result
+
+    return wrapper
+
+
+async def timed(client: AsyncClient, run: str, method: str, url: str, json) -> float:
+    """Mean milliseconds per request; `json` may be built from `run` and the call."""
+    elapsed = 0.0
+    for i in range(REQUESTS):
+        start = time.perf_counter()
+        response = await client.request(
+            method, url, json=json(run, i) if callable(json) else json
+        )
+        elapsed += time.perf_counter() - start
+        response.raise_for_status()
+    return elapsed / REQUESTS * 1000
+
+
+async def main() -> None:
+    url = settings.POSTGRES_ASYNC_URI_TEST
+    if url is None:
+        sys.exit("POSTGRES_ASYNC_URI_TEST is not set")
+    engine = create_async_engine(str(url))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+            await db.commit()
+
+    app.dependency_overrides[deps.get_db] = override_get_db
+    db_session.async_session = session_factory
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    async with session_factory() as db:
+        await init_db(db=db)
+        admin = await crud_user.user.get_by_username(
+            db=db, username=settings.FIRST_SUPERADMIN
+        )
+    app.dependency_overrides[deps.check_user_role] = lambda: admin
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        product = await client.post(
+            "/api/v1/admin/products",
+            json={
+                "title": "Bench",
+                "slug": "bench",
+                "price": 10,
+                "sku": "BENCH",
+                "stock": 10 * REQUESTS,
+            },
+        )
+        product_id = product.json()["content"]["id"]
+        await client.post(
+            "/api/v1/cart/add",
+            json={"variant_id": product_id, "quantity": 1, "session_token": "bench"},
+        )
+        checkout = {
+            "session_token": "bench",
+            "shipping_address": "Bench Street 1",
+            "postal_code": "12345",
+        }
+        await client.post("/api/v1/checkout", json=checkout)
+
+        calls = {
+            "POST /admin/categories": (
+                "POST",
+                "/api/v1/admin/categories",
+                lambda run, i: {"name": f"category {i}", "slug": f"{run}-{i}"},
+            ),
+            "POST /admin/products": (
+                "POST",
+                "/api/v1/admin/products",
+                lambda run, i: {
+                    "title": f"product {i}",
+                    "slug": f"{run}-{i}",
+                    "price": 1,
+                    "sku": f"{run}-{i}",
+                    "stock": 1,
+                },
+            ),
+            "PATCH /admin/products/{id}/activation": (
+                "PATCH",
+                f"/api/v1/admin/products/{product_id}/activation",
+                lambda run, i: {"is_active": i % 2 == 1},
+            ),
+            "PATCH /admin/users/{id}/activation": (
+                "PATCH",
+                f"/api/v1/admin/users/{admin.id}/activation",
+                {"is_active": True},
+            ),
+            "POST /admin/orders/{id}/complete": (
+                "POST",
+                "/api/v1/admin/orders/1/complete",
+                {"tracking_code": "TRACK123456"},
+            ),
+            "POST /checkout": ("POST", "/api/v1/checkout", checkout),
+        }
+        services = {name: getattr(svc, name) for name in REFRESHED}
+        print(f"{'endpoint':<38} {'refresh':>10} {'no refresh':>10}")
+        try:
+            for endpoint, call in calls.items():
+                results = []
+                for run in ("refresh", "no-refresh"):
+                    for name, service in services.items():
+                        refreshed = with_refresh(service)
+                        setattr(svc, name, refreshed if run == "refresh" else service)
+                    results.append(await timed(client, run, *call))
+                print(f"{endpoint:<38}" + "".join(f" {ms:>8.3f}ms" for ms in results))
+        finally:
+            for name, service in services.items():
+                setattr(svc, name, service)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        REQUESTS = int(sys.argv[1])
+    asyncio.run(main())
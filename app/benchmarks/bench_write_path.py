@@ -0,0 +1,93 @@
+"""Benchmark of the round trip saved by not refreshing written objects.
+
+`CRUDBase.create` and `update` used to `refresh` the object after the commit,
+one more SELECT per write. Models now fetch server-generated values with the
+flush (`eager_defaults`), so the write alone returns a complete object. Each
+write is timed with and without the former refresh, and the statements sent
+are counted. Rows go into the scratch table of `bench_bulk_insert`.
+
+This measures the CRUD write; `bench_write_endpoints` times whole requests.
+
+    poetry run python -m benchmarks.bench_write_path [writes]
+"""
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from benchmarks.bench_bulk_insert import BenchBulkRow, crud
+
+WRITES = 1_000
+
+
+async def create(db, i: int) -> BenchBulkRow:
+    return await crud.create(
+        db, {"name": f"row {i}", "slug": f"row-{i}", "quantity": i}
+    )
+
+
+async def update(db, i: int) -> BenchBulkRow:
+    db_obj = await crud.get(db, i + 1)
+    return await crud.update(db, db_obj, {"quantity": -i})
+
+
+async def timed(session_factory, statements: list, write, refresh: bool) -> tuple:
+    """Milliseconds and statements per `write`, refreshing after it if asked."""
+    elapsed, count = 0.0, 0
+    for i in range(WRITES):
+        async with session_factory() as db:
+            start, before = time.perf_counter(), len(statements)
+            db_obj = await write(db, i)
+            if refresh:
+                await db.refresh(db_obj)
+            elapsed += time.perf_counter() - start
+            count += len(statements) - before
+    return elapsed / WRITES * 1000, count / WRITES
+
+
+async def main() -> None:
+    url = settings.POSTGRES_ASYNC_URI_TEST or settings.POSTGRES_ASYNC_URI
+    if url is None:
+        sys.exit("POSTGRES_ASYNC_URI_TEST is not set")
+    engine = create_async_engine(str(url))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+    table = BenchBulkRow.__table__
+    async with engine.begin() as connection:
+        await connection.run_sync(table.drop, checkfirst=True)
+        await connection.run_sync(table.create)
+    try:
+        print(f"{'write':>8} {'refresh':>16} {'no refresh':>16}")
+        for write in (create, update):
+            results = []
+            for refresh in (True, False):
+                if write is create:
+                    async with engine.begin() as connection:
+                        await connection.execute(table.delete())
+                        await connection.exec_driver_sql(
+                            f"ALTER SEQUENCE {table.name}_id_seq RESTART"
+                        )
+                results.append(await timed(session_factory, statements, write, refresh))
+            print(
+                f"{write.__name__:>8}"
+                + "".join(f" {ms:>7.3f}ms {n:>3.0f} SQL" for ms, n in results)
+            )
+    finally:
+        async with engine.begin() as connection:
+            await connection.run_sync(table.drop)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        WRITES = int(sys.argv[1])
+    asyncio.run(main())
@@ -0,0 +1,271 @@
+"""backends.py"""
+
+import asyncio
+from bisect import bisect
+from collections import defaultdict
+from hashlib import blake2b
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import redis.asyncio as redis
+from redis.asyncio import client
+from redis.asyncio.cluster import RedisCluster
+
+STANDALONE = "redis"
+CLUSTER = "cluster"
+SHARDED = "sharded"
+BACKENDS = (STANDALONE, CLUSTER, SHARDED)
+# points of each node on the hash ring, more points spread keys more evenly
+DEFAULT_REPLICAS = 160
+# commands the cache queues on pipelines, all of them take a single key first
+PIPELINE_COMMANDS = {"get", "set", "ttl", "sadd", "expire", "delete", "unlink"}
+
+
+def uses_hash_tags(backend: str) -> bool:
+    """Whether keys of one namespace must share a hash tag to live on the same node."""
+    return backend != STANDALONE
+
+
+def hash_tag(key: str) -> str:
+    """Return the part of `key` that decides its node, as Redis Cluster does.
+
+    If the key contains a non-empty `{...}` section, only the text between the
+    first `{` and the following `}` is hashed, so every key tagged with the same
+    namespace is stored on the same node.
+    """
+    start = key.find("{")
+    if start != -1:
+        end = key.find("}", start + 1)
+        if end > start + 1:
+            return key[start + 1 : end]
+    return key
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def _key_str(key: Any) -> str:
+    return key.decode() if isinstance(key, bytes) else str(key)
+
+
+class HashRing:
+    """Consistent hashing of keys over named nodes.
+
+    Each node is placed on the ring `replicas` times, so adding or removing a
+    node only moves the keys of its own ring segments.
+    """
+
+    def __init__(self, names: Sequence[str], replicas: int = DEFAULT_REPLICAS):
+        if not names:
+            raise ValueError("A hash ring needs at least one node")
+        points = sorted(
+            (_hash(f"{name}#{replica}"), index)
+            for index, name in enumerate(names)
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._indexes = [index for _, index in points]
+
+    def get_index(self, key: str) -> int:
+        """Return the index of the node that owns `key`."""
+        position = bisect(self._hashes, _hash(hash_tag(key)))
+        return self._indexes[position % len(self._indexes)]
+
+
+class ShardedRedis:
+    """Spreads the cache over standalone Redis nodes with client-side consistent hashing.
+
+    Implements the subset of the `redis.asyncio.Redis` API the cache uses, so it
+    can replace the single client. Every command is sent to the node that owns
+    the hash tag of its key; multi-key commands are split by node. Pub/Sub goes
+    through the first node, which every worker shares.
+    """
+
+    def __init__(
+        self, nodes: Dict[str, client.Redis], replicas: int = DEFAULT_REPLICAS
+    ):
+        """
+        Args:
+            nodes (Dict[str, client.Redis]): Clients by node name, usually their URL.
+                Names place the nodes on the ring, so keep them stable.
+            replicas (int, optional): Points of each node on the ring.
+        """
+        self.names = list(nodes)
+        self.nodes = list(nodes.values())
+        self.ring = HashRing(self.names, replicas)
+
+    def get_node(self, key: Any) -> client.Redis:
+        return self.nodes[self.ring.get_index(_key_str(key))]
+
+    def get_node_for_keys(self, keys: Sequence[Any]) -> client.Redis:
+        """Return the node of `keys`, which must all be on the same node."""
+        indexes = {self.ring.get_index(_key_str(key)) for key in keys}
+        if len(indexes) != 1:
+            raise ValueError(f"Keys are stored on different nodes: {keys}")
+        return self.nodes[indexes.pop()]
+
+    def group_by_node(self, keys: Sequence[Any]) -> Dict[int, List[int]]:
+        """Return the positions of `keys` grouped by the index of their node."""
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for position, key in enumerate(keys):
+            groups[self.ring.get_index(_key_str(key))].append(position)
+        return groups
+
+    async def get(self, name: Any) -> Optional[bytes]:
+        return await self.get_node(name).get(name)
+
+    async def set(self, name: Any, value: Any, **kwargs: Any) -> Any:
+        return await self.get_node(name).set(name, value, **kwargs)
+
+    async def ttl(self, name: Any) -> int:
+        return await self.get_node(name).ttl(name)
+
+    async def sadd(self, name: Any, *values: Any) -> int:
+        return await self.get_node(name).sadd(name, *values)
+
+    async def expire(self, name: Any, time: int, **kwargs: Any) -> bool:
+        return await self.get_node(name).expire(name, time, **kwargs)
+
+    async def rename(self, src: Any, dst: Any) -> Any:
+        return await self.get_node_for_keys([src, dst]).rename(src, dst)
+
+    def sscan_iter(self, name: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        return self.get_node(name).sscan_iter(name, **kwargs)
+
+    async def mget(self, keys: Sequence[Any], *args: Any) -> List[Optional[bytes]]:
+        keys = [*keys, *args]
+        values: List[Optional[bytes]] = [None] * len(keys)
+        groups = self.group_by_node(keys)
+        results = await asyncio.gather(
+            *(
+                self.nodes[index].mget([keys[i] for i in positions])
+                for index, positions in groups.items()
+            )
+        )
+        for positions, found in zip(groups.values(), results, strict=True):
+            for i, value in zip(positions, found, strict=True):
+                values[i] = value
+        return values
+
+    async def _count_by_node(self, command: str, names: Sequence[Any]) -> int:
+        groups = self.group_by_node(names)
+        counts = await asyncio.gather(
+            *(
+                getattr(self.nodes[index], command)(*(names[i] for i in positions))
+                for index, positions in groups.items()
+            )
+        )
+        return sum(counts)
+
+    async def exists(self, *names: Any) -> int:
+        return await self._count_by_node("exists", names)
+
+    async def delete(self, *names: Any) -> int:
+        return await self._count_by_node("delete", names)
+
+    async def unlink(self, *names: Any) -> int:
+        return await self._count_by_node("unlink", names)
+
+    async def ping(self) -> bool:
+        return all(await asyncio.gather(*(node.ping() for node in self.nodes)))
+
+    async def publish(self, channel: Any, message: Any) -> int:
+        return await self.nodes[0].publish(channel, message)
+
+    def pubsub(self, **kwargs: Any) -> client.PubSub:
+        return self.nodes[0].pubsub(**kwargs)
+
+    def pipeline(self, transaction: bool = True) -> "ShardedPipeline":
+        return ShardedPipeline(self, transaction)
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(node.aclose() for node in self.nodes))
+
+
+class ShardedPipeline:
+    """Pipeline of a `ShardedRedis`, executed as one pipeline per node.
+
+    Results are returned in the order the commands were queued. Transactions are
+    atomic per node only, which covers the keys of one namespace. After `watch`,
+    the pipeline is bound to the node of the watched keys and behaves like a
+    regular pipeline of that node.
+    """
+
+    def __init__(self, sharded: ShardedRedis, transaction: bool = True):
+        self.sharded = sharded
+        self.transaction = transaction
+        self._commands: List[Tuple[str, Tuple[Any, ...], Dict[str, Any]]] = []
+        self._bound: Optional[client.Pipeline] = None
+
+    async def __aenter__(self) -> "ShardedPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.reset()
+
+    async def reset(self) -> None:
+        self._commands.clear()
+        if self._bound is not None:
+            await self._bound.reset()
+            self._bound = None
+
+    async def watch(self, *names: Any) -> Any:
+        node = self.sharded.get_node_for_keys(names)
+        self._bound = node.pipeline(transaction=self.transaction)
+        return await self._bound.watch(*names)
+
+    def __getattr__(self, name: str) -> Any:
+        if self._bound is not None:
+            return getattr(self._bound, name)
+        if name not in PIPELINE_COMMANDS:
+            raise AttributeError(f"{type(self).__name__} does not support {name}")
+
+        def queue(*args: Any, **kwargs: Any) -> "ShardedPipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        if self._bound is not None:
+            return await self._bound.execute()
+        commands, self._commands = self._commands, []
+        groups = self.sharded.group_by_node(
+            [args[0] if args else kwargs["name"] for _, args, kwargs in commands]
+        )
+
+        async def run(index: int, positions: List[int]) -> List[Any]:
+            node = self.sharded.nodes[index]
+            async with node.pipeline(transaction=self.transaction) as pipe:
+                for i in positions:
+                    name, args, kwargs = commands[i]
+                    getattr(pipe, name)(*args, **kwargs)
+                return await pipe.execute()
+
+        results: List[Any] = [None] * len(commands)
+        grouped = await asyncio.gather(
+            *(run(index, positions) for index, positions in groups.items())
+        )
+        for positions, values in zip(groups.values(), grouped, strict=True):
+            for i, value in zip(positions, values, strict=True):
+                results[i] = value
+        return results
+
+
+def pubsub_client(redis_client: Any) -> Any:
+    """Return a client that supports Pub/Sub for the cache client `redis_client`.
+
+    The asyncio cluster client has no Pub/Sub, but a message published on any
+    node of a cluster is delivered to subscribers of every node, so a standalone
+    connection to one of them is enough.
+    """
+    if not isinstance(redis_client, RedisCluster):
+        return redis_client
+    node = redis_client.get_default_node()
+    kwargs = redis_client.connection_kwargs
+    return redis.Redis(
+        host=node.host,
+        port=node.port,
+        username=kwargs.get("username"),
+        password=kwargs.get("password"),
+    )
@@ -0,0 +1,113 @@
+"""breaker.py"""
+
+import asyncio
+import logging
+import time
+from enum import IntEnum
+from typing import Awaitable, Callable, Optional
+
+from redis.exceptions import ConnectionError, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+# errors that mean the server is unreachable, as opposed to e.g. a wrong command
+REDIS_ERRORS = (ConnectionError, TimeoutError, OSError)
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 5.0
+DEFAULT_MAX_RESET_TIMEOUT = 60.0
+
+
+class BreakerState(IntEnum):
+    """State of the circuit breaker."""
+
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+
+class CircuitBreaker:
+    """Stops sending cache operations to Redis after repeated connection failures.
+
+    The breaker opens after `failure_threshold` consecutive failures. While it is
+    open, cache operations bypass Redis, and a background task tries to reach
+    the server after `reset_timeout` seconds (half-open). A successful probe
+    closes the breaker; a failed one opens it again for twice as long, up to
+    `max_reset_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        max_reset_timeout: float = DEFAULT_MAX_RESET_TIMEOUT,
+        on_transition: Optional[Callable[[BreakerState, BreakerState], None]] = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.on_transition = on_transition
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._current_timeout = reset_timeout
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def closed(self) -> bool:
+        return self.state == BreakerState.CLOSED
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self, probe: Optional[Callable[[], Awaitable[bool]]]) -> None:
+        """Count a failure, opening the breaker and scheduling `probe` past the threshold."""
+        self.failures += 1
+        if self.closed and self.failures >= self.failure_threshold:
+            self.open(probe)
+
+    def open(self, probe: Optional[Callable[[], Awaitable[bool]]]) -> None:
+        """Open the breaker and retry `probe` in the background until it succeeds."""
+        if self.state != BreakerState.OPEN:
+            self._transition(BreakerState.OPEN)
+        self.opened_at = time.monotonic()
+        if probe is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._reconnect(probe))
+
+    def close(self) -> None:
+        self.failures = 0
+        self._current_timeout = self.reset_timeout
+        if not self.closed:
+            self._transition(BreakerState.CLOSED)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _reconnect(self, probe: Callable[[], Awaitable[bool]]) -> None:
+        while not self.closed:
+            await asyncio.sleep(self._current_timeout)
+            self._transition(BreakerState.HALF_OPEN)
+            try:
+                recovered = await probe()
+            except Exception as e:
+                logger.warning(f"Redis reconnect attempt failed: {e}")
+                recovered = False
+            if recovered:
+                self.close()
+            else:
+                self._current_timeout = min(
+                    self._current_timeout * 2, self.max_reset_timeout
+                )
+                self._transition(BreakerState.OPEN)
+                self.opened_at = time.monotonic()
+
+    def _transition(self, state: BreakerState) -> None:
+        previous, self.state = self.state, state
+        if self.on_transition is not None and previous != state:
+            self.on_transition(previous, state)
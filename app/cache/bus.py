@@ -0,0 +1,123 @@
+"""bus.py"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Optional
+
+from redis.asyncio import client
+
+from cache.local import LocalCache
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 1
+
+
+class InvalidationStats:
+    """Counters describing the traffic on the invalidation channel."""
+
+    def __init__(self):
+        self.published = 0
+        self.received = 0
+        self.reconnects = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    @property
+    def avg_lag(self) -> float:
+        return self.total_lag / self.received if self.received else 0.0
+
+    def record_lag(self, lag: float) -> None:
+        self.received += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+
+
+class InvalidationBus:
+    """Propagates namespace/key invalidations to the local tier of every worker.
+
+    Each worker publishes its invalidations on a Redis pub/sub channel and
+    subscribes to the same channel to clear its own `LocalCache`. Pub/sub has
+    no delivery guarantee, so the local tier TTL stays the upper bound for how
+    long a missed message can keep an entry stale, and the whole local tier is
+    dropped whenever the subscription is (re)established.
+    """
+
+    def __init__(self, redis: client.Redis, channel: str, local: LocalCache):
+        self.redis = redis
+        self.channel = channel
+        self.local = local
+        self.origin = uuid.uuid4().hex
+        self.stats = InvalidationStats()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def publish(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> None:
+        message = {
+            "origin": self.origin,
+            "namespace": namespace,
+            "key": key,
+            "sent_at": time.time(),
+        }
+        await self.redis.publish(self.channel, json.dumps(message))
+        self.stats.published += 1
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def handle(self, data: bytes | str) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            logger.warning(f"Malformed cache invalidation message: {data!r}")
+            return
+        self.stats.record_lag(max(time.time() - message.get("sent_at", 0), 0.0))
+        if message.get("origin") == self.origin:
+            return
+        if message.get("key"):
+            self.local.delete(message["key"])
+        else:
+            self.local.invalidate(message.get("namespace"))
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # messages published while we were not subscribed are lost
+                self.local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.reconnects += 1
+                logger.error(f"Cache invalidation listener failed: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:  # pragma: no cover
+                    pass
@@ -1,28 +1,37 @@
 """cache.py"""
 
-from ast import pattern
 import asyncio
+import time
+from contextlib import AsyncExitStack
 from datetime import timedelta
 from functools import partial, update_wrapper, wraps
 from http import HTTPStatus
-from typing import Union
+from inspect import Parameter, signature
+from typing import Any, Dict, Iterable, Tuple, Union
 
-from fastapi import Response
+from fastapi import Request, Response
 
 from cache.client import Cache
+from cache.entry import CacheEntry
+from cache.key_gen import KeyBuilder
+from cache.response import build_response, get_body_encoder
 from cache.util import (
-    deserialize_json,
     ONE_DAY_IN_SECONDS,
     ONE_HOUR_IN_SECONDS,
     ONE_MONTH_IN_SECONDS,
     ONE_WEEK_IN_SECONDS,
     ONE_YEAR_IN_SECONDS,
-    serialize_json,
 )
 
 
 def cache(
-    *, namespace: str | None = None, expire: int | timedelta = ONE_YEAR_IN_SECONDS
+    *,
+    namespace: str | None = None,
+    expire: int | timedelta = ONE_YEAR_IN_SECONDS,
+    coalesce: bool = True,
+    stale_ttl: int | timedelta = 0,
+    early_refresh_beta: float = 0,
+    headers: Iterable[str] = (),
 ):
     """Enable caching behavior for the decorated function.
 
@@ -31,40 +40,210 @@ def cache(
             from now when the cached response should expire. Defaults to 31,536,000
             seconds (i.e., the number of seconds in one year).
         namespace (str|None, optional): cache namespace for expiration usage
+        coalesce (bool, optional): Evaluate the wrapped function only once for
+            concurrent misses of the same key, in-process and across workers;
+            the other requests get the result of that evaluation. Defaults to True.
+        stale_ttl (Union[int, timedelta], optional): Stale-while-revalidate window.
+            For this many seconds after `expire`, the stale value is still served
+            while a single background task refreshes it. Defaults to 0 (disabled).
+        early_refresh_beta (float, optional): Enables probabilistic early refresh
+            (XFetch) of values that are about to expire; higher values refresh
+            earlier, `1.0` is a good default. Defaults to 0 (disabled).
+        headers (Iterable[str], optional): Response headers set by the endpoint
+            that are stored with the value and sent again on hits, such as a
+            pagination cursor. Other headers, such as `Set-Cookie`, are never
+            cached. Defaults to none.
     """
+    cached_headers = frozenset(name.lower() for name in headers)
 
     def outer_wrapper(func):
+        endpoint = CachedEndpoint(
+            func,
+            namespace=namespace,
+            expire=expire,
+            coalesce=coalesce,
+            stale_ttl=stale_ttl,
+            early_refresh_beta=early_refresh_beta,
+            cached_headers=cached_headers,
+        )
+
         @wraps(func)
         async def inner_wrapper(*args, **kwargs):
             """Return cached value if one exists, otherwise evaluate the wrapped function and cache the result."""
-            func_kwargs = kwargs.copy()
-            request = func_kwargs.pop("request", None)
-            response = func_kwargs.pop("response", None)
-            create_response_directly = not response
-            if create_response_directly:
-                response = Response()
+            request = pop_or_get(kwargs, request_param, inject_request)
+            response = pop_or_get(kwargs, response_param, inject_response)
             redis_cache = Cache()
             if redis_cache.not_connected or redis_cache.request_is_not_cacheable(
                 request
             ):
                 # if the redis client is not connected or request is not cacheable, no caching behavior is performed.
                 return await get_api_response_async(func, *args, **kwargs)
-            key = redis_cache.get_cache_key(func, namespace, *args, **kwargs)
-            ttl, in_cache = await redis_cache.check_cache(key)
-            if in_cache:
-                return deserialize_json(in_cache)
-
-            response_data = await get_api_response_async(func, *args, **kwargs)
-            ttl = calculate_ttl(expire)
-
-            await redis_cache.add_to_cache(key, response_data, ttl)
-            return response_data
+            return await endpoint.serve(redis_cache, request, response, args, kwargs)
 
+        request_param, inject_request = find_or_inject_parameter(inner_wrapper, Request)
+        response_param, inject_response = find_or_inject_parameter(
+            inner_wrapper, Response
+        )
         return inner_wrapper
 
     return outer_wrapper
 
 
+class CachedEndpoint:
+    """Caching behavior of one function decorated with `cache`.
+
+    What only depends on the function and the decorator options is prepared
+    once here; `serve` answers each request.
+    """
+
+    def __init__(
+        self,
+        func,
+        *,
+        namespace: str | None,
+        expire: int | timedelta,
+        coalesce: bool,
+        stale_ttl: int | timedelta,
+        early_refresh_beta: float,
+        cached_headers: frozenset[str],
+    ):
+        self.func = func
+        self.namespace = namespace
+        self.expire = expire
+        self.coalesce = coalesce
+        self.stale_ttl = stale_ttl
+        self.early_refresh_beta = early_refresh_beta
+        self.cached_headers = cached_headers
+        self.key_builder = KeyBuilder(func)
+        self.encode_body = get_body_encoder(func)
+        self.labels = {"namespace": namespace, "endpoint": self.key_builder.name}
+        self.annotations = {
+            param.name: param.annotation for param in self.key_builder.parameters
+        }
+
+    async def serve(self, redis_cache: Cache, request, response, args, kwargs):
+        """Answer from the cache, evaluating the function on misses."""
+        metrics = redis_cache.metrics
+        key = redis_cache.build_cache_key(
+            self.key_builder, self.namespace, args, kwargs
+        )
+        ttl, in_cache = await redis_cache.check_cache(key, self.namespace)
+        if in_cache:
+            # only the header is parsed, the payload is decoded on demand
+            entry = CacheEntry.loads(in_cache)
+            refresh = partial(self.refresh, redis_cache, key, response, args, kwargs)
+            decode = partial(redis_cache.decode, entry)
+            if not entry.is_stale():
+                metrics.hits.inc(**self.labels)
+                if self.early_refresh_beta and entry.should_refresh_early(
+                    self.early_refresh_beta
+                ):
+                    redis_cache.refresh_in_background(key, refresh)
+                return self.respond(
+                    redis_cache, request, response, True, entry, ttl, decode
+                )
+            if self.stale_ttl:
+                metrics.stale_hits.inc(**self.labels)
+                redis_cache.refresh_in_background(key, refresh)
+                return self.respond(
+                    redis_cache, request, response, True, entry, ttl, decode
+                )
+
+        metrics.misses.inc(**self.labels)
+        compute = partial(self.compute, redis_cache, key, response, args, kwargs)
+        if not self.coalesce:
+            response_data, entry = await compute()
+        else:
+            lookup = partial(self.lookup, redis_cache, key)
+            response_data, entry = await redis_cache.single_flight(key, compute, lookup)
+        return self.respond(
+            redis_cache, request, response, False, entry, None, lambda: response_data
+        )
+
+    async def compute(self, redis_cache: Cache, key: str, response, args, kwargs):
+        """Evaluate the function and store its result under `key`."""
+        start = time.perf_counter()
+        response_data = await get_api_response_async(self.func, *args, **kwargs)
+        # the body is rendered once here and returned verbatim on every hit
+        raw = not isinstance(response_data, Response)
+        if raw:
+            response_data = self.encode_body(response_data)
+        delta = time.perf_counter() - start
+        headers = None
+        if response is not None:
+            headers = [
+                (name, value)
+                for name, value in response.headers.items()
+                if name in self.cached_headers
+            ]
+
+        entry = await redis_cache.add_to_cache(
+            key,
+            response_data,
+            calculate_ttl(self.expire),
+            self.namespace,
+            stale_ttl=calculate_ttl(self.stale_ttl),
+            delta=delta,
+            raw=raw,
+            endpoint=self.key_builder.name,
+            headers=headers,
+        )
+        return (response_data, entry)
+
+    async def refresh(self, redis_cache: Cache, key: str, response, args, kwargs):
+        """`compute` with its own dependencies, the request's may be closed."""
+        async with AsyncExitStack() as stack:
+            refresh_kwargs = await redis_cache.enter_refresh_dependencies(
+                stack, self.annotations, kwargs
+            )
+            return await self.compute(redis_cache, key, response, args, refresh_kwargs)
+
+    async def lookup(self, redis_cache: Cache, key: str):
+        """The value stored under `key` by another worker, if it is fresh."""
+        _, in_cache = await redis_cache.check_cache(key, self.namespace)
+        if not in_cache:
+            return None
+        entry = CacheEntry.loads(in_cache)
+        return None if entry.is_stale() else (redis_cache.decode(entry), entry)
+
+    def respond(
+        self, redis_cache: Cache, request, response, cache_hit, entry, ttl, get_content
+    ):
+        """Set the cache headers and answer conditional requests with a 304."""
+        etag = None
+        if entry is not None:
+            etag = entry.etag
+            fresh_for = entry.fresh_for()
+            ttl = ttl if fresh_for is None else fresh_for
+            if redis_cache.requested_resource_not_modified(request, etag):
+                redis_cache.metrics.not_modified.inc(**self.labels)
+                not_modified = Response(status_code=HTTPStatus.NOT_MODIFIED)
+                redis_cache.set_response_headers(
+                    not_modified, cache_hit, etag=etag, ttl=ttl
+                )
+                return not_modified
+        content = build_response(get_content())
+        if isinstance(content, Response):
+            self.copy_headers(content, response, entry if cache_hit else None)
+            target = content
+        else:
+            target = response
+        if target is not None:
+            redis_cache.set_response_headers(target, cache_hit, etag=etag, ttl=ttl)
+        return content
+
+    def copy_headers(self, content: Response, response, entry):
+        """Add the headers set by the endpoint, or stored with the cached `entry`."""
+        if response is not None and content is not response:
+            # keep the headers the endpoint set on its `Response` argument
+            content.raw_headers.extend(response.headers.raw)
+        if entry is not None and entry.headers:
+            # headers the endpoint set when the value was computed
+            for name, value in entry.headers:
+                if name in self.cached_headers:
+                    content.headers.append(name, value)
+
+
 def invalidate(*, namespace: str | None = None):
     """Enable cache invalidating behavior for the decorated function.
 
@@ -77,10 +256,10 @@ def invalidate(*, namespace: str | None = None):
         async def inner_wrapper(*args, **kwargs):
             """delete cached namespace."""
             redis_cache = Cache()
-            if redis_cache.connected:
-                # if the redis client is not connected no caching behavior is performed.
-                pattern = redis_cache.get_cache_key_pattern(namespace)
-                await redis_cache.invalidate(pattern)
+            if redis_cache.connected or redis_cache.reconnecting:
+                # if the redis client is not connected no caching behavior is performed,
+                # while it is reconnecting the invalidation is replayed once it is back.
+                await redis_cache.invalidate(namespace)
             return await get_api_response_async(func, *args, **kwargs)
 
         return inner_wrapper
@@ -97,6 +276,40 @@ async def get_api_response_async(func, *args, **kwargs):
     )
 
 
+def find_or_inject_parameter(wrapper, param_type: type) -> Tuple[str, bool]:
+    """Return the name of the `param_type` argument of `wrapper`, adding one if missing.
+
+    FastAPI only passes the `Request` and `Response` objects to endpoints that
+    declare them, so they are added to the signature FastAPI sees and removed
+    again before the wrapped function is called.
+
+    Returns:
+        Tuple[str, bool]: The argument name and whether it was injected.
+    """
+    sig = signature(wrapper)
+    for param in sig.parameters.values():
+        if param.annotation is param_type:
+            return (param.name, False)
+    name = f"__cache_{param_type.__name__.lower()}"
+    parameters = [
+        param
+        for param in sig.parameters.values()
+        if param.kind != Parameter.VAR_KEYWORD
+    ]
+    parameters.append(Parameter(name, Parameter.KEYWORD_ONLY, annotation=param_type))
+    parameters.extend(
+        param
+        for param in sig.parameters.values()
+        if param.kind == Parameter.VAR_KEYWORD
+    )
+    wrapper.__signature__ = sig.replace(parameters=parameters)
+    return (name, True)
+
+
+def pop_or_get(kwargs: Dict[str, Any], name: str, injected: bool) -> Any:
+    return kwargs.pop(name, None) if injected else kwargs.get(name)
+
+
 def calculate_ttl(expire: Union[int, timedelta]) -> int:
     """ "Converts expire time to total seconds and ensures that ttl is capped at one year."""
     if isinstance(expire, timedelta):
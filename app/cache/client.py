@@ -1,13 +1,50 @@
+import asyncio
 import json
 import logging
+import time
+import uuid
+from contextlib import AsyncExitStack
 from datetime import datetime, timedelta
-from typing import Callable, Dict, List, Optional, Tuple, Type, Union, Any
+from typing import (
+    Any,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 from fastapi import Request, Response
 from redis.asyncio import client
+from redis.exceptions import ResponseError
 
+from cache.backends import STANDALONE, pubsub_client, uses_hash_tags
+from cache.breaker import (
+    DEFAULT_FAILURE_THRESHOLD,
+    DEFAULT_RESET_TIMEOUT,
+    REDIS_ERRORS,
+    BreakerState,
+    CircuitBreaker,
+)
+from cache.bus import InvalidationBus
+from cache.codecs import (
+    DEFAULT_COMPRESS_MIN_SIZE,
+    JsonCodec,
+    PayloadSerializer,
+    RawCodec,
+)
+from cache.entry import CacheEntry, content_digest, format_etag
 from cache.enums import RedisEvent, RedisStatus
-from cache.key_gen import get_cache_key, get_cache_key_pattern
+from cache.flight import DEFAULT_LOCK_TTL_MS, SingleFlight
+from cache.key_gen import KeyBuilder, get_cache_index_key, get_cache_key
+from cache.local import LocalCache
+from cache.metrics import CacheMetrics
 from cache.redis import redis_connect
 from cache.util import serialize_json
 
@@ -15,6 +52,18 @@ DEFAULT_RESPONSE_HEADER = "X-FastAPI-Cache"
 ALLOWED_HTTP_TYPES = ["GET"]
 LOG_TIMESTAMP = "%m/%d/%Y %I:%M:%S %p"
 HTTP_TIME = "%a, %d %b %Y %H:%M:%S GMT"
+INVALIDATE_BATCH_SIZE = 500
+# logged even when per-event logging is turned off
+ALWAYS_LOGGED_EVENTS = {
+    RedisEvent.CONNECT_BEGIN,
+    RedisEvent.CONNECT_SUCCESS,
+    RedisEvent.CONNECT_FAIL,
+    RedisEvent.FAILED_TO_CACHE_KEY,
+    RedisEvent.FAILED_TO_REFRESH_KEY,
+    RedisEvent.REDIS_UNAVAILABLE,
+    RedisEvent.CIRCUIT_OPENED,
+    RedisEvent.CIRCUIT_CLOSED,
+}
 
 
 logger = logging.getLogger(__name__)
@@ -39,10 +88,31 @@ class Cache(metaclass=MetaSingleton):
     response_header: str = None
     status: RedisStatus = RedisStatus.NONE
     redis: client.Redis = None
+    local: Optional[LocalCache] = None
+    bus: Optional[InvalidationBus] = None
+    flight: SingleFlight = SingleFlight()
+    serializer: PayloadSerializer = PayloadSerializer()
+    refresh_dependencies: Dict[Type[Any], Callable[[], AsyncContextManager]] = {}
+    metrics: CacheMetrics = CacheMetrics()
+    log_events: bool = True
+    backend: str = STANDALONE
+    nodes: Optional[List[str]] = None
+    hash_tags: bool = False
+    breaker: CircuitBreaker = CircuitBreaker()
+    _listening: bool = False
+    _background_tasks: Set[asyncio.Task] = set()
+    # invalidations that could not reach Redis, replayed once it is back
+    _pending_namespaces: Set[Optional[str]] = set()
+    _pending_keys: Set[str] = set()
 
     @property
     def connected(self):
-        return self.status == RedisStatus.CONNECTED
+        return self.status == RedisStatus.CONNECTED and self.breaker.closed
+
+    @property
+    def reconnecting(self):
+        """Redis is unreachable and the breaker is waiting for it to come back."""
+        return not self.breaker.closed
 
     @property
     def not_connected(self):
@@ -54,6 +124,21 @@ class Cache(metaclass=MetaSingleton):
         prefix: Optional[str] = None,
         response_header: Optional[str] = None,
         ignore_arg_types: Optional[List[Type[Any]]] = None,
+        local_cache_size: int = 0,
+        local_cache_ttl: int = 60,
+        lock_ttl_ms: int = DEFAULT_LOCK_TTL_MS,
+        refresh_dependencies: Optional[
+            Dict[Type[Any], Callable[[], AsyncContextManager]]
+        ] = None,
+        codec: str = JsonCodec.name,
+        compression: Optional[str] = None,
+        compress_min_size: int = DEFAULT_COMPRESS_MIN_SIZE,
+        log_events: bool = True,
+        pool_options: Optional[Dict[str, Any]] = None,
+        breaker_failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        breaker_reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        backend: str = STANDALONE,
+        nodes: Optional[List[str]] = None,
     ) -> None:
         """Connect to a Redis database using `host_url` and configure cache settings.
 
@@ -68,18 +153,168 @@ class Cache(metaclass=MetaSingleton):
                 are any arguments that have no effect on the response (such as a
                 `Request` or `Response` object), including their type in this list
                 will ignore those arguments when the key is created. Defaults to None.
+            local_cache_size (int, optional): Maximum number of entries kept in the
+                per-process LRU tier in front of Redis. `0` disables the local
+                tier. Defaults to 0.
+            local_cache_ttl (int, optional): Maximum number of seconds an entry lives
+                in the local tier, regardless of its Redis TTL. It is also the
+                fallback bound for staleness when an invalidation message published
+                by another worker is missed. Defaults to 60.
+            lock_ttl_ms (int, optional): Lifetime of the Redis lock held by the worker
+                that computes a missing key while other workers wait for its result.
+                Defaults to 10,000.
+            refresh_dependencies (Dict[Type[object], Callable], optional): Factories of
+                async context managers used to replace request-scoped arguments (such
+                as a database session) when a stale value is refreshed in the
+                background, after the request that triggered it has finished. Keys
+                are matched against the type annotations of the endpoint arguments.
+                Defaults to None.
+            codec (str, optional): Serialization of cached values, one of `json`,
+                `orjson` or `msgpack`. Defaults to `json`.
+            compression (str, optional): Compression of large payloads, one of
+                `zlib`, `zstd` or `lz4`. Defaults to None (no compression).
+            compress_min_size (int, optional): Payloads smaller than this number of
+                bytes are stored uncompressed. Defaults to 1024.
+            log_events (bool, optional): Log a line for every cache event. Hits,
+                misses and the other events are always counted in `metrics`, so
+                this can be turned off in production; connection events and
+                failures are still logged. Defaults to True.
+            pool_options (Dict[str, object], optional): Options of the connection
+                pool, passed to `cache.redis.create_pool` (`max_connections`,
+                `socket_timeout`, `health_check_interval`...). Defaults to None.
+            breaker_failure_threshold (int, optional): Consecutive Redis connection
+                errors after which cache operations bypass Redis until it answers
+                again. Defaults to 5.
+            breaker_reset_timeout (float, optional): Seconds before the first attempt
+                to reach Redis again, doubled after every failed attempt. Defaults
+                to 5.
+            backend (str, optional): `redis` for a single server, `cluster` for a
+                Redis Cluster reached through `host_url`, or `sharded` to spread keys
+                over the standalone servers of `nodes` with consistent hashing. With
+                the last two, namespace prefixes are hash tags, so every key of a
+                namespace lives on the same node. Defaults to `redis`.
+            nodes (List[str], optional): URLs of the servers of the `sharded`
+                backend. Defaults to `[host_url]`.
         """
         self.host_url = host_url
         self.prefix = prefix
         self.response_header = response_header or DEFAULT_RESPONSE_HEADER
         self.ignore_arg_types = ignore_arg_types or []
+        self.log_events = log_events
+        self.pool_options = pool_options or {}
+        self.backend = backend
+        self.nodes = nodes
+        self.hash_tags = uses_hash_tags(backend)
+        self.local = (
+            LocalCache(max_size=local_cache_size, ttl=local_cache_ttl)
+            if local_cache_size > 0
+            else None
+        )
+        self.flight = SingleFlight(
+            lock_ttl_ms=lock_ttl_ms, on_redis_error=self.record_failure
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=breaker_failure_threshold,
+            reset_timeout=breaker_reset_timeout,
+            on_transition=self._on_breaker_transition,
+        )
+        self._pending_namespaces = set()
+        self._pending_keys = set()
+        self.refresh_dependencies = refresh_dependencies or {}
+        self.serializer = PayloadSerializer(
+            codec=codec, compression=compression, compress_min_size=compress_min_size
+        )
         await self._connect()
+        if self.status == RedisStatus.CONNECTED:
+            self._create_bus()
+        elif self.status == RedisStatus.CONN_ERROR:
+            # keep trying in the background instead of caching nothing until restart
+            self.breaker.open(self._probe)
+
+    def _create_bus(self) -> None:
+        if self.local is not None and self.bus is None:
+            self.bus = InvalidationBus(
+                pubsub_client(self.redis),
+                channel=f"{self.prefix}|invalidation",
+                local=self.local,
+            )
+
+    async def start_invalidation_listener(self) -> None:
+        """Subscribe this worker to invalidations published by the other workers."""
+        self._listening = True
+        if self.bus is not None:
+            self.bus.start()
+
+    async def stop_invalidation_listener(self) -> None:
+        self._listening = False
+        if self.bus is not None:
+            await self.bus.stop()
+
+    async def stop_reconnecting(self) -> None:
+        await self.breaker.stop()
+
+    def record_failure(self, error: Exception) -> None:
+        """Count a Redis connection error towards opening the circuit breaker."""
+        self.log(RedisEvent.REDIS_UNAVAILABLE, msg=str(error) or type(error).__name__)
+        self.breaker.record_failure(self._probe)
+
+    async def _probe(self) -> bool:
+        """Reconnect to Redis, returning whether caching can be resumed."""
+        if self.redis is None:
+            # the server was unreachable at startup
+            await self._connect()
+            if self.status != RedisStatus.CONNECTED:
+                return False
+            self._create_bus()
+            if self._listening:
+                await self.start_invalidation_listener()
+        elif not await self.redis.ping():
+            return False
+        await self._replay_invalidations()
+        return True
+
+    async def _replay_invalidations(self) -> None:
+        for namespace in list(self._pending_namespaces):
+            deleted = await self._delete_namespace(namespace)
+            self._pending_namespaces.discard(namespace)
+            self.log(
+                RedisEvent.NAMESPACE_INVALIDATED,
+                msg=f"namespace={namespace}, deleted={deleted}",
+            )
+            if self.bus is not None:
+                await self.bus.publish(namespace=namespace)
+        if self._pending_keys:
+            keys = list(self._pending_keys)
+            await self.redis.unlink(*keys)
+            self._pending_keys.difference_update(keys)
+            if self.bus is not None:
+                for key in keys:
+                    await self.bus.publish(key=key)
+
+    def _on_breaker_transition(
+        self, previous: BreakerState, state: BreakerState
+    ) -> None:
+        self.metrics.breaker_state.set(state.value)
+        self.metrics.breaker_transitions.inc(
+            **{"from": previous.name.lower(), "to": state.name.lower()}
+        )
+        if state == BreakerState.OPEN and previous == BreakerState.CLOSED:
+            self.log(
+                RedisEvent.CIRCUIT_OPENED,
+                msg="Redis is unreachable, cache operations bypass it.",
+            )
+        if state == BreakerState.CLOSED:
+            self.log(
+                RedisEvent.CIRCUIT_CLOSED, msg="Redis is reachable, caching resumed."
+            )
 
     async def _connect(self):
         self.log(
             RedisEvent.CONNECT_BEGIN, msg="Attempting to connect to Redis server..."
         )
-        self.status, self.redis = await redis_connect(self.host_url)
+        self.status, self.redis = await redis_connect(
+            self.host_url, self.pool_options, self.backend, self.nodes
+        )
         if self.status == RedisStatus.CONNECTED:
             self.log(
                 RedisEvent.CONNECT_SUCCESS, msg="Redis client is connected to server."
@@ -104,25 +339,170 @@ class Cache(metaclass=MetaSingleton):
             )
         )
 
+    def get_namespace_prefix(self, namespace: Optional[str]) -> str:
+        if self.hash_tags:
+            # keys of a namespace hash to the same node, so it is renamed and
+            # invalidated with single-node commands
+            return f"{{{self.prefix}|{namespace}}}"
+        return f"{self.prefix}|{namespace}"
+
     def get_cache_key(
         self, func: Callable, namespace: str, *args: List, **kwargs: Dict
     ) -> str:
         return get_cache_key(
-            f"{self.prefix}|{namespace}", self.ignore_arg_types, func, *args, **kwargs
+            self.get_namespace_prefix(namespace),
+            self.ignore_arg_types,
+            func,
+            *args,
+            **kwargs,
         )
 
-    def get_cache_key_pattern(self, namespace: str) -> str:
-        return get_cache_key_pattern(f"{self.prefix}|{namespace}")
+    def build_cache_key(
+        self,
+        key_builder: KeyBuilder,
+        namespace: Optional[str],
+        args: List,
+        kwargs: Dict,
+    ) -> str:
+        return key_builder.build(
+            self.get_namespace_prefix(namespace), self.ignore_arg_types, args, kwargs
+        )
 
-    async def check_cache(self, key: str) -> Tuple[int, Optional[bytes]]:
-        async with self.redis.pipeline() as pipe:
-            ttl, in_cache = await pipe.ttl(key).get(key).execute()
-            if in_cache:
-                self.log(RedisEvent.KEY_FOUND_IN_CACHE, key=key)
-            return (ttl, in_cache)
+    def get_cache_index_key(self, namespace: Optional[str]) -> str:
+        return get_cache_index_key(self.get_namespace_prefix(namespace))
+
+    async def check_cache(
+        self, key: str, namespace: Optional[str] = None
+    ) -> Tuple[int, Optional[bytes]]:
+        if self.local is not None:
+            in_local = self.local.get(key)
+            if in_local:
+                self.metrics.local_hits.inc(namespace=namespace)
+                self.log(RedisEvent.KEY_FOUND_IN_LOCAL_CACHE, key=key)
+                return in_local
+        start = time.perf_counter()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                ttl, in_cache = await pipe.ttl(key).get(key).execute()
+        except REDIS_ERRORS as e:
+            # a lookup that cannot reach Redis is a miss, not a failed request
+            self.record_failure(e)
+            return (0, None)
+        self.breaker.record_success()
+        self.metrics.redis_latency.observe(
+            time.perf_counter() - start, operation="get", namespace=namespace
+        )
+        if in_cache:
+            self.log(RedisEvent.KEY_FOUND_IN_CACHE, key=key)
+            if self.local is not None:
+                # stale entries stay in Redis only, so every worker sees the refresh
+                fresh_for = CacheEntry.loads(in_cache).fresh_for()
+                if fresh_for is None or fresh_for > 0:
+                    local_ttl = ttl if fresh_for is None else min(ttl, fresh_for)
+                    self.local.set(key, in_cache, local_ttl, namespace)
+        return (ttl, in_cache)
+
+    async def get_many(
+        self, keys: Sequence[str], namespace: Optional[str] = None
+    ) -> List[Optional[bytes]]:
+        """Return the values of `keys`, from the local tier first, then with one `MGET`."""
+        values: List[Optional[bytes]] = [None] * len(keys)
+        missing = list(range(len(keys)))
+        if self.local is not None:
+            missing = []
+            for i, key in enumerate(keys):
+                in_local = self.local.get(key)
+                if in_local:
+                    values[i] = in_local[1]
+                else:
+                    missing.append(i)
+            self.metrics.local_hits.inc(len(keys) - len(missing), namespace=namespace)
+        if missing:
+            start = time.perf_counter()
+            try:
+                in_cache = await self.redis.mget([keys[i] for i in missing])
+            except REDIS_ERRORS as e:
+                self.record_failure(e)
+                return values
+            self.breaker.record_success()
+            self.metrics.redis_latency.observe(
+                time.perf_counter() - start, operation="mget", namespace=namespace
+            )
+            for i, value in zip(missing, in_cache, strict=True):
+                values[i] = value
+                if value is not None and self.local is not None:
+                    self.local.set(keys[i], value, self.local.ttl, namespace)
+        return values
+
+    async def set_many(
+        self, mapping: Dict[str, bytes], expire: int, namespace: Optional[str] = None
+    ) -> None:
+        """Store every value of `mapping` under its key for `expire` seconds."""
+        if not mapping:
+            return
+        start = time.perf_counter()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(name=key, value=value, ex=expire)
+                await pipe.execute()
+        except REDIS_ERRORS as e:
+            self.record_failure(e)
+            return
+        self.breaker.record_success()
+        self.metrics.redis_latency.observe(
+            time.perf_counter() - start, operation="set", namespace=namespace
+        )
+        self.metrics.bytes_stored.inc(
+            sum(map(len, mapping.values())), namespace=namespace
+        )
+        if self.local is not None:
+            for key, value in mapping.items():
+                self.local.set(key, value, expire, namespace)
+
+    def decode(self, entry: CacheEntry) -> Any:
+        return self.serializer.decode(entry.payload, entry.codec, entry.compression)
+
+    async def single_flight(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        lookup: Callable[[], Awaitable[Optional[Any]]],
+    ) -> Any:
+        """Run `compute` once for concurrent misses of `key`, in-process and across workers."""
+        return await self.flight.run(self.redis, key, compute, lookup)
+
+    def refresh_in_background(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> None:
+        """Schedule `compute` for `key` unless a refresh is already running somewhere."""
+        task = asyncio.create_task(self._refresh(key, compute))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _refresh(self, key: str, compute: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            if await self.flight.refresh(self.redis, key, compute):
+                self.log(RedisEvent.KEY_REFRESHED, key=key)
+        except Exception as e:
+            self.log(RedisEvent.FAILED_TO_REFRESH_KEY, msg=str(e), key=key)
+
+    async def enter_refresh_dependencies(
+        self,
+        stack: AsyncExitStack,
+        annotations: Dict[str, Any],
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Return a copy of `kwargs` with request-scoped arguments freshly opened on `stack`."""
+        refresh_kwargs = dict(kwargs)
+        for name, annotation in annotations.items():
+            factory = self.refresh_dependencies.get(annotation)
+            if factory is not None and name in refresh_kwargs:
+                refresh_kwargs[name] = await stack.enter_async_context(factory())
+        return refresh_kwargs
 
     def requested_resource_not_modified(
-        self, request: Request, cached_data: str
+        self, request: Optional[Request], etag: str
     ) -> bool:
         if not request or "If-None-Match" not in request.headers:
             return False
@@ -131,48 +511,210 @@ class Cache(metaclass=MetaSingleton):
         ]
         if len(check_etags) == 1 and check_etags[0] == "*":
             return True
-        return self.get_etag(cached_data) in check_etags
+        # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+        return etag in (check_etag.removeprefix("W/") for check_etag in check_etags)
 
     async def add_to_cache(
-        self, key: str, value: Union[Dict, Response], expire: int
-    ) -> bool:
+        self,
+        key: str,
+        value: Union[Dict, Response, bytes],
+        expire: int,
+        namespace: Optional[str] = None,
+        stale_ttl: int = 0,
+        delta: float = 0.0,
+        raw: bool = False,
+        endpoint: Optional[str] = None,
+        headers: Optional[List[Tuple[str, str]]] = None,
+    ) -> Optional[CacheEntry]:
+        """Store `value` under `key` and return the stored entry, or None on failure.
+
+        Args:
+            expire (int): Seconds until the value is considered stale.
+            stale_ttl (int, optional): Extra seconds the stale value is kept in Redis
+                so it can be served while it is refreshed. Defaults to 0.
+            delta (float, optional): Seconds it took to compute the value, used for
+                probabilistic early refreshes. Defaults to 0.
+            raw (bool, optional): `value` is an already rendered response body, which
+                is stored and later returned verbatim. Defaults to False.
+            endpoint (str, optional): Name of the endpoint the value belongs to, used
+                to label the cache metrics. Defaults to None.
+            headers (List[Tuple[str, str]], optional): Response headers set by the
+                endpoint, returned again on hits. Defaults to None.
+        """
         try:
-            if isinstance(value, Response):
-                response_data = value.body
+            if raw:
+                body, codec = value, RawCodec.id
+            elif isinstance(value, Response):
+                body, codec = value.body, JsonCodec.id
             else:
-                response_data = serialize_json(value)
+                codec = self.serializer.codec.id
+                body = self.serializer.codec.encode(value)
 
         except TypeError:
             message = f"Object of type {type(value)} is not JSON-serializable"
+            self.metrics.store_failures.inc(namespace=namespace, endpoint=endpoint)
             self.log(RedisEvent.FAILED_TO_CACHE_KEY, msg=message, key=key)
-            return False
-        cached = await self.redis.set(name=key, value=response_data, ex=expire)
-        if cached:
-            self.log(RedisEvent.KEY_ADDED_TO_CACHE)
-        else:  # pragma: no cover
+            return None
+        payload, codec, compression = self.serializer.compress(body, codec)
+        entry = CacheEntry(
+            payload,
+            expire_at=time.time() + expire,
+            delta=delta,
+            codec=codec,
+            compression=compression,
+            digest=content_digest(body),
+            headers=headers,
+        )
+        response_data = entry.dumps()
+        redis_ttl = expire + stale_ttl
+        index_key = self.get_cache_index_key(namespace)
+        start = time.perf_counter()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                # the index lives as long as the longest-lived key it references
+                pipe.set(name=key, value=response_data, ex=redis_ttl)
+                pipe.sadd(index_key, key)
+                pipe.expire(index_key, redis_ttl, nx=True)
+                pipe.expire(index_key, redis_ttl, gt=True)
+                cached, *_ = await pipe.execute()
+        except REDIS_ERRORS as e:
+            self.metrics.store_failures.inc(namespace=namespace, endpoint=endpoint)
+            self.record_failure(e)
+            return None
+        self.breaker.record_success()
+        self.metrics.redis_latency.observe(
+            time.perf_counter() - start, operation="set", namespace=namespace
+        )
+        if not cached:  # pragma: no cover
+            self.metrics.store_failures.inc(namespace=namespace, endpoint=endpoint)
             self.log(RedisEvent.FAILED_TO_CACHE_KEY, key=key, value=str(value))
-        return cached
+            return None
+        self.metrics.stores.inc(namespace=namespace, endpoint=endpoint)
+        self.metrics.bytes_stored.inc(
+            len(response_data), namespace=namespace, endpoint=endpoint
+        )
+        self.log(RedisEvent.KEY_ADDED_TO_CACHE)
+        if self.local is not None:
+            self.local.set(key, response_data, expire, namespace=namespace)
+        return entry
 
-    async def invalidate(self, pattern: str) -> bool:
-        keys_to_delete = await self.redis.keys(pattern=pattern)
-        if keys_to_delete:
-            await self.redis.delete(*keys_to_delete)
-        self.log(RedisEvent.PATTERN_INVALIDATED, pattern=pattern)
+    async def invalidate(self, namespace: Optional[str] = None) -> int:
+        """Delete every key stored under `namespace` and return how many were removed.
+
+        The namespace index is renamed first, so keys cached while the invalidation
+        is running go into a fresh index instead of being lost, and the indexed
+        keys are removed with non-blocking `UNLINK` batches. While Redis is
+        unreachable, the invalidation is replayed once it is back.
+        """
+        if self.local is not None:
+            self.local.invalidate(namespace)
+        if not self.connected:
+            self._pending_namespaces.add(namespace)
+            return 0
+        start = time.perf_counter()
+        try:
+            deleted = await self._delete_namespace(namespace)
+            elapsed = time.perf_counter() - start
+            if self.bus is not None:
+                await self.bus.publish(namespace=namespace)
+        except REDIS_ERRORS as e:
+            self._pending_namespaces.add(namespace)
+            self.record_failure(e)
+            return 0
+        self.breaker.record_success()
+        self.metrics.redis_latency.observe(
+            elapsed, operation="invalidate", namespace=namespace
+        )
+        self.metrics.invalidations.inc(namespace=namespace)
+        self.metrics.invalidated_keys.inc(deleted, namespace=namespace)
+        self.log(
+            RedisEvent.NAMESPACE_INVALIDATED,
+            msg=f"namespace={namespace}, deleted={deleted}",
+        )
+        return deleted
+
+    async def _delete_namespace(self, namespace: Optional[str]) -> int:
+        index_key = self.get_cache_index_key(namespace)
+        invalidating_key = f"{index_key}:{uuid.uuid4().hex}"
+        try:
+            await self.redis.rename(index_key, invalidating_key)
+        except ResponseError:
+            # nothing has been cached under this namespace
+            return 0
+        deleted = 0
+        batch = []
+        async for key in self.redis.sscan_iter(
+            invalidating_key, count=INVALIDATE_BATCH_SIZE
+        ):
+            batch.append(key)
+            if len(batch) >= INVALIDATE_BATCH_SIZE:
+                deleted += await self.redis.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await self.redis.unlink(*batch)
+        await self.redis.unlink(invalidating_key)
+        return deleted
+
+    async def invalidate_key(self, key: str) -> None:
+        await self.invalidate_keys(key)
+
+    async def invalidate_keys(self, *keys: str) -> None:
+        if not keys:
+            return
+        if self.local is not None:
+            for key in keys:
+                self.local.delete(key)
+        if not self.connected:
+            self._pending_keys.update(keys)
+            return
+        try:
+            await self.redis.unlink(*keys)
+            for key in keys:
+                self.log(RedisEvent.KEY_INVALIDATED, key=key)
+                if self.bus is not None:
+                    await self.bus.publish(key=key)
+        except REDIS_ERRORS as e:
+            self._pending_keys.update(keys)
+            self.record_failure(e)
+            return
+        self.breaker.record_success()
 
     def set_response_headers(
         self,
         response: Response,
         cache_hit: bool,
-        response_data: Optional[Union[Dict, bytes, str]] = None,
+        etag: Optional[str] = None,
         ttl: Optional[int] = None,
     ) -> None:
         response.headers[self.response_header] = "Hit" if cache_hit else "Miss"
         if ttl is not None:
+            ttl = max(int(ttl), 0)
             expires_at = datetime.utcnow() + timedelta(seconds=ttl)
             response.headers["Expires"] = expires_at.strftime(HTTP_TIME)
             response.headers["Cache-Control"] = f"max-age={ttl}"
-        if response_data is not None:
-            response.headers["ETag"] = self.get_etag(response_data)
+        if etag is not None:
+            response.headers["ETag"] = etag
+
+    def render_metrics(self) -> str:
+        """Render the cache metrics in the Prometheus text format."""
+        flight = self.flight.stats
+        for result, value in (
+            ("computed", flight.computed),
+            ("coalesced_local", flight.coalesced_local),
+            ("coalesced_remote", flight.coalesced_remote),
+            ("lock_timeout", flight.lock_timeouts),
+            ("refreshed", flight.refreshed),
+        ):
+            self.metrics.single_flight.set(value, result=result)
+        if self.bus is not None:
+            bus = self.bus.stats
+            self.metrics.invalidation_messages.set(bus.published, direction="published")
+            self.metrics.invalidation_messages.set(bus.received, direction="received")
+            self.metrics.invalidation_reconnects.set(bus.reconnects)
+            self.metrics.invalidation_lag.set(bus.last_lag, stat="last")
+            self.metrics.invalidation_lag.set(bus.max_lag, stat="max")
+            self.metrics.invalidation_lag.set(bus.avg_lag, stat="avg")
+        return self.metrics.render()
 
     def log(
         self,
@@ -183,6 +725,8 @@ class Cache(metaclass=MetaSingleton):
         value: Optional[str] = None,
     ):
         """Log `RedisEvent` using the configured `Logger` object"""
+        if not self.log_events and event not in ALWAYS_LOGGED_EVENTS:
+            return
         message = event.name
         if msg:
             message += f": {msg}"
@@ -196,8 +740,8 @@ class Cache(metaclass=MetaSingleton):
 
     @staticmethod
     def get_etag(cached_data: Union[str, bytes, Dict]) -> str:
-        if isinstance(cached_data, bytes):
-            cached_data = cached_data.decode()
-        if not isinstance(cached_data, str):
-            cached_data = serialize_json(cached_data)
-        return f"W/{hash(cached_data)}"
+        if isinstance(cached_data, str):
+            cached_data = cached_data.encode()
+        if not isinstance(cached_data, bytes):
+            cached_data = serialize_json(cached_data).encode()
+        return format_etag(content_digest(cached_data))
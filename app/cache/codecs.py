@@ -0,0 +1,294 @@
+"""codecs.py"""
+
+import zlib
+from base64 import b64encode
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from cache.util import deserialize_json, restore_spec_types, serialize_json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+# modules of the optional codecs and compressions, installed with the
+# `cache-codecs` extra
+OPTIONAL_MODULES = {
+    "orjson": orjson,
+    "msgpack": msgpack,
+    "zstandard": zstandard,
+    "lz4": lz4_frame,
+}
+
+SPEC_TYPE_MARKER = b"_spec_type"
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+
+
+class Codec:
+    """Turns cached values into bytes and back.
+
+    Every codec keeps the round-trip semantics of `SERIALIZE_OBJ_MAP`: values
+    are converted with `jsonable_encoder`, `bytes` survive the round trip and
+    tagged `_spec_type` objects are restored to their original type.
+    """
+
+    id: int
+    name: str
+    requires: Optional[str] = None
+
+    def encode(self, value: Any) -> bytes:  # pragma: no cover
+        raise NotImplementedError
+
+    def decode(self, payload: bytes) -> Any:  # pragma: no cover
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    id = 0
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        return serialize_json(value).encode()
+
+    def decode(self, payload: bytes) -> Any:
+        return deserialize_json(payload)
+
+
+class OrjsonCodec(Codec):
+    id = 1
+    name = "orjson"
+    requires = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ValueError("The orjson cache codec requires `orjson` to be installed")
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, bytes):
+            return {"_spec_type": str(bytes), "val": b64encode(obj).decode()}
+        return jsonable_encoder(obj, custom_encoder={bytes: OrjsonCodec._default})
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(
+            value, default=self._default, option=orjson.OPT_NON_STR_KEYS
+        )
+
+    def decode(self, payload: bytes) -> Any:
+        value = orjson.loads(payload)
+        # walking the whole document is only needed when something was tagged
+        if SPEC_TYPE_MARKER in payload:
+            value = restore_spec_types(value)
+        return value
+
+
+class MsgpackCodec(Codec):
+    id = 2
+    name = "msgpack"
+    requires = "msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ValueError(
+                "The msgpack cache codec requires `msgpack` to be installed"
+            )
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        # msgpack stores bytes natively, everything else follows jsonable_encoder
+        return jsonable_encoder(obj, custom_encoder={bytes: lambda x: x})
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=self._default, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        value = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        if SPEC_TYPE_MARKER in payload:
+            value = restore_spec_types(value)
+        return value
+
+
+class RawCodec(Codec):
+    """Stores already encoded bytes, such as a rendered response body, verbatim."""
+
+    id = 3
+    name = "raw"
+
+    def encode(self, value: bytes) -> bytes:
+        return bytes(value)
+
+    def decode(self, payload: bytes) -> bytes:
+        return payload
+
+
+class Compressor:
+    id: int
+    name: str
+    requires: Optional[str] = None
+
+    def compress(self, data: bytes) -> bytes:  # pragma: no cover
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:  # pragma: no cover
+        raise NotImplementedError
+
+
+class ZlibCompressor(Compressor):
+    id = 1
+    name = "zlib"
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, 1)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    id = 2
+    name = "zstd"
+    requires = "zstandard"
+
+    def __init__(self):
+        if zstandard is None:
+            raise ValueError(
+                "The zstd cache compression requires `zstandard` to be installed"
+            )
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class Lz4Compressor(Compressor):
+    id = 3
+    name = "lz4"
+    requires = "lz4"
+
+    def __init__(self):
+        if lz4_frame is None:
+            raise ValueError("The lz4 cache compression requires `lz4` to be installed")
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4_frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4_frame.decompress(data)
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec, OrjsonCodec, MsgpackCodec)}
+CODECS_BY_ID = {codec.id: codec for codec in (*CODECS.values(), RawCodec)}
+COMPRESSORS = {
+    compressor.name: compressor
+    for compressor in (ZlibCompressor, ZstdCompressor, Lz4Compressor)
+}
+NO_COMPRESSION = 0
+
+
+def is_available(backend: type[Codec] | type[Compressor]) -> bool:
+    """Whether the module `backend` requires is installed."""
+    return backend.requires is None or OPTIONAL_MODULES[backend.requires] is not None
+
+
+def check_codec(codec: str) -> str:
+    """Return `codec` if it is known and installed, raise ValueError otherwise."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown cache codec: {codec}")
+    if not is_available(CODECS[codec]):
+        raise ValueError(
+            f"The {codec} cache codec requires `{CODECS[codec].requires}`, "
+            "install the `cache-codecs` extra"
+        )
+    return codec
+
+
+def check_compression(compression: Optional[str]) -> Optional[str]:
+    """Return `compression` if it is None, known and installed, else raise ValueError."""
+    if compression is None:
+        return None
+    if compression not in COMPRESSORS:
+        raise ValueError(f"Unknown cache compression: {compression}")
+    if not is_available(COMPRESSORS[compression]):
+        raise ValueError(
+            f"The {compression} cache compression requires "
+            f"`{COMPRESSORS[compression].requires}`, install the `cache-codecs` extra"
+        )
+    return compression
+
+
+class PayloadSerializer:
+    """Encodes values with the configured codec and compresses large payloads.
+
+    Decoding is driven by the codec and compression ids stored in the entry
+    header, so entries written with another configuration remain readable.
+    """
+
+    def __init__(
+        self,
+        codec: str = JsonCodec.name,
+        compression: Optional[str] = None,
+        compress_min_size: int = DEFAULT_COMPRESS_MIN_SIZE,
+    ):
+        check_codec(codec)
+        check_compression(compression)
+        self.codec = CODECS[codec]()
+        self.compressor = COMPRESSORS[compression]() if compression else None
+        self.compress_min_size = compress_min_size
+        self._codecs: Dict[int, Codec] = {self.codec.id: self.codec}
+        self._compressors: Dict[int, Compressor] = (
+            {self.compressor.id: self.compressor} if self.compressor else {}
+        )
+
+    def encode(self, value: Any) -> Tuple[bytes, int, int]:
+        """Return `(payload, codec id, compression id)` for `value`."""
+        return self.compress(self.codec.encode(value), self.codec.id)
+
+    def compress(self, payload: bytes, codec_id: int) -> Tuple[bytes, int, int]:
+        if self.compressor is None or len(payload) < self.compress_min_size:
+            return (payload, codec_id, NO_COMPRESSION)
+        return (self.compressor.compress(payload), codec_id, self.compressor.id)
+
+    def decompress(self, payload: bytes, compression_id: int) -> bytes:
+        if compression_id == NO_COMPRESSION:
+            return payload
+        return self._get_compressor(compression_id).decompress(payload)
+
+    def decode(self, payload: bytes, codec_id: int, compression_id: int) -> Any:
+        payload = self.decompress(payload, compression_id)
+        return self._get_codec(codec_id).decode(payload)
+
+    def _get_codec(self, codec_id: int) -> Codec:
+        codec = self._codecs.get(codec_id)
+        if codec is None:
+            codec = self._codecs[codec_id] = CODECS_BY_ID[codec_id]()
+        return codec
+
+    def _get_compressor(self, compression_id: int) -> Compressor:
+        compressor = self._compressors.get(compression_id)
+        if compressor is None:
+            compressor_class = next(
+                c for c in COMPRESSORS.values() if c.id == compression_id
+            )
+            compressor = self._compressors[compression_id] = compressor_class()
+        return compressor
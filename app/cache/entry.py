@@ -0,0 +1,132 @@
+"""entry.py"""
+
+import json
+import math
+import random
+import struct
+import time
+from hashlib import blake2b
+from typing import List, Optional, Tuple
+
+ENTRY_MAGIC = b"\xfc"
+ENTRY_VERSION = 4
+ETAG_DIGEST_SIZE = 16
+# magic, version, soft expiry (unix time), seconds it took to compute the value,
+# codec id, compression id, content digest used as the ETag, size of the
+# response headers set by the endpoint, stored between the header and payload
+ENTRY_HEADER = struct.Struct(f"!cBdfBB{ETAG_DIGEST_SIZE}sH")
+ENTRY_HEADERS = {
+    1: struct.Struct("!cBdf"),
+    2: struct.Struct("!cBdfBB"),
+    3: struct.Struct(f"!cBdfBB{ETAG_DIGEST_SIZE}s"),
+    ENTRY_VERSION: ENTRY_HEADER,
+}
+
+
+def content_digest(payload: bytes) -> bytes:
+    """Digest of `payload` that is identical in every process, unlike `hash()`."""
+    return blake2b(payload, digest_size=ETAG_DIGEST_SIZE).digest()
+
+
+def format_etag(digest: bytes) -> str:
+    return f'"{digest.hex()}"'
+
+
+class CacheEntry:
+    """Cached payload together with the metadata needed to refresh it in time.
+
+    Entries are stored as a small binary header followed by the payload. Values
+    written before the header existed are plain JSON (which can never start
+    with `ENTRY_MAGIC`) and are read back as entries without metadata. The
+    header records the codec and compression of the payload, so entries stay
+    readable when the cache configuration changes, and the digest of the
+    uncompressed payload, so conditional requests are answered without
+    decoding it. Response headers set by the endpoint are kept along, so
+    hits return them too.
+    """
+
+    __slots__ = (
+        "payload",
+        "expire_at",
+        "delta",
+        "codec",
+        "compression",
+        "digest",
+        "headers",
+    )
+
+    def __init__(
+        self,
+        payload: bytes,
+        expire_at: Optional[float] = None,
+        delta: float = 0.0,
+        codec: int = 0,
+        compression: int = 0,
+        digest: Optional[bytes] = None,
+        headers: Optional[List[Tuple[str, str]]] = None,
+    ):
+        self.payload = payload
+        self.expire_at = expire_at
+        self.delta = delta
+        self.codec = codec
+        self.compression = compression
+        self.digest = digest
+        self.headers = headers
+
+    def dumps(self) -> bytes:
+        headers = json.dumps(self.headers).encode() if self.headers else b""
+        header = ENTRY_HEADER.pack(
+            ENTRY_MAGIC,
+            ENTRY_VERSION,
+            self.expire_at or 0.0,
+            self.delta,
+            self.codec,
+            self.compression,
+            self.digest or content_digest(self.payload),
+            len(headers),
+        )
+        return header + headers + self.payload
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CacheEntry":
+        if raw[:1] != ENTRY_MAGIC:
+            return cls(payload=raw)
+        version = raw[1]
+        header = ENTRY_HEADERS[version]
+        _, _, expire_at, delta, *codec_info = header.unpack_from(raw)
+        start, headers = header.size, None
+        if version >= 4:
+            headers_size = codec_info.pop()
+            if headers_size:
+                end = start + headers_size
+                headers = [tuple(pair) for pair in json.loads(raw[start:end])]
+                start = end
+        return cls(raw[start:], expire_at or None, delta, *codec_info, headers=headers)
+
+    @property
+    def etag(self) -> str:
+        """Strong ETag of the entry, derived from the stored payload for older entries."""
+        return format_etag(self.digest or content_digest(self.payload))
+
+    def fresh_for(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds left until the soft expiry, or None if the entry has no metadata."""
+        if self.expire_at is None:
+            return None
+        return self.expire_at - (now or time.time())
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        fresh_for = self.fresh_for(now)
+        return fresh_for is not None and fresh_for <= 0
+
+    def should_refresh_early(self, beta: float, now: Optional[float] = None) -> bool:
+        """Probabilistic early expiration (XFetch).
+
+        The closer the entry is to its soft expiry, and the more expensive it was
+        to compute, the more likely a request triggers a refresh, so popular keys
+        are refreshed by one request ahead of time instead of all of them missing
+        at the same moment.
+        """
+        if self.expire_at is None or beta <= 0:
+            return False
+        gap = -self.delta * beta * math.log(1.0 - random.random())
+        return (now or time.time()) + gap >= self.expire_at
@@ -19,4 +19,11 @@ class RedisEvent(IntEnum):
     KEY_ADDED_TO_CACHE = 4
     KEY_FOUND_IN_CACHE = 5
     FAILED_TO_CACHE_KEY = 6
-    PATTERN_INVALIDATED = 7
+    NAMESPACE_INVALIDATED = 7
+    KEY_FOUND_IN_LOCAL_CACHE = 8
+    KEY_INVALIDATED = 9
+    KEY_REFRESHED = 10
+    FAILED_TO_REFRESH_KEY = 11
+    REDIS_UNAVAILABLE = 12
+    CIRCUIT_OPENED = 13
+    CIRCUIT_CLOSED = 14
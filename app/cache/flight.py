@@ -0,0 +1,195 @@
+"""flight.py"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from redis.asyncio import client
+from redis.asyncio.cluster import RedisCluster
+from redis.exceptions import WatchError
+
+from cache.breaker import REDIS_ERRORS
+
+LOCK_SUFFIX = ":lock"
+DEFAULT_LOCK_TTL_MS = 10_000
+DEFAULT_POLL_INTERVAL = 0.05
+
+
+class SingleFlightStats:
+    """Counters of how cache misses were resolved."""
+
+    def __init__(self):
+        self.computed = 0
+        self.coalesced_local = 0
+        self.coalesced_remote = 0
+        self.lock_timeouts = 0
+        self.refreshed = 0
+
+    @property
+    def coalesced(self) -> int:
+        return self.coalesced_local + self.coalesced_remote
+
+
+class SingleFlight:
+    """Collapses concurrent cache misses for the same key into a single computation.
+
+    Within a process, followers await the future of the leader. Across workers,
+    the leader holds a short Redis lock and followers poll the cache until the
+    leader has stored the value, falling back to computing it themselves if the
+    lock is released or expires without a value being cached. When Redis is
+    unreachable, the lock is skipped and the value is computed locally;
+    `on_redis_error` is called with the error.
+    """
+
+    def __init__(
+        self,
+        lock_ttl_ms: int = DEFAULT_LOCK_TTL_MS,
+        wait_timeout: Optional[float] = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        on_redis_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self.lock_ttl_ms = lock_ttl_ms
+        self.wait_timeout = (
+            wait_timeout if wait_timeout is not None else lock_ttl_ms / 1000
+        )
+        self.poll_interval = poll_interval
+        self.on_redis_error = on_redis_error
+        self.stats = SingleFlightStats()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(
+        self,
+        redis: client.Redis,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        lookup: Callable[[], Awaitable[Optional[Any]]],
+    ) -> Any:
+        """Return the result of `compute` for `key`, sharing it with concurrent callers.
+
+        Args:
+            redis (client.Redis): Client used for the cross-worker lock.
+            key (str): Cache key being computed.
+            compute (Callable): Evaluates the value and stores it in the cache.
+            lookup (Callable): Reads the value from the cache, returning None on a miss.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats.coalesced_local += 1
+            return await asyncio.shield(inflight)
+        return await self._track(key, self._run_leader(redis, key, compute, lookup))
+
+    async def refresh(
+        self, redis: client.Redis, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> bool:
+        """Run `compute` for `key` unless it is already being computed by any worker.
+
+        Returns:
+            bool: True if this call refreshed the value.
+        """
+        if key in self._inflight:
+            return False
+        lock_key = f"{key}{LOCK_SUFFIX}"
+        token = uuid.uuid4().hex
+        if not await self._acquire(redis, lock_key, token):
+            return False
+        try:
+            await self._track(key, compute())
+        finally:
+            await self._release(redis, lock_key, token)
+        self.stats.refreshed += 1
+        return True
+
+    async def _track(self, key: str, awaitable: Awaitable[Any]) -> Any:
+        """Await `awaitable` while sharing its outcome with callers of the same key."""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await awaitable
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark the exception as retrieved when nobody else is waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_leader(self, redis, key, compute, lookup) -> Any:
+        lock_key = f"{key}{LOCK_SUFFIX}"
+        token = uuid.uuid4().hex
+        locked = await self._acquire(redis, lock_key, token)
+        if locked is None:
+            # computing without the lock beats failing the request
+            self.stats.computed += 1
+            return await compute()
+        if locked:
+            try:
+                self.stats.computed += 1
+                return await compute()
+            finally:
+                await self._release(redis, lock_key, token)
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            result = await lookup()
+            if result is not None:
+                self.stats.coalesced_remote += 1
+                return result
+            try:
+                if not await redis.exists(lock_key):
+                    break
+            except REDIS_ERRORS as e:
+                self._redis_error(e)
+                break
+        else:
+            self.stats.lock_timeouts += 1
+
+        self.stats.computed += 1
+        return await compute()
+
+    async def _acquire(
+        self, redis: client.Redis, lock_key: str, token: str
+    ) -> Optional[bool]:
+        """Take the lock for `token`, returning None if Redis could not be reached."""
+        try:
+            return bool(await redis.set(lock_key, token, nx=True, px=self.lock_ttl_ms))
+        except REDIS_ERRORS as e:
+            self._redis_error(e)
+            return None
+
+    async def _release(self, redis: client.Redis, lock_key: str, token: str) -> None:
+        """Delete the lock only if it is still owned by `token`."""
+        if isinstance(redis, RedisCluster):
+            # cluster pipelines cannot WATCH, the lock may expire between the two
+            # commands but that only costs one extra computation
+            try:
+                if await redis.get(lock_key) in (token, token.encode()):
+                    await redis.delete(lock_key)
+            except REDIS_ERRORS as e:
+                self._redis_error(e)
+            return
+        try:
+            async with redis.pipeline() as pipe:
+                await pipe.watch(lock_key)
+                owner = await pipe.get(lock_key)
+                if owner in (token, token.encode()):
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+        except WatchError:
+            # the lock expired and was taken by another worker meanwhile
+            pass
+        except REDIS_ERRORS as e:
+            # the lock expires by itself
+            self._redis_error(e)
+
+    def _redis_error(self, error: Exception) -> None:
+        if self.on_redis_error is not None:
+            self.on_redis_error(error)
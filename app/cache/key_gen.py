@@ -1,26 +1,35 @@
 """cache.py"""
 
 from collections import OrderedDict
-from inspect import signature, Signature
-from typing import Any, Callable, Dict, List
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from hashlib import blake2b
+from inspect import Parameter, signature, Signature
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from uuid import UUID
+
+from pydantic import BaseModel
 
 from cache.types import ArgType, SigParameters
 
+KEY_DIGEST_SIZE = 16
+
 
-def get_cache_key_pattern(
+def get_cache_index_key(
     prefix: str,
 ) -> str:
-    """Generate a pattern that identifies all cache keys.
+    """Generate the key of the Redis set that indexes all cache keys of a namespace.
 
     Args:
         prefix (`str`): Customizable namespace value that will prefix all cache keys.
 
     Returns:
-        `str`: General for `prefix` that can be used as a
-            Redis key pattern to retrieve all cached API keys.
+        `str`: Key of the set holding every cache key stored under `prefix`, so a
+            namespace can be invalidated without scanning the whole keyspace.
     """
     prefix = f"{prefix}:" if prefix else ""
-    return f"{prefix}*.*(*)"
+    return f"{prefix}__index__"
 
 
 def get_cache_key(
@@ -75,3 +84,105 @@ def get_args_str(
         for arg, val in func_args.items()
         if sig_params[arg].annotation not in ignore_arg_types
     )
+
+
+class KeyBuilder:
+    """Cache key builder compiled once per decorated function.
+
+    The signature is inspected at decoration time, and the parameters that
+    count toward the key are resolved once per set of `ignore_arg_types`. Keys
+    are `<prefix>:<module>.<qualname>:<digest>`, where the digest is a blake2b
+    hash of a canonical encoding of the key arguments, so they are compact and
+    stable across processes.
+    """
+
+    def __init__(self, func: Callable):
+        self.signature = signature(func)
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.parameters = tuple(self.signature.parameters.values())
+        # keyword-only calls (the way FastAPI calls endpoints) can skip `bind`
+        self.needs_binding = any(
+            param.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)
+            for param in self.parameters
+        )
+        self._key_parameters: Dict[Tuple[ArgType, ...], Tuple[Parameter, ...]] = {}
+
+    def get_key_parameters(
+        self, ignore_arg_types: Sequence[ArgType]
+    ) -> Tuple[Parameter, ...]:
+        ignore_arg_types = tuple(ignore_arg_types)
+        key_parameters = self._key_parameters.get(ignore_arg_types)
+        if key_parameters is None:
+            key_parameters = tuple(
+                param
+                for param in self.parameters
+                if param.annotation not in ignore_arg_types
+            )
+            self._key_parameters[ignore_arg_types] = key_parameters
+        return key_parameters
+
+    def build(
+        self,
+        prefix: str,
+        ignore_arg_types: Sequence[ArgType],
+        args: Sequence[Any],
+        kwargs: Dict[str, Any],
+    ) -> str:
+        if args or self.needs_binding:
+            bound = self.signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            kwargs = bound.arguments
+        parts = []
+        for param in self.get_key_parameters(ignore_arg_types):
+            value = kwargs.get(param.name, param.default)
+            parts.append(f"{param.name}={canonical_str(value)}")
+        digest = blake2b(
+            ",".join(parts).encode(), digest_size=KEY_DIGEST_SIZE
+        ).hexdigest()
+        prefix = f"{prefix}:" if prefix else ""
+        return f"{prefix}{self.name}:{digest}"
+
+
+def _canonical_dict(value: dict) -> str:
+    items = sorted((canonical_str(k), canonical_str(v)) for k, v in value.items())
+    return "{" + ",".join(f"{k}:{v}" for k, v in items) + "}"
+
+
+def _canonical_set(value: set | frozenset) -> str:
+    return "{" + ",".join(sorted(canonical_str(v) for v in value)) + "}"
+
+
+def _canonical_sequence(value: list | tuple) -> str:
+    return "[" + ",".join(canonical_str(v) for v in value) + "]"
+
+
+# checked in order, the first type that matches encodes the value
+CANONICAL_ENCODERS: Tuple[Tuple[type | Tuple[type, ...], Callable[[Any], str]], ...] = (
+    ((type(None), bool, int, float, str), repr),
+    (Enum, lambda value: canonical_str(value.value)),
+    ((datetime, date, time), lambda value: value.isoformat()),
+    ((Decimal, UUID), str),
+    (BaseModel, lambda value: value.model_dump_json()),
+    (dict, _canonical_dict),
+    ((set, frozenset), _canonical_set),
+    ((list, tuple), _canonical_sequence),
+    (bytes, bytes.hex),
+)
+
+
+def canonical_str(value: Any) -> str:
+    """Return a representation of `value` that is stable across processes and runs."""
+    for types, encode in CANONICAL_ENCODERS:
+        if isinstance(value, types):
+            return encode(value)
+    if (
+        type(value).__str__ is not object.__str__
+        or type(value).__repr__ is not object.__repr__
+    ):
+        # the type chose its own text form (e.g. `Path`, `URL`)
+        return str(value)
+    # the default repr holds the memory address, the key would differ per process
+    raise TypeError(
+        f"Cannot build a stable cache key from a {type(value).__name__} argument; "
+        "add its type to `ignore_arg_types` or pass a key-relevant value instead"
+    )
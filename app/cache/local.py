@@ -0,0 +1,82 @@
+"""local.py"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+
+class LocalCache:
+    """Size-bounded, per-process LRU cache that sits in front of Redis.
+
+    Entries are grouped by namespace so that invalidating a namespace clears
+    the matching local entries without scanning the whole cache.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        """
+        Args:
+            max_size (int): Maximum number of entries kept in memory. The least
+                recently used entry is evicted when the limit is reached.
+            ttl (int): Upper bound (in seconds) for how long an entry lives in
+                memory, regardless of its Redis TTL.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str], bytes]]" = (
+            OrderedDict()
+        )
+        self._namespaces: Dict[Optional[str], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str) -> Optional[Tuple[int, bytes]]:
+        """Return `(ttl, value)` for `key` or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return (int(remaining), value)
+
+    def set(
+        self, key: str, value: bytes, ttl: float, namespace: Optional[str] = None
+    ) -> None:
+        """Store `value` under `key` for at most `min(ttl, self.ttl)` seconds."""
+        ttl = min(ttl, self.ttl) if ttl and ttl > 0 else self.ttl
+        if key in self._entries:
+            self.delete(key)
+        self._entries[key] = (time.monotonic() + ttl, namespace, value)
+        self._namespaces.setdefault(namespace, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest_key = next(iter(self._entries))
+            self.delete(oldest_key)
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        namespace = entry[1]
+        keys = self._namespaces.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespaces[namespace]
+
+    def invalidate(self, namespace: Optional[str]) -> int:
+        """Drop every entry stored under `namespace` and return how many were removed."""
+        keys = self._namespaces.pop(namespace, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._namespaces.clear()
@@ -0,0 +1,252 @@
+"""metrics.py"""
+
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """Base class of the metrics kept in a `MetricsRegistry`.
+
+    Samples are keyed by the tuple of their label values, in the order of
+    `labelnames`, so recording a sample is a single dict update.
+    """
+
+    type: str
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Optional[str]]) -> LabelValues:
+        return tuple(str(labels.get(name) or "") for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, **extra: str) -> str:
+        pairs = list(zip(self.labelnames, values, strict=True)) + list(extra.items())
+        if not pairs:
+            return ""
+        escaped = (
+            (name, value.replace("\\", "\\\\").replace('"', '\\"'))
+            for name, value in pairs
+        )
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+    def samples(self) -> Iterator[str]:  # pragma: no cover
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+
+    def clear(self) -> None:  # pragma: no cover
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Optional[str]) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels: Optional[str]) -> None:
+        """Mirror a total that is counted elsewhere."""
+        self._values[self._key(labels)] = value
+
+    def get(self, **labels: Optional[str]) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{self._format_labels(key)} {value}"
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label values: observations per bucket (+Inf last), sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Optional[str]) -> None:
+        key = self._key(labels)
+        counts, total = self._values.get(key) or self._values.setdefault(
+            key, ([0] * (len(self.buckets) + 1), [0.0])
+        )
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels: Optional[str]) -> int:
+        counts, _ = self._values.get(self._key(labels), ([], [0.0]))
+        return sum(counts)
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                labels = self._format_labels(key, le=str(bound))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{self._format_labels(key)} {total[0]}"
+            yield f"{self.name}_count{self._format_labels(key)} {cumulative}"
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class MetricsRegistry:
+    """In-process registry of metrics rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+class CacheMetrics:
+    """Metrics of the response cache, labelled by namespace and endpoint."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        labels = ("namespace", "endpoint")
+        self.hits = self.registry.counter(
+            "cache_hits_total", "Requests answered from the cache.", labels
+        )
+        self.stale_hits = self.registry.counter(
+            "cache_stale_hits_total",
+            "Requests answered with a stale value while it is refreshed.",
+            labels,
+        )
+        self.not_modified = self.registry.counter(
+            "cache_not_modified_total",
+            "Conditional requests answered with 304 Not Modified.",
+            labels,
+        )
+        self.misses = self.registry.counter(
+            "cache_misses_total", "Requests that evaluated the endpoint.", labels
+        )
+        self.local_hits = self.registry.counter(
+            "cache_local_hits_total",
+            "Lookups answered by the in-process tier.",
+            ("namespace",),
+        )
+        self.stores = self.registry.counter(
+            "cache_stores_total", "Values stored in the cache.", labels
+        )
+        self.store_failures = self.registry.counter(
+            "cache_store_failures_total", "Values that could not be cached.", labels
+        )
+        self.bytes_stored = self.registry.counter(
+            "cache_stored_bytes_total", "Bytes written to the cache.", labels
+        )
+        self.invalidations = self.registry.counter(
+            "cache_invalidations_total", "Namespace invalidations.", ("namespace",)
+        )
+        self.invalidated_keys = self.registry.counter(
+            "cache_invalidated_keys_total",
+            "Keys removed by invalidations.",
+            ("namespace",),
+        )
+        self.redis_latency = self.registry.histogram(
+            "cache_redis_latency_seconds",
+            "Latency of the Redis commands issued by the cache.",
+            ("operation", "namespace"),
+        )
+        self.single_flight = self.registry.counter(
+            "cache_single_flight_total",
+            "Cache misses by how they were resolved.",
+            ("result",),
+        )
+        self.invalidation_messages = self.registry.counter(
+            "cache_invalidation_messages_total",
+            "Messages on the invalidation channel.",
+            ("direction",),
+        )
+        self.invalidation_reconnects = self.registry.counter(
+            "cache_invalidation_reconnects_total",
+            "Subscriptions to the invalidation channel.",
+        )
+        self.invalidation_lag = self.registry.gauge(
+            "cache_invalidation_lag_seconds",
+            "Delay between publishing and receiving invalidations.",
+            ("stat",),
+        )
+        self.breaker_state = self.registry.gauge(
+            "cache_breaker_state",
+            "State of the Redis circuit breaker: 0 closed, 1 open, 2 half-open.",
+        )
+        self.breaker_transitions = self.registry.counter(
+            "cache_breaker_transitions_total",
+            "State changes of the Redis circuit breaker.",
+            ("from", "to"),
+        )
+
+    def render(self) -> str:
+        return self.registry.render()
+
+    def clear(self) -> None:
+        self.registry.clear()
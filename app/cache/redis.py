@@ -1,38 +1,215 @@
 """redis.py"""
 
+import asyncio
+import logging
 import os
-from typing import Tuple
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 import redis.asyncio as redis
 from redis.asyncio import client
+from redis.asyncio.cluster import RedisCluster
+from redis.exceptions import RedisClusterException
 
+from cache.backends import BACKENDS, CLUSTER, SHARDED, STANDALONE, ShardedRedis
 from cache.enums import RedisStatus
 
+logger = logging.getLogger(__name__)
 
-async def redis_connect(host_url: str) -> Tuple[RedisStatus, client.Redis]:
-    """Attempt to connect to `host_url` and return a Redis client instance if successful."""
-    return (
-        await _connect(host_url)
-        if os.environ.get("CACHE_ENV") != "TEST"
-        else _connect_fake()
+DEFAULT_MAX_CONNECTIONS = 50
+DEFAULT_SOCKET_TIMEOUT = 5.0
+DEFAULT_HEALTH_CHECK_INTERVAL = 30
+RECOVERY_CHECK_INTERVAL = 1.0
+
+
+def create_pool(
+    host_url: str,
+    *,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    socket_timeout: Optional[float] = DEFAULT_SOCKET_TIMEOUT,
+    socket_connect_timeout: Optional[float] = DEFAULT_SOCKET_TIMEOUT,
+    health_check_interval: int = DEFAULT_HEALTH_CHECK_INTERVAL,
+    decode_responses: bool = False,
+    **kwargs: Any,
+) -> redis.ConnectionPool:
+    """Create the connection pool shared by every Redis client of the application.
+
+    Args:
+        host_url (str): URL for a Redis database.
+        max_connections (int, optional): Upper bound of open connections.
+        socket_timeout (float, optional): Seconds a command may wait for a reply.
+        socket_connect_timeout (float, optional): Seconds a connection attempt may take.
+        health_check_interval (int, optional): Connections idle for longer than this
+            many seconds are checked with a PING before being reused, so stale
+            connections are replaced instead of failing a command.
+        decode_responses (bool, optional): Return `str` instead of `bytes`. It is
+            a property of the connections, so clients that need both use one pool
+            each, created with the same options.
+    """
+    return redis.ConnectionPool.from_url(
+        host_url,
+        max_connections=max_connections,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=socket_connect_timeout,
+        socket_keepalive=True,
+        health_check_interval=health_check_interval,
+        decode_responses=decode_responses,
+        **kwargs,
     )
 
 
-async def _connect(
+class RedisHealthCheck:
+    """Checks the Redis server in the background instead of on every request.
+
+    While the server is healthy it is pinged every `interval` seconds; once a
+    check fails, it is pinged every `RECOVERY_CHECK_INTERVAL` seconds so that
+    recovery is noticed quickly.
+    """
+
+    def __init__(
+        self,
+        redis_client: client.Redis,
+        interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+    ):
+        self.redis = redis_client
+        self.interval = interval
+        # optimistic until the first check, so requests are served before startup ends
+        self.healthy = True
+        self.last_error: Optional[Exception] = None
+        self.last_check: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def check(self) -> bool:
+        """Ping the server now and return whether it answered."""
+        try:
+            healthy = bool(await self.redis.ping())
+            error = None if healthy else redis.RedisError("PING failed")
+        except (redis.RedisError, OSError) as e:
+            healthy, error = False, e
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Redis server is reachable again")
+            else:
+                logger.error(f"Redis health check failed\n{error}")
+        self.healthy, self.last_error = healthy, error
+        self.last_check = time.time()
+        return healthy
+
+    def ensure_healthy(self) -> None:
+        if not self.healthy:
+            raise redis.ConnectionError(f"Redis is unhealthy: {self.last_error}")
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(
+                self.interval if self.healthy else RECOVERY_CHECK_INTERVAL
+            )
+
+
+async def redis_connect(
     host_url: str,
+    pool_options: Optional[Dict[str, Any]] = None,
+    backend: str = STANDALONE,
+    nodes: Optional[List[str]] = None,
+) -> Tuple[RedisStatus, client.Redis]:
+    """Attempt to connect to `host_url` and return a Redis client instance if successful.
+
+    Args:
+        backend (str, optional): `redis` for a single server, `cluster` for a Redis
+            Cluster reached through `host_url`, or `sharded` for standalone servers
+            combined with consistent hashing. Defaults to `redis`.
+        nodes (List[str], optional): URLs of the servers of the `sharded` backend.
+            Defaults to `[host_url]`.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    nodes = nodes or [host_url]
+    if os.environ.get("CACHE_ENV") == "TEST":
+        return _connect_fake(backend, nodes)
+    pool_options = pool_options or {}
+    if backend == CLUSTER:
+        return await _connect_cluster(host_url, pool_options)
+    if backend == SHARDED:
+        return await _connect_sharded(nodes, pool_options)
+    return await _connect(host_url, pool_options)
+
+
+async def _connect(
+    host_url: str, pool_options: Dict[str, Any]
 ) -> tuple[RedisStatus, client.Redis]:  # pragma: no cover
+    return await _ping(
+        redis.Redis(connection_pool=create_pool(host_url, **pool_options))
+    )
+
+
+async def _connect_cluster(
+    host_url: str, pool_options: Dict[str, Any]
+) -> tuple[RedisStatus, RedisCluster]:  # pragma: no cover
+    # every node gets its own pool, configured like the standalone one
+    options = {
+        "max_connections": DEFAULT_MAX_CONNECTIONS,
+        "socket_timeout": DEFAULT_SOCKET_TIMEOUT,
+        "socket_connect_timeout": DEFAULT_SOCKET_TIMEOUT,
+        "health_check_interval": DEFAULT_HEALTH_CHECK_INTERVAL,
+        **pool_options,
+    }
+    return await _ping(
+        RedisCluster.from_url(host_url, socket_keepalive=True, **options)
+    )
+
+
+async def _connect_sharded(
+    nodes: List[str], pool_options: Dict[str, Any]
+) -> tuple[RedisStatus, ShardedRedis]:  # pragma: no cover
+    return await _ping(
+        ShardedRedis(
+            {
+                url: redis.Redis(connection_pool=create_pool(url, **pool_options))
+                for url in nodes
+            }
+        )
+    )
+
+
+async def _ping(redis_client: Any) -> Tuple[RedisStatus, Any]:  # pragma: no cover
     try:
-        redis_client = await redis.from_url(host_url)
         if await redis_client.ping():
             return (RedisStatus.CONNECTED, redis_client)
         return (RedisStatus.CONN_ERROR, None)
     except redis.AuthenticationError:
         return (RedisStatus.AUTH_ERROR, None)
-    except redis.ConnectionError:
+    except (redis.ConnectionError, RedisClusterException):
         return (RedisStatus.CONN_ERROR, None)
 
 
-def _connect_fake() -> Tuple[RedisStatus, client.Redis]:
-    from fakeredis import FakeRedis
+def _connect_fake(backend: str, nodes: List[str]) -> Tuple[RedisStatus, Any]:
+    # the cache only uses the asyncio API
+    from fakeredis import FakeServer
+    from fakeredis.aioredis import FakeRedis
 
+    if backend == SHARDED:
+        # one in-memory server per node
+        return (
+            RedisStatus.CONNECTED,
+            ShardedRedis({url: FakeRedis(server=FakeServer()) for url in nodes}),
+        )
     return (RedisStatus.CONNECTED, FakeRedis())
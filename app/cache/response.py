@@ -0,0 +1,47 @@
+"""response.py"""
+
+from inspect import Parameter
+from typing import Any, Callable
+
+from fastapi.dependencies.utils import get_typed_return_annotation
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+JSON_MEDIA_TYPE = JSONResponse.media_type
+
+BodyEncoder = Callable[[Any], bytes]
+
+
+def get_body_encoder(func: Callable) -> BodyEncoder:
+    """Return a function that renders values returned by `func` to a response body.
+
+    As FastAPI does when the route has no explicit `response_model`, the return
+    annotation of `func` is used as the response model: the value is validated
+    against it (so fields missing from the model, such as password hashes, are
+    dropped) and dumped to JSON. Without a model, the value is rendered with
+    `jsonable_encoder` like FastAPI's default `JSONResponse`. The body is built
+    once per miss, so hits can return it verbatim.
+    """
+    annotation = get_typed_return_annotation(func)
+    if annotation in (None, Parameter.empty) or (
+        isinstance(annotation, type) and issubclass(annotation, Response)
+    ):
+        json_response = JSONResponse(None)
+        return lambda value: json_response.render(jsonable_encoder(value))
+
+    adapter = TypeAdapter(annotation)
+
+    def encode(value: Any) -> bytes:
+        return adapter.dump_json(
+            adapter.validate_python(value, from_attributes=True), by_alias=True
+        )
+
+    return encode
+
+
+def build_response(content: Any) -> Any:
+    """Wrap a cached response body into a `Response`, other values are returned as is."""
+    if isinstance(content, bytes):
+        return Response(content, media_type=JSON_MEDIA_TYPE)
+    return content
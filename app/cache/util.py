@@ -44,7 +44,7 @@ def serialize_json(json_dict):
             custom_encoder={
                 bytes: lambda x: {
                     "_spec_type": str(bytes),
-                    "val": b64encode(x),
+                    "val": b64encode(x).decode(),
                 },
             },
         )
@@ -56,6 +56,15 @@ def deserialize_json(json_str):
     return json.loads(json_str, object_hook=object_hook)
 
 
+def restore_spec_types(obj):
+    """Apply `object_hook` to every dict of an already decoded document."""
+    if isinstance(obj, dict):
+        return object_hook({key: restore_spec_types(val) for key, val in obj.items()})
+    if isinstance(obj, list):
+        return [restore_spec_types(val) for val in obj]
+    return obj
+
+
 SetIntStr = Set[Union[int, str]]
 DictIntStrAny = Dict[Union[int, str], Any]
 
@@ -31,3 +31,15 @@ class TestHealth:
         response_data = schemas.HealthCheck(**response.json())
         assert response_data.services.postgres.ok == True
         assert response_data.services.redis.ok == True
+
+    async def test_metrics(self, client: AsyncClient):
+        response = await client.get(
+            f"{settings.API_V1_STR}/health/metrics",
+            auth=BasicAuth(
+                username=settings.HEALTH_USERNAME, password=settings.HEALTH_PASSWORD
+            ),
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE cache_hits_total counter" in response.text
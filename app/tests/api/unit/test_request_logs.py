@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import exceptions
+from app.api.api_v1.services.request_logs import (
+    DEFAULT_RANGE,
+    covered_seconds,
+    time_range,
+)
+from app.log.rollup import HOUR, MINUTE
+
+NOW = datetime(2026, 1, 2, tzinfo=timezone.utc)
+
+
+def at(hour: int, minute: int = 0, second: int = 0, day: int = 1) -> datetime:
+    return datetime(2026, 1, day, hour, minute, second, tzinfo=timezone.utc)
+
+
+def test_covered_seconds_spans_whole_buckets() -> None:
+    # read from 10:00 (the bucket of 10:20) to the end of the 11:00 bucket
+    assert covered_seconds(at(10, 20), at(11, 10), HOUR, NOW) == 2 * 3600
+    assert covered_seconds(at(10, 0), at(12, 0), HOUR, NOW) == 2 * 3600
+    assert covered_seconds(at(10, 0, 30), at(10, 2), MINUTE, NOW) == 120
+
+
+def test_covered_seconds_stops_at_now() -> None:
+    now = at(11, 15)
+    assert covered_seconds(at(10, 20), now, HOUR, now) == 3600 + 15 * 60
+
+
+def test_time_range_takes_naive_moments_as_utc() -> None:
+    start, end = time_range(datetime(2026, 1, 1, 10), None)
+    assert start == at(10)
+    assert end.tzinfo is not None
+
+    tehran = timezone(timedelta(hours=3, minutes=30))
+    start, end = time_range(
+        datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 15, 30, tzinfo=tehran)
+    )
+    assert (start, end) == (at(10), at(12))
+    assert end - time_range(None, end)[0] == DEFAULT_RANGE
+
+    with pytest.raises(exceptions.ValidationException):
+        time_range(datetime(2026, 1, 1, 13), at(12))
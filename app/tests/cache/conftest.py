@@ -0,0 +1,35 @@
+from typing import AsyncGenerator
+
+import pytest_asyncio
+from fakeredis.aioredis import FakeRedis
+
+from cache import Cache
+from cache.breaker import CircuitBreaker
+from cache.enums import RedisStatus
+from cache.flight import SingleFlight
+from cache.metrics import CacheMetrics
+
+
+@pytest_asyncio.fixture(scope="function")
+async def redis_cache() -> AsyncGenerator[Cache, None]:
+    """`Cache` singleton bound to an isolated in-memory Redis."""
+    redis_cache = Cache()
+    previous = dict(vars(redis_cache))
+    redis_cache.prefix = "test-cache"
+    redis_cache.response_header = "X-Test-Cache"
+    redis_cache.ignore_arg_types = []
+    redis_cache.local = None
+    redis_cache.bus = None
+    redis_cache.flight = SingleFlight()
+    redis_cache.metrics = CacheMetrics()
+    redis_cache.breaker = CircuitBreaker(
+        on_transition=redis_cache._on_breaker_transition
+    )
+    redis_cache._pending_namespaces = set()
+    redis_cache._pending_keys = set()
+    redis_cache.redis = FakeRedis()
+    redis_cache.status = RedisStatus.CONNECTED
+    yield redis_cache
+    await redis_cache.redis.aclose()
+    vars(redis_cache).clear()
+    vars(redis_cache).update(previous)
@@ -0,0 +1,89 @@
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from cache import Cache
+from cache.backends import HashRing, ShardedRedis, hash_tag
+
+
+@pytest_asyncio.fixture
+async def sharded() -> AsyncGenerator[ShardedRedis, None]:
+    sharded = ShardedRedis(
+        {f"node-{i}": FakeRedis(server=FakeServer()) for i in range(3)}
+    )
+    yield sharded
+    await sharded.aclose()
+
+
+def test_hash_tag() -> None:
+    assert hash_tag("{api|user}:list") == "api|user"
+    assert hash_tag("{api|user}:list:lock") == "api|user"
+    assert hash_tag("api|user:list") == "api|user:list"
+    assert hash_tag("{}:list") == "{}:list"
+
+
+def test_hash_ring_moves_few_keys() -> None:
+    keys = [f"key:{i}" for i in range(1000)]
+    ring = HashRing(["node-0", "node-1", "node-2"])
+    before = [ring.get_index(key) for key in keys]
+    assert set(before) == {0, 1, 2}
+
+    ring = HashRing(["node-0", "node-1", "node-2", "node-3"])
+    after = [ring.get_index(key) for key in keys]
+    moved = [b for b, a in zip(before, after, strict=True) if a != b]
+    # only keys taken over by the new node move
+    assert all(after[i] == 3 for i in range(len(keys)) if after[i] != before[i])
+    assert len(moved) < len(keys) / 2
+
+
+@pytest.mark.asyncio
+class TestShardedRedis:
+    async def test_multi_key_commands(self, sharded: ShardedRedis) -> None:
+        keys = [f"key:{i}" for i in range(20)]
+        async with sharded.pipeline(transaction=False) as pipe:
+            for i, key in enumerate(keys):
+                pipe.set(name=key, value=str(i), ex=60)
+            assert all(await pipe.execute())
+
+        assert all([await node.dbsize() for node in sharded.nodes])
+        assert await sharded.mget(keys) == [str(i).encode() for i in range(20)]
+        assert await sharded.exists(*keys) == 20
+        assert await sharded.unlink(*keys[:5]) == 5
+        assert await sharded.mget(keys[:6]) == [None] * 5 + [b"5"]
+
+    async def test_cache_over_shards(
+        self, redis_cache: Cache, sharded: ShardedRedis
+    ) -> None:
+        redis_cache.redis = sharded
+        redis_cache.hash_tags = True
+        namespaces = [f"ns{i}" for i in range(10)]
+        for namespace in namespaces:
+            for i in range(3):
+                key = f"{redis_cache.get_namespace_prefix(namespace)}:{i}"
+                await redis_cache.add_to_cache(key, {"id": i}, 60, namespace)
+
+        # whole namespaces are spread over the nodes
+        sizes = [await node.dbsize() for node in sharded.nodes]
+        assert sum(sizes) == 10 * 4 and all(sizes)
+        assert await redis_cache.invalidate("ns0") == 3
+        assert await sharded.exists(*[f"{{test-cache|ns0}}:{i}" for i in range(3)]) == 0
+        ttl, in_cache = await redis_cache.check_cache("{test-cache|ns1}:0", "ns1")
+        assert 0 < ttl <= 60 and in_cache
+
+    async def test_single_flight_lock(
+        self, redis_cache: Cache, sharded: ShardedRedis
+    ) -> None:
+        redis_cache.redis = sharded
+
+        async def compute():
+            return "computed"
+
+        async def lookup():
+            return None
+
+        key = "{test-cache|user}:1"
+        assert await redis_cache.single_flight(key, compute, lookup) == "computed"
+        assert await sharded.exists(f"{key}:lock") == 0
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from cache import Cache
+from cache.breaker import BreakerState, CircuitBreaker
+
+
+async def wait_until(condition, timeout: float = 1.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+class TestCircuitBreaker:
+    async def test_opens_at_threshold(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure(None)
+        assert breaker.closed
+        breaker.record_failure(None)
+        assert breaker.state == BreakerState.OPEN
+
+    async def test_probe_closes_breaker(self) -> None:
+        transitions = []
+        attempts = []
+
+        async def probe() -> bool:
+            attempts.append(breaker.state)
+            return len(attempts) > 1
+
+        breaker = CircuitBreaker(
+            reset_timeout=0.01,
+            on_transition=lambda previous, state: transitions.append(state),
+        )
+        breaker.open(probe)
+        await wait_until(lambda: breaker.closed)
+        assert attempts == [BreakerState.HALF_OPEN, BreakerState.HALF_OPEN]
+        assert transitions == [
+            BreakerState.OPEN,
+            BreakerState.HALF_OPEN,
+            BreakerState.OPEN,
+            BreakerState.HALF_OPEN,
+            BreakerState.CLOSED,
+        ]
+        await breaker.stop()
+
+
+@pytest.mark.asyncio
+class TestCacheBreaker:
+    @pytest.fixture
+    def server(self, redis_cache: Cache) -> FakeServer:
+        server = FakeServer()
+        redis_cache.redis = FakeRedis(server=server)
+        redis_cache.breaker = CircuitBreaker(
+            failure_threshold=2,
+            reset_timeout=0.01,
+            on_transition=redis_cache._on_breaker_transition,
+        )
+        return server
+
+    async def test_bypass_and_recover(
+        self, redis_cache: Cache, server: FakeServer
+    ) -> None:
+        await redis_cache.add_to_cache("user:1", {"id": 1}, 60, "user")
+        server.connected = False
+
+        assert await redis_cache.check_cache("user:1", "user") == (0, None)
+        assert redis_cache.connected
+        assert await redis_cache.add_to_cache("user:2", {"id": 2}, 60, "user") is None
+        assert not redis_cache.connected
+        assert redis_cache.metrics.breaker_state.get() == BreakerState.OPEN
+
+        # invalidations made while Redis is down are replayed once it is back
+        assert await redis_cache.invalidate("user") == 0
+        server.connected = True
+        await wait_until(lambda: redis_cache.connected)
+        assert await redis_cache.redis.exists("user:1") == 0
+        assert redis_cache.metrics.breaker_state.get() == BreakerState.CLOSED
+        transitions = redis_cache.metrics.breaker_transitions
+        assert transitions.get(**{"from": "closed", "to": "open"}) == 1
+        assert transitions.get(**{"from": "half_open", "to": "closed"}) == 1
+        await redis_cache.stop_reconnecting()
+
+    async def test_single_flight_without_lock(
+        self, redis_cache: Cache, server: FakeServer
+    ) -> None:
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return "computed"
+
+        async def lookup():
+            return None
+
+        server.connected = False
+        redis_cache.flight.on_redis_error = redis_cache.record_failure
+        assert await redis_cache.single_flight("user:1", compute, lookup) == "computed"
+        assert calls == [1]
+        assert redis_cache.breaker.failures == 1
+        await redis_cache.stop_reconnecting()
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from cache.bus import InvalidationBus
+from cache.local import LocalCache
+
+
+@pytest.mark.asyncio
+class TestInvalidationBus:
+    async def test_invalidation_reaches_other_workers(self) -> None:
+        server = FakeServer()
+        publisher_local, subscriber_local = LocalCache(10, 60), LocalCache(10, 60)
+        publisher = InvalidationBus(FakeRedis(server=server), "bus", publisher_local)
+        subscriber = InvalidationBus(FakeRedis(server=server), "bus", subscriber_local)
+        subscriber.start()
+        await asyncio.sleep(0.1)
+
+        subscriber_local.set("user:1", b"1", 60, namespace="user")
+        subscriber_local.set("product:1", b"2", 60, namespace="product")
+        await publisher.publish(namespace="user")
+        await asyncio.sleep(0.1)
+        assert "user:1" not in subscriber_local
+        assert "product:1" in subscriber_local
+
+        await publisher.publish(key="product:1")
+        await asyncio.sleep(0.1)
+        assert "product:1" not in subscriber_local
+        assert subscriber.stats.received == 2
+        assert subscriber.stats.max_lag >= 0
+
+        await subscriber.stop()
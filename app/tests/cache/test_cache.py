@@ -0,0 +1,75 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import Response
+from pydantic import BaseModel
+
+from cache import Cache, cache, invalidate
+
+
+class Item(BaseModel):
+    id: int
+
+
+def body(response: Response) -> dict:
+    assert response.media_type == "application/json"
+    return json.loads(response.body)
+
+
+@pytest.mark.asyncio
+class TestCacheDecorator:
+    async def test_hit_and_invalidate(self, redis_cache: Cache) -> None:
+        calls = 0
+
+        @cache(namespace="items")
+        async def read_item(item_id: int):
+            nonlocal calls
+            calls += 1
+            return {"id": item_id}
+
+        @invalidate(namespace="items")
+        async def update_item():
+            return True
+
+        assert body(await read_item(item_id=1)) == {"id": 1}
+        assert body(await read_item(item_id=1)) == {"id": 1}
+        assert calls == 1
+
+        await update_item()
+        assert body(await read_item(item_id=1)) == {"id": 1}
+        assert calls == 2
+
+    async def test_stale_while_revalidate(
+        self, redis_cache: Cache, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        calls = 0
+
+        @cache(namespace="items", expire=60, stale_ttl=60)
+        async def read_item(item_id: int):
+            nonlocal calls
+            calls += 1
+            return {"id": item_id, "version": calls}
+
+        assert body(await read_item(item_id=1)) == {"id": 1, "version": 1}
+
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 61)
+        # the stale value is served while it is refreshed in the background
+        assert body(await read_item(item_id=1)) == {"id": 1, "version": 1}
+        await asyncio.gather(*redis_cache._background_tasks)
+        assert calls == 2
+        assert body(await read_item(item_id=1)) == {"id": 1, "version": 2}
+        assert redis_cache.flight.stats.refreshed == 1
+
+    async def test_body_follows_return_annotation(self, redis_cache: Cache) -> None:
+        @cache(namespace="items")
+        async def read_item(item_id: int) -> Item:
+            return {"id": item_id, "hashed_password": "secret"}
+
+        miss = await read_item(item_id=1)
+        hit = await read_item(item_id=1)
+        assert miss.body == hit.body == b'{"id":1}'
+        assert hit.headers["X-Test-Cache"] == "Hit"
+        assert hit.headers["ETag"] == Cache.get_etag(hit.body)
@@ -0,0 +1,24 @@
+import pytest
+
+from cache import Cache
+
+
+@pytest.mark.asyncio
+class TestCacheClient:
+    async def test_invalidate_namespace(self, redis_cache: Cache) -> None:
+        for i in range(3):
+            await redis_cache.add_to_cache(f"user:{i}", {"id": i}, 60, "user")
+        await redis_cache.add_to_cache("product:1", {"id": 1}, 60, "product")
+
+        assert await redis_cache.invalidate("user") == 3
+        assert await redis_cache.redis.exists("user:0", "user:1", "user:2") == 0
+        assert await redis_cache.redis.exists("product:1") == 1
+        assert await redis_cache.invalidate("user") == 0
+
+    async def test_namespace_index_expires_with_keys(self, redis_cache: Cache) -> None:
+        await redis_cache.add_to_cache("user:1", {"id": 1}, 60, "user")
+        await redis_cache.add_to_cache("user:2", {"id": 2}, 120, "user")
+        await redis_cache.add_to_cache("user:3", {"id": 3}, 30, "user")
+
+        index_ttl = await redis_cache.redis.ttl(redis_cache.get_cache_index_key("user"))
+        assert 60 < index_ttl <= 120
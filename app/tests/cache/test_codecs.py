@@ -0,0 +1,90 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from cache.codecs import (
+    CODECS,
+    OPTIONAL_MODULES,
+    COMPRESSORS,
+    PayloadSerializer,
+    check_codec,
+    check_compression,
+)
+from cache.entry import CacheEntry
+
+VALUE = {
+    "id": 1,
+    "price": Decimal("10.50"),
+    "created": datetime(2024, 1, 1, 12, 30),
+    "file": b"\x00\x01binary",
+    "tags": ["a", "b"],
+    "nested": {"items": [{"id": 2, "blob": b"abc"}]},
+}
+
+
+def requires_backend(backend: type) -> None:
+    # the optional backends come with the `cache-codecs` extra
+    if backend.requires is not None:
+        pytest.importorskip(backend.requires)
+
+
+class TestCodecs:
+    @pytest.mark.parametrize("codec", list(CODECS))
+    def test_round_trip_semantics_match_json(self, codec: str) -> None:
+        requires_backend(CODECS[codec])
+        json_serializer = PayloadSerializer(codec="json")
+        serializer = PayloadSerializer(codec=codec)
+
+        expected = json_serializer.decode(*json_serializer.encode(VALUE))
+        assert serializer.decode(*serializer.encode(VALUE)) == expected
+        assert expected["file"] == VALUE["file"]
+        assert expected["nested"]["items"][0]["blob"] == b"abc"
+
+    @pytest.mark.parametrize("compression", ["zlib", "zstd", "lz4"])
+    def test_compresses_large_payloads(self, compression: str) -> None:
+        requires_backend(COMPRESSORS[compression])
+        serializer = PayloadSerializer(
+            codec="json", compression=compression, compress_min_size=64
+        )
+        small = {"id": 1}
+        large = {"items": [{"id": i, "title": "product"} for i in range(100)]}
+
+        payload, codec, compression_id = serializer.encode(small)
+        assert compression_id == 0
+        assert serializer.decode(payload, codec, compression_id) == small
+
+        payload, codec, compression_id = serializer.encode(large)
+        assert compression_id != 0
+        assert len(payload) < len(serializer.codec.encode(large))
+        assert serializer.decode(payload, codec, compression_id) == large
+
+    def test_reads_entries_of_other_configurations(self) -> None:
+        pytest.importorskip("msgpack")
+        writer = PayloadSerializer(
+            codec="msgpack", compression="zlib", compress_min_size=0
+        )
+        reader = PayloadSerializer(codec="json")
+        payload, codec, compression = writer.encode({"id": 1})
+        raw = CacheEntry(payload, codec=codec, compression=compression).dumps()
+
+        entry = CacheEntry.loads(raw)
+        assert reader.decode(entry.payload, entry.codec, entry.compression) == {"id": 1}
+
+        legacy = CacheEntry.loads(b'{"id": 1}')
+        assert reader.decode(legacy.payload, legacy.codec, legacy.compression) == {
+            "id": 1
+        }
+
+    def test_rejects_missing_backends(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setitem(OPTIONAL_MODULES, "orjson", None)
+        monkeypatch.setitem(OPTIONAL_MODULES, "lz4", None)
+
+        assert check_codec("json") == "json"
+        assert check_compression(None) is None
+        with pytest.raises(ValueError, match="cache-codecs"):
+            check_codec("orjson")
+        with pytest.raises(ValueError, match="cache-codecs"):
+            check_compression("lz4")
+        with pytest.raises(ValueError, match="Unknown"):
+            check_codec("pickle")
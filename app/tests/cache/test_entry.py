@@ -0,0 +1,44 @@
+import time
+
+from cache.entry import CacheEntry
+
+
+class TestCacheEntry:
+    def test_round_trip(self) -> None:
+        entry = CacheEntry(b'{"a": 1}', expire_at=time.time() + 60, delta=0.25)
+        loaded = CacheEntry.loads(entry.dumps())
+        assert loaded.payload == b'{"a": 1}'
+        assert loaded.expire_at == entry.expire_at
+        assert abs(loaded.delta - 0.25) < 1e-6
+        assert not loaded.is_stale()
+
+    def test_legacy_payload(self) -> None:
+        loaded = CacheEntry.loads(b'{"a": 1}')
+        assert loaded.payload == b'{"a": 1}'
+        assert loaded.expire_at is None
+        assert not loaded.is_stale()
+        assert not loaded.should_refresh_early(beta=1.0)
+
+    def test_stale(self) -> None:
+        entry = CacheEntry(b"{}", expire_at=time.time() - 1)
+        assert entry.is_stale()
+
+    def test_early_refresh_close_to_expiry(self) -> None:
+        now = time.time()
+        expensive = CacheEntry(b"{}", expire_at=now + 0.01, delta=10.0)
+        assert expensive.should_refresh_early(beta=1.0, now=now)
+        cheap = CacheEntry(b"{}", expire_at=now + 3600, delta=0.001)
+        assert not cheap.should_refresh_early(beta=1.0, now=now)
+
+    def test_etag(self) -> None:
+        entry = CacheEntry(b'{"a": 1}', expire_at=time.time() + 60)
+        assert CacheEntry.loads(entry.dumps()).etag == entry.etag
+        # older entries have no stored digest and hash the payload instead
+        assert CacheEntry.loads(b'{"a": 1}').etag == entry.etag
+
+    def test_headers(self) -> None:
+        entry = CacheEntry(b"[]", headers=[("X-Next-Cursor", "abc")])
+        loaded = CacheEntry.loads(entry.dumps())
+        assert loaded.headers == [("X-Next-Cursor", "abc")]
+        assert loaded.payload == b"[]"
+        assert CacheEntry.loads(CacheEntry(b"[]").dumps()).headers is None
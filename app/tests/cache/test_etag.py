@@ -0,0 +1,63 @@
+from fastapi import FastAPI, Response
+from httpx import ASGITransport, AsyncClient
+import pytest
+
+from cache import Cache, cache
+
+app = FastAPI()
+calls = 0
+
+
+@app.get("/items/{item_id}")
+@cache(namespace="items", expire=60)
+async def read_item(item_id: int):
+    global calls
+    calls += 1
+    return {"id": item_id}
+
+
+@app.get("/pages")
+@cache(namespace="items", expire=60, headers=("X-Next-Cursor",))
+async def read_page(response: Response):
+    response.headers["X-Next-Cursor"] = "next"
+    response.set_cookie("session", "private")
+    return []
+
+
+@pytest.mark.asyncio
+class TestConditionalRequests:
+    async def test_not_modified(self, redis_cache: Cache) -> None:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            miss = await client.get("/items/1")
+            assert miss.json() == {"id": 1}
+            assert miss.headers["X-Test-Cache"] == "Miss"
+            etag = miss.headers["ETag"]
+            assert etag == Cache.get_etag(miss.content)
+
+            hit = await client.get("/items/1")
+            assert hit.headers["X-Test-Cache"] == "Hit"
+            assert hit.headers["ETag"] == etag
+
+            not_modified = await client.get(
+                "/items/1", headers={"If-None-Match": f"W/{etag}"}
+            )
+            assert not_modified.status_code == 304
+            assert not_modified.content == b""
+            assert not_modified.headers["ETag"] == etag
+
+            modified = await client.get("/items/2", headers={"If-None-Match": etag})
+            assert modified.status_code == 200
+        assert calls == 2
+
+    async def test_endpoint_headers_on_hits(self, redis_cache: Cache) -> None:
+        redis_cache.ignore_arg_types = [Response]
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            miss = await client.get("/pages")
+            hit = await client.get("/pages")
+        assert hit.headers["X-Test-Cache"] == "Hit"
+        assert miss.headers["X-Next-Cursor"] == hit.headers["X-Next-Cursor"] == "next"
+        # only the listed headers are cached
+        assert "set-cookie" in miss.headers
+        assert "set-cookie" not in hit.headers
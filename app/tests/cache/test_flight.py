@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+
+from cache.flight import LOCK_SUFFIX, SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_concurrent_misses_are_computed_once(self) -> None:
+        flight = SingleFlight()
+        redis = FakeRedis()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"value": calls}
+
+        async def lookup():
+            return None
+
+        results = await asyncio.gather(
+            *[flight.run(redis, "key", compute, lookup) for _ in range(10)]
+        )
+        assert calls == 1
+        assert all(result == {"value": 1} for result in results)
+        assert flight.stats.computed == 1
+        assert flight.stats.coalesced_local == 9
+        assert await redis.exists(f"key{LOCK_SUFFIX}") == 0
+
+    async def test_waits_for_lock_held_by_other_worker(self) -> None:
+        flight = SingleFlight(lock_ttl_ms=1000, poll_interval=0.01)
+        redis = FakeRedis()
+        await redis.set(f"key{LOCK_SUFFIX}", "other-worker", px=1000)
+
+        async def other_worker():
+            await asyncio.sleep(0.05)
+            await redis.set("key", "cached")
+
+        async def compute():
+            raise AssertionError("the value should come from the other worker")
+
+        async def lookup():
+            return await redis.get("key")
+
+        result, _ = await asyncio.gather(
+            flight.run(redis, "key", compute, lookup), other_worker()
+        )
+        assert result == b"cached"
+        assert flight.stats.coalesced_remote == 1
+        assert flight.stats.computed == 0
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import Request
+
+from cache.key_gen import KeyBuilder
+
+PREFIX = "api-cache|user"
+
+
+async def read_users(request: Request, skip: int = 0, limit: int = 100):
+    pass
+
+
+class TestKeyBuilder:
+    def test_ignores_arg_types(self) -> None:
+        key_builder = KeyBuilder(read_users)
+        first = key_builder.build(PREFIX, [Request], (), {"request": object()})
+        second = key_builder.build(PREFIX, [Request], (), {"request": object()})
+        assert first == second
+        assert first.startswith(f"{PREFIX}:{read_users.__module__}.read_users:")
+
+    def test_defaults_and_positional_args(self) -> None:
+        key_builder = KeyBuilder(read_users)
+        keyword = key_builder.build(PREFIX, [Request], (), {"request": None})
+        explicit = key_builder.build(
+            PREFIX, [Request], (), {"request": None, "skip": 0, "limit": 100}
+        )
+        positional = key_builder.build(PREFIX, [Request], (None, 0, 100), {})
+        assert keyword == explicit == positional
+
+    def test_distinct_arguments(self) -> None:
+        key_builder = KeyBuilder(read_users)
+        first_page = key_builder.build(PREFIX, [Request], (), {"skip": 0})
+        second_page = key_builder.build(PREFIX, [Request], (), {"skip": 100})
+        assert first_page != second_page
+
+    def test_rejects_unstable_arguments(self) -> None:
+        key_builder = KeyBuilder(read_users)
+        with pytest.raises(TypeError, match="ignore_arg_types"):
+            key_builder.build(PREFIX, [Request], (), {"skip": object()})
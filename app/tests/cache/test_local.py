@@ -0,0 +1,41 @@
+import time
+
+from cache.local import LocalCache
+
+
+class TestLocalCache:
+    def test_get_set(self) -> None:
+        local = LocalCache(max_size=10, ttl=60)
+        local.set("key", b"value", 30, namespace="user")
+        ttl, value = local.get("key")
+        assert value == b"value"
+        assert 0 < ttl <= 30
+        assert local.get("missing") is None
+
+    def test_lru_eviction(self) -> None:
+        local = LocalCache(max_size=2, ttl=60)
+        local.set("a", b"1", 60)
+        local.set("b", b"2", 60)
+        local.get("a")
+        local.set("c", b"3", 60)
+        assert "a" in local
+        assert "b" not in local
+        assert "c" in local
+        assert len(local) == 2
+
+    def test_ttl_expiry(self, monkeypatch) -> None:
+        local = LocalCache(max_size=10, ttl=5)
+        local.set("key", b"value", 60)
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+        assert local.get("key") is None
+        assert len(local) == 0
+
+    def test_invalidate_namespace(self) -> None:
+        local = LocalCache(max_size=10, ttl=60)
+        local.set("user:1", b"1", 60, namespace="user")
+        local.set("user:2", b"2", 60, namespace="user")
+        local.set("product:1", b"3", 60, namespace="product")
+        assert local.invalidate("user") == 2
+        assert "user:1" not in local
+        assert "product:1" in local
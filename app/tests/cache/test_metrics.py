@@ -0,0 +1,49 @@
+import pytest
+
+from cache import Cache, cache
+from cache.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    def test_render(self) -> None:
+        registry = MetricsRegistry()
+        hits = registry.counter("hits_total", "Hits.", ("namespace",))
+        latency = registry.histogram(
+            "latency_seconds", "Latency.", ("operation",), buckets=(0.1, 1.0)
+        )
+        hits.inc(namespace="user")
+        hits.inc(2, namespace="user")
+        latency.observe(0.05, operation="get")
+        latency.observe(0.5, operation="get")
+
+        lines = registry.render().splitlines()
+        assert "# TYPE hits_total counter" in lines
+        assert 'hits_total{namespace="user"} 3' in lines
+        assert 'latency_seconds_bucket{operation="get",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{operation="get",le="+Inf"} 2' in lines
+        assert 'latency_seconds_count{operation="get"} 2' in lines
+
+
+@pytest.mark.asyncio
+class TestCacheMetrics:
+    async def test_decorator_counts(self, redis_cache: Cache) -> None:
+        @cache(namespace="items")
+        async def read_item(item_id: int):
+            return {"id": item_id}
+
+        await read_item(item_id=1)
+        await read_item(item_id=1)
+        await redis_cache.invalidate("items")
+
+        metrics = redis_cache.metrics
+        labels = {
+            "namespace": "items",
+            "endpoint": f"{__name__}.{read_item.__qualname__}",
+        }
+        assert metrics.misses.get(**labels) == 1
+        assert metrics.hits.get(**labels) == 1
+        assert metrics.stores.get(**labels) == 1
+        assert metrics.bytes_stored.get(**labels) > 0
+        assert metrics.invalidated_keys.get(namespace="items") == 1
+        assert metrics.redis_latency.count(operation="get", namespace="items") == 2
+        assert "cache_single_flight_total" in redis_cache.render_metrics()
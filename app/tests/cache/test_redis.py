@@ -0,0 +1,40 @@
+import pytest
+from fakeredis.aioredis import FakeRedis
+from redis.exceptions import ConnectionError
+
+from cache.redis import RedisHealthCheck, create_pool
+
+
+class UnreachableRedis:
+    async def ping(self) -> bool:
+        raise ConnectionError("Connection refused")
+
+
+def test_create_pool() -> None:
+    pool = create_pool("redis://localhost:6379/0", max_connections=7)
+    assert pool.max_connections == 7
+    assert pool.connection_kwargs["health_check_interval"] == 30
+    assert pool.connection_kwargs["decode_responses"] is False
+
+
+@pytest.mark.asyncio
+class TestRedisHealthCheck:
+    async def test_check(self) -> None:
+        redis = FakeRedis()
+        health = RedisHealthCheck(redis)
+        assert await health.check()
+        health.ensure_healthy()
+        await redis.aclose()
+
+    async def test_unreachable(self) -> None:
+        health = RedisHealthCheck(UnreachableRedis())
+        assert not await health.check()
+        with pytest.raises(ConnectionError):
+            health.ensure_healthy()
+
+    async def test_start_and_stop(self) -> None:
+        health = RedisHealthCheck(UnreachableRedis(), interval=60)
+        health.start()
+        assert health.running
+        await health.stop()
+        assert not health.running
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import select
+
+from app.crud import count as count_module
+from app.crud.count import CountMode, count
+from app.models import User
+
+
+@pytest.fixture
+def counts(monkeypatch: pytest.MonkeyPatch) -> dict:
+    """Fake database: the estimate and exact count, and the calls made."""
+    state = {"rows": 10, "calls": []}
+
+    async def count_estimated(db, query) -> int:
+        state["calls"].append("estimated")
+        return state["rows"]
+
+    async def count_exact(db, query) -> int:
+        state["calls"].append("exact")
+        return state["rows"]
+
+    monkeypatch.setattr(count_module, "count_estimated", count_estimated)
+    monkeypatch.setattr(count_module, "count_exact", count_exact)
+    monkeypatch.setattr(count_module, "_auto_estimated", {})
+    monkeypatch.setattr(count_module.settings, "COUNT_EXACT_THRESHOLD", 100)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_auto_counts_in_one_round_trip(counts: dict) -> None:
+    query = select(User).where(User.is_deleted.is_(None))
+    assert await count(None, query, CountMode.AUTO) == 10
+    assert counts["calls"] == ["estimated", "exact"]
+
+    # the table is known to be small, it is counted directly
+    counts["calls"].clear()
+    assert await count(None, query, CountMode.AUTO) == 10
+    assert counts["calls"] == ["exact"]
+
+    # once it grows past the threshold, it is estimated
+    counts["rows"] = 1000
+    await count(None, query, CountMode.AUTO)
+    counts["calls"].clear()
+    assert await count(None, query, CountMode.AUTO) == 1000
+    assert counts["calls"] == ["estimated"]
+
+
+@pytest.mark.asyncio
+async def test_auto_decides_again_after_ttl(counts: dict) -> None:
+    query = select(User)
+    await count_module.count_auto(None, query, ttl=0)
+    counts["calls"].clear()
+    await count_module.count_auto(None, query, ttl=0)
+    assert counts["calls"] == ["estimated", "exact"]
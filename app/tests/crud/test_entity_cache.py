@@ -0,0 +1,39 @@
+import pytest
+
+from app.crud.entity_cache import EntityCache
+from app.models.user import User, UserRoles
+from cache import Cache
+from tests.cache.conftest import redis_cache  # noqa: F401
+
+
+def make_user(id_: int) -> User:
+    return User(
+        id=id_,
+        username=f"user-{id_}",
+        phone_number=str(id_),
+        hashed_password="secret",
+        is_active=True,
+        roles=[UserRoles.Consumer],
+    )
+
+
+@pytest.mark.asyncio
+class TestEntityCache:
+    async def test_snapshot_leaves_out_secrets(self) -> None:
+        snapshot = EntityCache(User).loads(EntityCache(User).dumps(make_user(1)))
+        assert "hashed_password" not in snapshot
+        assert snapshot["username"] == "user-1"
+
+    async def test_invalidated_rows_are_not_cached_again(
+        self, redis_cache: Cache  # noqa: F811
+    ) -> None:
+        entity_cache = EntityCache(User, ttl=60)
+        users = [make_user(1), make_user(2)]
+        key = entity_cache.get_key(1)
+
+        # a read that loaded user 1 before a write to it committed
+        await entity_cache.invalidate(1)
+        await entity_cache.set_many(users)
+
+        assert await redis_cache.redis.get(key) is None
+        assert await redis_cache.redis.get(entity_cache.get_key(2)) is not None
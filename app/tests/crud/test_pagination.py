@@ -0,0 +1,26 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app import exceptions
+from app.crud.pagination import encode_cursor, paginate_after
+from app.models import User
+
+
+def test_paginate_after_valid_cursor() -> None:
+    cursor = encode_cursor("created", False, [datetime(2024, 1, 1), 7])
+    query = paginate_after(select(User), User, cursor=cursor, limit=10)
+    assert "ORDER BY" in str(query)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [["not a date", 7], [datetime(2024, 1, 1), "7"], [datetime(2024, 1, 1)], [1, 2]],
+)
+def test_paginate_after_rejects_malformed_cursor(values: list) -> None:
+    cursor = encode_cursor("created", False, values)
+    with pytest.raises(exceptions.ValidationException):
+        paginate_after(select(User), User, cursor=cursor, limit=10)
+    with pytest.raises(exceptions.ValidationException):
+        paginate_after(select(User), User, cursor="!!garbage", limit=10)
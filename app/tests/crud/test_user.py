@@ -1,10 +1,15 @@
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import update
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.asyncio import AsyncSession
 import pytest
 
-from app import crud
+from app import crud, models
+from app.crud.count import CountMode
+from cache import Cache
 from app.core.security import verify_password
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import User, UserCreate, UserUpdate
+from tests.cache.conftest import redis_cache  # noqa: F401
 from tests.utils.utils import random_email, random_lower_string
 from app.models.user import UserRoles, GroupRoles
 
@@ -107,3 +112,183 @@ class TestUser:
         assert user_2
         assert user.username == user_2.username
         assert verify_password(new_password, user_2.hashed_password)
+
+    async def test_get_user_from_entity_cache(
+        self,
+        db: AsyncSession,
+        redis_cache: Cache,  # noqa: F811
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(crud.user.entity_cache, "_ttl", 60)
+        username, password = random_email(), random_lower_string()
+        user_in = UserCreate(
+            username=username,
+            phone_number=random_lower_string()[:20],
+            password=password,
+            roles=[UserRoles.Admin],
+        )
+        user = await crud.user.create(db, obj_in=user_in)
+        user_id = user.id
+        db.expunge_all()
+        await crud.user.get(db, id_=user_id)
+        assert await redis_cache.redis.get(crud.user.entity_cache.get_key(user_id))
+
+        # a change made behind the cache is not seen: the row comes from the cache
+        await db.execute(
+            update(models.User)
+            .where(models.User.id == user_id)
+            .values(full_name="not cached")
+        )
+        await db.commit()
+        db.expunge_all()
+        cached = await crud.user.get(db, id_=user_id)
+        assert cached.username == username
+        assert cached.full_name is None
+        with pytest.raises(InvalidRequestError):
+            _ = cached.hashed_password
+        assert await crud.user.authenticate(db, username=username, password=password)
+
+        await crud.user.update(db, db_obj=cached, obj_in={"full_name": "updated"})
+        assert await crud.user.entity_cache.get(db, user_id) is None
+        user_2 = await crud.user.get(db, id_=user_id)
+        assert user_2.full_name == "updated"
+
+    async def test_get_users_page_after(self, db: AsyncSession) -> None:
+        for _ in range(3):
+            user_in = UserCreate(
+                username=random_email(),
+                phone_number=random_lower_string()[:20],
+                password=random_lower_string(),
+                roles=[UserRoles.Consumer],
+            )
+            await crud.user.create(db, obj_in=user_in)
+        users = await crud.user.get_multi(db, limit=None)
+        seen = []
+        page, cursor = await crud.user.get_page_after(db, limit=2)
+        while page:
+            seen.extend(user.id for user in page)
+            if cursor is None:
+                break
+            page, cursor = await crud.user.get_page_after(db, cursor=cursor, limit=2)
+        assert seen == [user.id for user in users]
+
+    async def test_get_count(self, db: AsyncSession) -> None:
+        before = await crud.user.get_count(db)
+        user_in = UserCreate(
+            username=random_email(),
+            phone_number=random_lower_string()[:20],
+            password=random_lower_string(),
+            roles=[UserRoles.Consumer],
+        )
+        user = await crud.user.create(db, obj_in=user_in)
+        assert await crud.user.get_count(db) == before + 1
+        await crud.user.remove(db, id_=user.id)
+        # soft-deleted rows are not counted
+        assert await crud.user.get_count(db) == before
+        assert await crud.user.get_count(db, mode=CountMode.ESTIMATED) >= 0
+        assert await crud.user.get_count(db, mode=CountMode.AUTO) == before
+
+    async def test_create_bulk_upsert(self, db: AsyncSession) -> None:
+        rows = [
+            {
+                "username": random_email(),
+                "phone_number": random_lower_string()[:20],
+                "hashed_password": random_lower_string(),
+                "roles": [UserRoles.Consumer],
+            }
+            for _ in range(3)
+        ]
+        users = await crud.user.create_bulk(db, rows, returning=True)
+        assert [user.username for user in users] == [row["username"] for row in rows]
+
+        rows[0]["full_name"] = "updated"
+        rows[0]["username"] = random_email()
+        updated = await crud.user.create_bulk(
+            db,
+            rows[:1],
+            on_conflict="update",
+            conflict_columns=("phone_number",),
+            returning=True,
+        )
+        assert updated[0].id == users[0].id
+        assert updated[0].full_name == "updated"
+
+        # a row without full_name keeps the stored one, whatever the other rows set
+        del rows[0]["full_name"]
+        rows[1]["full_name"] = "second"
+        updated = await crud.user.create_bulk(
+            db,
+            rows[:2],
+            on_conflict="update",
+            conflict_columns=("phone_number",),
+            returning=True,
+        )
+        assert [user.id for user in updated] == [users[0].id, users[1].id]
+        assert [user.full_name for user in updated] == ["updated", "second"]
+
+        skipped = await crud.user.create_bulk(
+            db,
+            rows,
+            on_conflict="nothing",
+            conflict_columns=("phone_number",),
+            returning=True,
+        )
+        assert skipped == []
+
+        new_row = {**rows[0], "phone_number": random_lower_string()[:20]}
+        new_row["username"] = random_email()
+        inserted = await crud.user.create_bulk(
+            db,
+            [rows[1], new_row, rows[2]],
+            on_conflict="nothing",
+            conflict_columns=("phone_number",),
+            returning=True,
+        )
+        assert [user.username for user in inserted] == [new_row["username"]]
+
+    async def test_update_multi(self, db: AsyncSession) -> None:
+        users = [
+            await crud.user.create(
+                db,
+                UserCreate(
+                    username=random_email(),
+                    phone_number=random_lower_string()[:20],
+                    password=random_lower_string(),
+                    roles=[UserRoles.Consumer],
+                ),
+            )
+            for _ in range(3)
+        ]
+        updated = await crud.user.update_multi(
+            db,
+            users,
+            [UserUpdate(full_name=f"name {i}") for i in range(2)]
+            + [{"email": random_email(), "unknown": True}],
+            refresh=True,
+        )
+        assert [user.full_name for user in updated] == ["name 0", "name 1", None]
+        assert updated[2].email is not None
+
+        assert await crud.user.update_multi(db, users[:1], [{"full_name": "again"}])
+        assert users[0].full_name == "again"
+        # expired attributes cannot be lazy loaded by an AsyncSession
+        user_id = users[0].id
+        db.expire_all()
+        stored = await crud.user.get(db, user_id)
+        assert stored.full_name == "again"
+
+    async def test_get_multi_schema(self, db: AsyncSession) -> None:
+        await crud.user.create(
+            db,
+            UserCreate(
+                username=random_email(),
+                phone_number=random_lower_string()[:20],
+                password=random_lower_string(),
+                roles=[UserRoles.Consumer],
+            ),
+        )
+        db.expunge_all()
+        rows = await crud.user.get_multi(db, limit=1, schema=User)
+        assert not db.identity_map
+        assert "hashed_password" not in rows[0]._fields
+        assert User.model_validate(rows[0]).id == rows[0].id
@@ -0,0 +1,43 @@
+from datetime import date
+
+from app.db.partitions import (
+    DAY,
+    MONTH,
+    create_partition_sql,
+    is_partition,
+    next_period,
+    partition_name,
+    partition_start,
+    periods,
+)
+
+
+def test_periods() -> None:
+    assert next_period(date(2026, 12, 1), MONTH) == date(2027, 1, 1)
+    assert next_period(date(2026, 2, 28), DAY) == date(2026, 3, 1)
+    assert periods(date(2026, 1, 31), date(2026, 3, 2), MONTH) == [
+        date(2026, 1, 1),
+        date(2026, 2, 1),
+        date(2026, 3, 1),
+    ]
+
+
+def test_partition_names() -> None:
+    name = partition_name("requestlog", date(2026, 10, 1), MONTH)
+    assert name == "requestlog_p202610"
+    assert partition_start("requestlog", name, MONTH) == date(2026, 10, 1)
+    assert partition_start("requestlog", "requestlog_default", MONTH) is None
+    assert partition_start("requestlog", "requestlog_p20261017", DAY) == date(
+        2026, 10, 17
+    )
+    assert create_partition_sql("requestlog", date(2026, 10, 17), DAY) == (
+        'CREATE TABLE IF NOT EXISTS "requestlog_p20261017" PARTITION OF "requestlog" '
+        "FOR VALUES FROM ('2026-10-17 00:00:00+00') TO ('2026-10-18 00:00:00+00')"
+    )
+
+
+def test_is_partition() -> None:
+    for name in ("requestlog_p202610", "requestlog_p20261017", "requestlog_default"):
+        assert is_partition("requestlog", name)
+    for name in ("requestlog", "requestlogrollup", "requestlog_old", "user_p202610"):
+        assert not is_partition("requestlog", name)
@@ -0,0 +1,67 @@
+import pytest
+
+from app.log.policy import (
+    ALL,
+    ERRORS,
+    ERRORS_AND_SLOW,
+    SLOW,
+    LogPolicy,
+    mask_data,
+    mask_secrets,
+    path_logged,
+    truncate,
+)
+
+
+@pytest.mark.parametrize(
+    "mode, logged",
+    [
+        (ALL, [True, True, False]),
+        (ERRORS, [True, False, False]),
+        (SLOW, [False, True, False]),
+        (ERRORS_AND_SLOW, [True, True, False]),
+    ],
+)
+def test_should_log(mode: str, logged: list[bool]) -> None:
+    policy = LogPolicy(sample_rate=0, mode=mode, slow_threshold=1)
+    requests = [(500, 0.1), (200, 2.0), (200, 0.1)]
+    assert [policy.should_log(*request) for request in requests] == logged
+
+
+def test_path_logged() -> None:
+    assert path_logged("/api/v1/users", (), ())
+    assert path_logged("/api/v1/users", ("/api",), ("/api/v1/utils",))
+    assert not path_logged("/api/v1/utils/test", ("/api",), ("/api/v1/utils",))
+    assert not path_logged("/healthz", ("/api",), ())
+
+
+def test_truncate() -> None:
+    assert truncate(b"abcdef", 0) == "abcdef"
+    assert truncate(b"abcdef", 4) == "abcd...[truncated 2 bytes]"
+    assert mask_secrets('{"password": "sec', ["password"]) == '{"password": "*****"'
+
+
+def test_mask_secrets() -> None:
+    keys = ["username", "password"]
+    assert (
+        mask_secrets("username=ali&password=s3cret&next=/", keys)
+        == "username=*****&password=*****&next=/"
+    )
+    assert (
+        mask_secrets("<login><password>s3cret</password></login>", keys)
+        == "<login><password>*****</password></login>"
+    )
+    assert mask_data(
+        {"password": "s3cret", "items": [{"username": "ali", "id": 1}], "empty": ""},
+        keys,
+    ) == {"password": "*****", "items": [{"username": "*****", "id": 1}], "empty": ""}
+
+
+def test_capture_body_masks_every_format() -> None:
+    from app.log.log import capture_body
+
+    assert capture_body(b'{"password": "s3cret"}', 0) == {"password": "*****"}
+    assert capture_body(b"password=s3cret", 0) == "password=*****"
+    assert capture_body(b"password=s3cret&x=" + b"1" * 100, 20).startswith(
+        "password=*****"
+    )
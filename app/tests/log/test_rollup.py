@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.log.rollup import (
+    HOUR,
+    LATENCY_BOUNDS,
+    MINUTE,
+    empty_rollup,
+    merge,
+    percentile,
+    retention_cutoffs,
+    summarize,
+    truncate,
+)
+
+
+def histogram(**counts: int) -> list[int]:
+    values = [0] * (len(LATENCY_BOUNDS) + 1)
+    for index, count in counts.items():
+        values[int(index[1:])] = count
+    return values
+
+
+def test_truncate_in_utc():
+    moment = datetime(2026, 1, 1, 3, 59, 30, tzinfo=timezone(timedelta(hours=3.5)))
+    assert truncate(moment, MINUTE) == datetime(2026, 1, 1, 0, 29, tzinfo=timezone.utc)
+    assert truncate(moment, HOUR) == datetime(2026, 1, 1, 0, 0, tzinfo=timezone.utc)
+
+
+def test_percentile_interpolates_inside_bucket():
+    # 100 requests between 0.1s and 0.25s
+    values = histogram(b5=100)
+    assert percentile(values, 0.5, 0.25) == pytest.approx(0.175)
+    assert percentile(values, 0.99, 0.25) == pytest.approx(0.2485)
+
+
+def test_percentile_is_capped_by_max_time():
+    values = histogram(b0=90, b11=10)
+    assert percentile(values, 0.5, 30.0) < LATENCY_BOUNDS[0]
+    assert LATENCY_BOUNDS[-1] < percentile(values, 0.95, 30.0) <= 30.0
+    assert percentile(histogram(b7=1), 0.99, 0.6) <= 0.6
+
+
+def test_percentile_of_empty_histogram():
+    assert percentile(histogram(), 0.5, 0.0) is None
+
+
+def test_merge_and_summarize():
+    rows = [
+        SimpleNamespace(
+            status_code=200,
+            count=90,
+            total_time=9.0,
+            max_time=0.2,
+            histogram=histogram(b5=90),
+        ),
+        SimpleNamespace(
+            status_code=500,
+            count=10,
+            total_time=10.0,
+            max_time=2.0,
+            histogram=histogram(b8=10),
+        ),
+    ]
+    rollup = empty_rollup()
+    for row in rows:
+        merge(rollup, row)
+    assert rollup["count"] == 100
+    assert rollup["max_time"] == 2.0
+    assert rollup["histogram"] == histogram(b5=90, b8=10)
+
+    # histograms of other bucket bounds cannot be added up
+    row = SimpleNamespace(count=1, total_time=0.1, max_time=0.1, histogram=[1])
+    with pytest.raises(ValueError):
+        merge(empty_rollup(), row)
+
+    stats = summarize(rows, 60)
+    assert stats["error_count"] == 10
+    assert stats["error_rate"] == pytest.approx(0.1)
+    assert stats["throughput"] == pytest.approx(100 / 60)
+    assert stats["avg_time"] == pytest.approx(0.19)
+    assert 0.1 < stats["p50"] < 0.2
+    assert 1.0 < stats["p95"] <= 2.0
+
+
+def test_summarize_without_rows():
+    stats = summarize([], 60)
+    assert stats["count"] == 0
+    assert stats["error_rate"] == 0.0
+    assert stats["p99"] is None
+
+
+def test_retention_cutoffs():
+    now = datetime(2026, 1, 10, 12, 30, 45, tzinfo=timezone.utc)
+    assert retention_cutoffs(now, 7, 90) == {
+        MINUTE: datetime(2026, 1, 3, 12, 30, tzinfo=timezone.utc),
+        HOUR: datetime(2025, 10, 12, 12, tzinfo=timezone.utc),
+    }
+    assert retention_cutoffs(now, 7, 0) == {
+        MINUTE: datetime(2026, 1, 3, 12, 30, tzinfo=timezone.utc)
+    }
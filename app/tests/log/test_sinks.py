@@ -0,0 +1,90 @@
+import pytest
+from fakeredis.aioredis import FakeRedis
+
+from app import models, schemas
+from app.log import sinks
+from app.log.sinks import CelerySink, StreamSink, consume_stream, parse_logs
+
+STREAM = "test-request-logs"
+
+
+@pytest.mark.asyncio
+async def test_stream_sink() -> None:
+    redis_client = FakeRedis(decode_responses=True)
+    sink = StreamSink(redis_client, STREAM, max_length=100)
+    for i in range(3):
+        await sink.send(
+            schemas.RequestLogCreate(
+                tracker_id=str(i), type=models.RequestLogType.Incoming
+            )
+        )
+    await redis_client.xadd(STREAM, {"log": "not json"})
+
+    async def crash(rows: list[dict]) -> None:
+        raise RuntimeError("worker died")
+
+    with pytest.raises(RuntimeError):
+        await consume_stream(redis_client, crash, stream=STREAM, consumer="a")
+
+    # entries read by the crashed consumer are claimed by the next one
+    persisted = []
+
+    async def persist(rows: list[dict]) -> None:
+        persisted.extend(rows)
+
+    count = await consume_stream(
+        redis_client, persist, stream=STREAM, consumer="b", claim_idle_time=0
+    )
+    assert count == 3
+    assert [row["tracker_id"] for row in persisted] == ["0", "1", "2"]
+    assert await redis_client.xlen(STREAM) == 0
+    assert await consume_stream(redis_client, persist, stream=STREAM, consumer="b") == 0
+
+
+@pytest.mark.asyncio
+async def test_consume_stream_max_batches() -> None:
+    redis_client = FakeRedis(decode_responses=True)
+    sink = StreamSink(redis_client, STREAM, max_length=100)
+    for i in range(5):
+        await sink.send(
+            schemas.RequestLogCreate(
+                tracker_id=str(i), type=models.RequestLogType.Incoming
+            )
+        )
+
+    async def persist(rows: list[dict]) -> None:
+        pass
+
+    count = await consume_stream(
+        redis_client,
+        persist,
+        stream=STREAM,
+        consumer="a",
+        batch_size=2,
+        max_batches=1,
+    )
+    assert count == 2
+    assert await redis_client.xlen(STREAM) == 3
+
+
+@pytest.mark.asyncio
+async def test_celery_sink_sends_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    tasks = []
+
+    def send_task(name: str, args: list, queue: str) -> None:
+        tasks.append(args[0])
+
+    monkeypatch.setattr(sinks.celery_app, "send_task", send_task)
+    sink = CelerySink(batch_size=2, flush_interval=60)
+    log = schemas.RequestLogCreate(tracker_id="0", type=models.RequestLogType.Incoming)
+    # without a running writer, every log is a task
+    await sink.send(log)
+    assert len(tasks) == 1
+
+    sink.start()
+    for i in range(3):
+        await sink.send(log.model_copy(update={"tracker_id": str(i)}))
+    await sink.stop()
+    assert [len(logs) for logs in tasks] == [1, 2, 1]
+    rows = parse_logs([log for logs in tasks[1:] for log in logs])
+    assert [row["tracker_id"] for row in rows] == ["0", "1", "2"]
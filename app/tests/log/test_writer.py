@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models
+from app.log.writer import DROP_NEW, DROP_OLDEST, RequestLogWriter
+
+
+def make_log(tracker_id: str) -> dict:
+    return {"tracker_id": tracker_id, "type": models.RequestLogType.Incoming}
+
+
+@pytest.mark.parametrize(
+    "overflow, kept", [(DROP_NEW, ["0", "1"]), (DROP_OLDEST, ["1", "2"])]
+)
+def test_overflow(overflow: str, kept: list[str]) -> None:
+    writer = RequestLogWriter(max_size=2, overflow=overflow)
+    accepted = [writer.put(make_log(str(i))) for i in range(3)]
+    assert accepted == [True, True, overflow == DROP_OLDEST]
+    assert [row["tracker_id"] for row in writer.buffer] == kept
+    assert writer.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_batches(db: AsyncSession) -> None:
+    writer = RequestLogWriter(batch_size=2, flush_interval=60)
+    writer.start()
+    for i in range(3):
+        writer.put(make_log(f"batch-{i}"))
+    await writer.stop()
+
+    assert not writer.running and not writer.buffer
+    for i in range(3):
+        log_record = await crud.request_log.get_by_tracker_id(db, f"batch-{i}")
+        assert log_record is not None